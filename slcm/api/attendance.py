@@ -1,6 +1,12 @@
+from bisect import bisect_right
+
 import frappe
 from frappe import _
-from frappe.utils import now_datetime, getdate, get_datetime, time_diff_in_hours
+from frappe.model.naming import make_autoname
+from frappe.utils import add_to_date, cint, now_datetime, getdate, get_datetime, time_diff_in_hours
+
+from slcm.slcm.utils.rfid_ingest_stream import is_write_behind_enabled, push_swipe
+from slcm.slcm.utils.rfid_lookup_cache import get_device, get_student_by_uid, is_duplicate_swipe, touch_device
 
 
 @frappe.whitelist(methods=["POST"])
@@ -9,6 +15,7 @@ def create_attendance_log():
 	Secure API to receive RFID attendance data and store it in Attendance Log
 	Authentication: API Key (Device-based)
 	REAL-TIME PROCESSING: Attendance is created immediately after log creation
+	Student, device and anti-flood lookups are served from Redis (rfid_lookup_cache)
 	"""
 
 	# --------------------------------------------------
@@ -32,12 +39,7 @@ def create_attendance_log():
 	# --------------------------------------------------
 	# 3. Map RFID UID to Student
 	# --------------------------------------------------
-	student = frappe.db.get_value(
-		"Student Master",
-		{"rfid_uid": rfid_uid},
-		["name", "first_name", "last_name", "department", "programme"],
-		as_dict=True
-	)
+	student = get_student_by_uid(rfid_uid)
 
 	if not student:
 		# Log the attempt even if student is not found
@@ -56,12 +58,7 @@ def create_attendance_log():
 	device_id = data.get("device_id")
 	
 	if device_id:
-		device = frappe.db.get_value(
-			"RFID Device",
-			device_id,
-			["name", "is_active", "location"],
-			as_dict=True
-		)
+		device = get_device(device_id)
 		
 		if not device:
 			frappe.log_error(
@@ -79,8 +76,8 @@ def create_attendance_log():
 				frappe.PermissionError
 			)
 		
-		# Update last_seen timestamp for the device
-		frappe.db.set_value("RFID Device", device_id, "last_seen", now_datetime())
+		# Update last_seen timestamp for the device (buffered, written every minute)
+		touch_device(device_id, now_datetime())
 		
 		# Use device location if not provided in request
 		if not data.get("location") and device.get("location"):
@@ -100,15 +97,7 @@ def create_attendance_log():
 	# 6. Duplicate protection (Anti-Flood)
 	#    Prevent same UID flooding within 10 seconds
 	# --------------------------------------------------
-	recent_log = frappe.db.exists(
-		"Attendance Log",
-		{
-			"rfid_uid": rfid_uid,
-			"swipe_time": [">", frappe.utils.add_to_date(now_datetime(), seconds=-10)]
-		}
-	)
-
-	if recent_log:
+	if is_duplicate_swipe(rfid_uid, window_seconds=10):
 		return {
 			"status": "ignored",
 			"message": "Duplicate swipe ignored (within 10 seconds)",
@@ -117,8 +106,30 @@ def create_attendance_log():
 		}
 
 	# --------------------------------------------------
-	# 7. Create Attendance Log with Student Link
+	# 7a. Write-behind mode: queue the swipe and answer immediately.
+	#     Falls through to the direct insert under backpressure.
 	# --------------------------------------------------
+	if is_write_behind_enabled() and push_swipe({
+		"rfid_uid": rfid_uid,
+		"student": student.get("name"),
+		"swipe_time": get_datetime(swipe_time),
+		"device_id": device_id,
+		"sequence": data.get("sequence"),
+		"location": location,
+		"source": source
+	}):
+		return {
+			"status": "success",
+			"message": "Attendance log queued",
+			"attendance_log": None,
+			"student": student.get("name"),
+			"student_name": f"{student.get('first_name')} {student.get('last_name') or ''}".strip(),
+			"department": student.get("department"),
+			"programme": student.get("programme"),
+			"swipe_time": str(swipe_time),
+			"attendance": {"attendance_created": False, "attendance_id": None, "status": None, "queued": True}
+		}
+
 	# --------------------------------------------------
 	# 7. Create Attendance Log with Student Link
 	# --------------------------------------------------
@@ -130,14 +141,15 @@ def create_attendance_log():
 		"device_id": device_id,
 		"location": location,
 		"source": source,
+		"device_sequence": cint(data.get("sequence")) if data.get("sequence") not in (None, "") else None,
 		"processed": 0
 	})
 
 	attendance_log.insert(ignore_permissions=True)
 	frappe.db.commit()
 
-	# Reload to get updates from after_insert hook (rfid_processor)
-	attendance_log.reload()
+	# The after_insert hook (rfid_processor) updates this same document in place,
+	# so no reload is needed to see student_attendance/processed
 
 	# --------------------------------------------------
 	# 8. Construct Response
@@ -149,7 +161,12 @@ def create_attendance_log():
 	}
 
 	if attendance_log.student_attendance:
-		att = frappe.get_doc("Student Attendance", attendance_log.student_attendance)
+		att = frappe.db.get_value(
+			"Student Attendance",
+			attendance_log.student_attendance,
+			["name", "status", "in_time"],
+			as_dict=True
+		)
 		attendance_info.update({
 			"attendance_created": True,
 			"attendance_id": att.name,
@@ -173,3 +190,248 @@ def create_attendance_log():
 		"swipe_time": str(swipe_time),
 		"attendance": attendance_info
 	}
+
+
+MAX_BATCH_SWIPES = 1000
+FLOOD_WINDOW_SECONDS = 10
+
+
+@frappe.whitelist(methods=["POST"])
+def create_attendance_logs(swipes=None):
+	"""
+	Batch version of create_attendance_log for readers replaying buffered swipes.
+	`swipes` is a list of {rfid_uid, device_id, sequence, swipe_time, location, source}.
+	A swipe already received with the same (device_id, sequence) is reported as a
+	duplicate instead of being stored again, so a replay can safely be retried.
+	All accepted swipes are inserted in one transaction.
+	Returns one result per swipe, in request order.
+	"""
+	swipes = frappe.parse_json(swipes if swipes is not None else frappe.local.form_dict.get("swipes")) or []
+	if not isinstance(swipes, list):
+		frappe.throw(_("swipes must be a list"), frappe.ValidationError)
+	if len(swipes) > MAX_BATCH_SWIPES:
+		frappe.throw(_("At most {0} swipes can be sent in one request").format(MAX_BATCH_SWIPES), frappe.ValidationError)
+
+	results = [None] * len(swipes)
+	items = []
+	for index, swipe in enumerate(swipes):
+		swipe = frappe._dict(swipe) if isinstance(swipe, dict) else frappe._dict()
+		rfid_uid = (swipe.get("rfid_uid") or "").strip()
+		if not rfid_uid:
+			results[index] = {"index": index, "status": "error", "message": "Missing required field: rfid_uid"}
+			continue
+
+		items.append(frappe._dict(
+			index=index,
+			rfid_uid=rfid_uid,
+			device_id=swipe.get("device_id"),
+			sequence=cint(swipe.get("sequence")) if swipe.get("sequence") not in (None, "") else None,
+			swipe_time=get_datetime(swipe.get("swipe_time") or now_datetime()),
+			location=swipe.get("location"),
+			source=swipe.get("source") or "RFID",
+		))
+
+	# One pass over the distinct UIDs and devices of the batch
+	students = get_students_by_uid({item.rfid_uid for item in items})
+	devices = get_devices({item.device_id for item in items if item.device_id})
+	received = get_received_swipes(items)
+	stored_times = get_stored_swipe_times(items)
+
+	accepted = []
+	seen_sequences = set()
+	last_swipe = {}
+	for item in sorted(items, key=lambda i: i.swipe_time):
+		result = {"index": item.index}
+		results[item.index] = result
+
+		device = devices.get(item.device_id) if item.device_id else None
+		if item.device_id and not device:
+			result.update(status="error", message=f"Device {item.device_id} is not authorized")
+			continue
+		if device and not device.is_active:
+			result.update(status="error", message=f"Device {item.device_id} is inactive")
+			continue
+
+		student = students.get(item.rfid_uid)
+		if not student:
+			result.update(status="error", message=f"RFID UID {item.rfid_uid} is not registered")
+			continue
+
+		result.update(student=student.name)
+
+		# Idempotency: the same device sequence (or the same UID and time) was already received
+		key = swipe_key(item)
+		if key in received or key in seen_sequences:
+			result.update(status="duplicate", attendance_log=received.get(key))
+			continue
+		seen_sequences.add(key)
+
+		# Anti-flood: same rule as the single swipe endpoint, against the stored
+		# swipes of the card (earlier requests) and those accepted from this batch
+		times = stored_times.get(item.rfid_uid) or []
+		position = bisect_right(times, item.swipe_time)
+		candidates = [times[position - 1]] if position else []
+		if last_swipe.get(item.rfid_uid):
+			candidates.append(last_swipe[item.rfid_uid])
+		previous = max(candidates, default=None)
+		if previous and (item.swipe_time - previous).total_seconds() < FLOOD_WINDOW_SECONDS:
+			result.update(status="ignored", message="Duplicate swipe ignored (within 10 seconds)")
+			continue
+		last_swipe[item.rfid_uid] = item.swipe_time
+
+		item.student = student.name
+		item.location = item.location or (device.location if device else None)
+		item.result = result
+		accepted.append(item)
+
+	insert_attendance_logs(accepted)
+	frappe.db.commit()
+
+	for device_id in {item.device_id for item in accepted if item.device_id}:
+		touch_device(device_id, now_datetime())
+
+	unregistered = sorted({item.rfid_uid for item in items if item.rfid_uid not in students})
+	if unregistered:
+		frappe.log_error(
+			title="Unregistered RFID UIDs in batch",
+			message=f"RFID UIDs not registered to any student: {', '.join(unregistered[:100])}"
+		)
+
+	return {
+		"status": "success",
+		"received": len(swipes),
+		"created": len(accepted),
+		"results": results
+	}
+
+
+def get_stored_swipe_times(items):
+	"""
+	{rfid_uid: sorted swipe times} of stored logs that can fall within the
+	anti-flood window of a swipe in the batch (served by idx_uid_swipe)
+	"""
+	if not items:
+		return {}
+
+	times = {}
+	for row in frappe.db.sql("""
+		SELECT rfid_uid, swipe_time
+		FROM `tabAttendance Log`
+		WHERE rfid_uid IN %(rfid_uids)s
+		AND swipe_time BETWEEN %(from_time)s AND %(to_time)s
+		ORDER BY swipe_time
+	""", {
+		"rfid_uids": tuple({item.rfid_uid for item in items}),
+		"from_time": add_to_date(min(item.swipe_time for item in items), seconds=-FLOOD_WINDOW_SECONDS),
+		"to_time": max(item.swipe_time for item in items),
+	}, as_dict=True):
+		times.setdefault(row.rfid_uid, []).append(get_datetime(row.swipe_time))
+
+	return times
+
+
+def get_students_by_uid(rfid_uids):
+	"""{rfid_uid: student} for the UIDs registered on Student Master or an active Student RFID Card"""
+	if not rfid_uids:
+		return {}
+
+	students = {
+		row.rfid_uid: row
+		for row in frappe.get_all("Student Master",
+			filters={"rfid_uid": ["in", list(rfid_uids)]},
+			fields=["name", "rfid_uid"]
+		)
+	}
+
+	missing = [uid for uid in rfid_uids if uid not in students]
+	if missing:
+		for row in frappe.get_all("Student RFID Card",
+			filters={"rfid_uid": ["in", missing], "is_active": 1},
+			fields=["student as name", "rfid_uid"]
+		):
+			students[row.rfid_uid] = row
+
+	return students
+
+
+def get_devices(device_ids):
+	if not device_ids:
+		return {}
+
+	return {
+		row.name: row
+		for row in frappe.get_all("RFID Device",
+			filters={"name": ["in", list(device_ids)]},
+			fields=["name", "is_active", "location"]
+		)
+	}
+
+
+def is_sequenced(item):
+	return item.sequence is not None and bool(item.device_id)
+
+
+def swipe_key(item):
+	"""Idempotency key of a swipe: the device sequence when the reader sends one"""
+	if is_sequenced(item):
+		return (item.device_id, item.sequence)
+	return (item.rfid_uid, item.swipe_time)
+
+
+def get_received_swipes(items):
+	"""Existing logs matching the batch, keyed by (device_id, sequence) or (rfid_uid, swipe_time)"""
+	received = {}
+
+	sequenced = [item for item in items if is_sequenced(item)]
+	if sequenced:
+		for row in frappe.get_all("Attendance Log",
+			filters={
+				"device_id": ["in", list({item.device_id for item in sequenced})],
+				"device_sequence": ["in", list({item.sequence for item in sequenced})]
+			},
+			fields=["name", "device_id", "device_sequence"]
+		):
+			received[(row.device_id, row.device_sequence)] = row.name
+
+	unsequenced = [item for item in items if not is_sequenced(item)]
+	if unsequenced:
+		for row in frappe.get_all("Attendance Log",
+			filters={
+				"rfid_uid": ["in", list({item.rfid_uid for item in unsequenced})],
+				"swipe_time": ["between", [
+					min(item.swipe_time for item in unsequenced),
+					max(item.swipe_time for item in unsequenced)
+				]]
+			},
+			fields=["name", "rfid_uid", "swipe_time"]
+		):
+			received[(row.rfid_uid, get_datetime(row.swipe_time))] = row.name
+
+	return received
+
+
+def insert_attendance_logs(items):
+	"""Multi-row insert of accepted swipes; sets attendance_log and status on each item's result"""
+	if not items:
+		return
+
+	timestamp = now_datetime()
+	user = frappe.session.user
+	values = []
+	for item in items:
+		name = make_autoname("LOG-.YYYY.-.#####", "Attendance Log")
+		values.append((
+			name, timestamp, timestamp, user, user, 0,
+			item.rfid_uid, item.student, item.swipe_time, item.device_id, item.sequence,
+			item.location, item.source, 0, "Pending"
+		))
+		item.result.update(status="created", attendance_log=name)
+
+	frappe.db.bulk_insert(
+		"Attendance Log",
+		["name", "creation", "modified", "owner", "modified_by", "docstatus",
+			"rfid_uid", "student", "swipe_time", "device_id", "device_sequence",
+			"location", "source", "processed", "processing_status"],
+		values,
+		chunk_size=500
+	)
@@ -5,7 +5,10 @@ import json
 
 import frappe
 from frappe import _
-from frappe.utils import time_diff_in_hours, get_datetime
+from frappe.utils import get_datetime, time_diff_in_hours
+
+from slcm.slcm.utils.attendance_marking import get_active_students, mark_roster, summarize
+from slcm.slcm.utils.course_offering_resolver import resolve_course_offering
 
 
 # ------------------------------------------------------------
@@ -19,13 +22,15 @@ def create_bulk_attendance_from_schedule(course_schedule, attendance_date, atten
 	if not attendance_date:
 		frappe.throw(_("Attendance Date is required"))
 
-	schedule = frappe.get_doc("Course Schedule", course_schedule)
+	schedule = frappe.db.get_value("Course Schedule", course_schedule,
+		["student_group", "program", "course", "instructor", "room"], as_dict=True)
+	if not schedule:
+		frappe.throw(_("Course Schedule {0} not found").format(course_schedule))
 
 	if not schedule.student_group:
 		frappe.throw(_("Student Group is required in Course Schedule"))
 
-	group = frappe.get_doc("Student Group", schedule.student_group)
-	students = [row.student for row in group.students if row.active]
+	students = get_active_students(schedule.student_group)
 
 	if not students:
 		frappe.throw(_("No active students found"))
@@ -33,56 +38,25 @@ def create_bulk_attendance_from_schedule(course_schedule, attendance_date, atten
 	if isinstance(attendance_data, str):
 		attendance_data = json.loads(attendance_data)
 
-	created, updated, errors = 0, 0, []
-
-	for student in students:
-		status = attendance_data.get(student, "Absent")
-
-		existing = frappe.db.exists(
-			"Student Attendance",
-			{
-				"student": student,
-				"attendance_date": attendance_date,
-				"course_schedule": course_schedule,
-				"based_on": "Course Schedule",
-				"docstatus": ("<", 2),
-			},
-		)
-
-		try:
-			if existing:
-				doc = frappe.get_doc("Student Attendance", existing)
-				doc.status = status
-				doc.save()
-				updated += 1
-			else:
-				frappe.get_doc(
-					{
-						"doctype": "Student Attendance",
-						"student": student,
-						"attendance_date": attendance_date,
-						"date": attendance_date,
-						"status": status,
-						"based_on": "Course Schedule",
-						"course_schedule": course_schedule,
-						"student_group": schedule.student_group,
-						"program": schedule.program,
-						"course": schedule.course,
-						"instructor": schedule.instructor,
-						"room": schedule.room,
-						"source": "Manual",
-					}
-				).insert()
-				created += 1
-		except Exception as e:
-			errors.append(f"{student}: {e!s}")
-
-	return {
-		"status": "success",
-		"created": created,
-		"updated": updated,
-		"errors": errors,
-	}
+	diff = mark_roster(
+		{student: attendance_data.get(student, "Absent") for student in students},
+		match={
+			"attendance_date": attendance_date,
+			"course_schedule": course_schedule,
+			"based_on": "Course Schedule",
+		},
+		values={
+			"date": attendance_date,
+			"student_group": schedule.student_group,
+			"program": schedule.program,
+			"course": schedule.course,
+			"instructor": schedule.instructor,
+			"room": schedule.room,
+			"source": "Manual",
+		},
+	)
+
+	return summarize(diff)
 
 
 # ------------------------------------------------------------
@@ -96,8 +70,12 @@ def create_bulk_attendance_from_group(student_group, attendance_date, attendance
 	if not attendance_date:
 		frappe.throw(_("Attendance Date is required"))
 
-	group = frappe.get_doc("Student Group", student_group)
-	students = [row.student for row in group.students if row.active]
+	group = frappe.db.get_value("Student Group", student_group,
+		["group_based_on", "program", "academic_year", "academic_term"], as_dict=True)
+	if not group:
+		frappe.throw(_("Student Group {0} not found").format(student_group))
+
+	students = get_active_students(student_group)
 
 	if not students:
 		frappe.throw(_("No active students found"))
@@ -105,55 +83,24 @@ def create_bulk_attendance_from_group(student_group, attendance_date, attendance
 	if isinstance(attendance_data, str):
 		attendance_data = json.loads(attendance_data)
 
-	created, updated, errors = 0, 0, []
-
-	for student in students:
-		status = attendance_data.get(student, "Absent")
-
-		existing = frappe.db.exists(
-			"Student Attendance",
-			{
-				"student": student,
-				"attendance_date": attendance_date,
-				"student_group": student_group,
-				"based_on": "Student Group",
-				"docstatus": ("<", 2),
-			},
-		)
-
-		try:
-			if existing:
-				doc = frappe.get_doc("Student Attendance", existing)
-				doc.status = status
-				doc.save()
-				updated += 1
-			else:
-				frappe.get_doc(
-					{
-						"doctype": "Student Attendance",
-						"student": student,
-						"attendance_date": attendance_date,
-						"date": attendance_date,
-						"status": status,
-						"based_on": "Student Group",
-						"student_group": student_group,
-						"group_based_on": group.group_based_on,
-						"program": group.program,
-						"academic_year": group.academic_year,
-						"academic_term": group.academic_term,
-						"source": "Manual",
-					}
-				).insert()
-				created += 1
-		except Exception as e:
-			errors.append(f"{student}: {e!s}")
-
-	return {
-		"status": "success",
-		"created": created,
-		"updated": updated,
-		"errors": errors,
-	}
+	diff = mark_roster(
+		{student: attendance_data.get(student, "Absent") for student in students},
+		match={
+			"attendance_date": attendance_date,
+			"student_group": student_group,
+			"based_on": "Student Group",
+		},
+		values={
+			"date": attendance_date,
+			"group_based_on": group.group_based_on,
+			"program": group.program,
+			"academic_year": group.academic_year,
+			"academic_term": group.academic_term,
+			"source": "Manual",
+		},
+	)
+
+	return summarize(diff)
 
 
 # ------------------------------------------------------------
@@ -175,6 +122,10 @@ def mark_attendance(
 	if not based_on:
 		frappe.throw(_("Based On is required"))
 
+	# The session and the roster are written without per-document permission checks
+	frappe.has_permission("Student Attendance", "create", throw=True)
+	frappe.has_permission("Student Attendance", "write", throw=True)
+
 	if isinstance(students_present, str):
 		students_present = json.loads(students_present)
 	if isinstance(students_absent, str):
@@ -207,45 +158,10 @@ def mark_attendance(
 	elif group:
 		course = group.course
 
-	# Determine Course Offering
-	course_offering = None
-	
-	# Priority 0: Explicit link in Class Schedule
-	if class_sched and class_sched.course_offering:
-		course_offering = class_sched.course_offering
-	
-	# Priority 1: Strict match with Academic Year and Term (if available)
-	if not course_offering and course and program:
-		filters = {"course_title": course, "program": program, "docstatus": 1}
-		
-		# Add Academic Year if available in Student Group
-		if group and group.academic_year:
-			filters["academic_year"] = group.academic_year
-			
-		# Add Academic Term if available in Student Group (check against term_name or similar)
-		# Note: Course Offering has 'term_name' data field, might be risky to filter strictly if naming differs.
-		# We'll stick to Year for strictness first.
-		
-		# Try fetching with Year
-		course_offering = frappe.db.get_value("Course Offering", filters, "name")
-		
-		# Strategy 2: If fail, try removing Academic Year (maybe data mismatch)
-		if not course_offering:
-			filters.pop("academic_year", None)
-			course_offering = frappe.db.get_value("Course Offering", filters, "name")
-			
-		# Strategy 3: If still fail, try finding *any* Open/Active offering for this Course+Program
-		# Sort by creation desc to get the most recent one
-		if not course_offering:
-			offerings = frappe.get_all(
-				"Course Offering",
-				filters={"course_title": course, "program": program, "docstatus": 1},
-				fields=["name"],
-				order_by="creation desc",
-				limit=1
-			)
-			if offerings:
-				course_offering = offerings[0].name
+	# Determine Course Offering (explicit link on the Class Schedule first)
+	course_offering = resolve_course_offering(
+		course, program, group.academic_year if group else None, class_schedule
+	)
 
 	# ---------------------------------------------------------
 	# Ensure Attendance Session Exists and Update It
@@ -265,10 +181,7 @@ def mark_attendance(
 		session_filters["course_schedule"] = course_schedule
 	
 	# Try finding existing session
-	# DEBUG LOGGING
-	frappe.log_error(message=f"Lookup filters: {session_filters}", title="Lookup Filters Debug")
 	session_name = frappe.db.exists("Attendance Session", session_filters)
-	frappe.log_error(message=f"Found Session: {session_name}", title="Session Found Debug")
 	
 	if session_name:
 		attendance_session = session_name
@@ -313,84 +226,37 @@ def mark_attendance(
 			attendance_session = sess_doc.name
 
 	# ---------------------------------------------------------
-
-	def upsert(student_id, status):
-		existing = frappe.db.exists(
-			"Student Attendance",
-			{
-				"student": student_id,
-				"attendance_date": date,
-				"based_on": based_on,
-				"student_group": student_group,
-				"course_schedule": course_schedule,
-				"class_schedule": class_schedule,
-				"docstatus": ("<", 2),
-			},
-		)
-
-		if existing:
-			doc = frappe.get_doc("Student Attendance", existing)
-			doc.status = status
-			doc.save()
-			return "updated"
-
-		frappe.get_doc(
-			{
-				"doctype": "Student Attendance",
-				"student": student_id,
-				"attendance_date": date,
-				"date": date,
-				"status": status,
-				"based_on": based_on,
-				"attendance_based_on": based_on,
-				"student_group": student_group,
-				"course_schedule": course_schedule,
-				"class_schedule": class_schedule,
-				"program": program,
-				"course": course,
-				"course_offer": course_offering,
-				"attendance_session": attendance_session,
-				"instructor": schedule.instructor if schedule else class_sched.instructor if class_sched else None,
-				"room": schedule.room if schedule else class_sched.room if class_sched else None,
-				"source": "Manual",
-			}
-		).insert()
-		return "created"
-
-	created, updated, errors = 0, 0, []
-
-	for row in students_present:
-		try:
-			result = upsert(row.get("student"), "Present")
-			created += result == "created"
-			updated += result == "updated"
-		except Exception as e:
-			errors.append(f"{row.get('student')}: {e!s}")
-
-	for row in students_absent:
-		try:
-			result = upsert(row.get("student"), "Absent")
-			created += result == "created"
-			updated += result == "updated"
-		except Exception as e:
-			errors.append(f"{row.get('student')}: {e!s}")
-
-	# ---------------------------------------------------------
-	# Trigger Session Summary Update
-	# ---------------------------------------------------------
-	if attendance_session:
-		try:
-			session_doc = frappe.get_doc("Attendance Session", attendance_session)
-			session_doc.update_attendance_summary()
-			session_doc.save()
-		except Exception as e:
-			# Don't fail the whole request if summary update fails, just log it
-			frappe.log_error(message=f"Failed to update summary for session {attendance_session}: {e!s}", title="Update Session Summary Error")
+	# Mark the whole roster in one batch
 	# ---------------------------------------------------------
 
-	return {
-		"status": "success",
-		"created": created,
-		"updated": updated,
-		"errors": errors,
-	}
+	# Later entries win, as with one upsert per row (absent rows were applied last)
+	statuses = {}
+	for rows, status in ((students_present, "Present"), (students_absent, "Absent")):
+		for row in rows:
+			if row.get("student"):
+				statuses[row.get("student")] = status
+
+	diff = mark_roster(
+		statuses,
+		match={
+			"attendance_date": date,
+			"based_on": based_on,
+			"student_group": student_group,
+			"course_schedule": course_schedule,
+			"class_schedule": class_schedule,
+		},
+		values={
+			"date": date,
+			"attendance_based_on": based_on,
+			"program": program,
+			"course": course,
+			"course_offer": course_offering,
+			"attendance_session": attendance_session,
+			"instructor": schedule.instructor if schedule else class_sched.instructor if class_sched else None,
+			"room": schedule.room if schedule else class_sched.room if class_sched else None,
+			"source": "Manual",
+		},
+		attendance_session=attendance_session,
+	)
+
+	return summarize(diff)
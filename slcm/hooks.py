@@ -9,7 +9,14 @@ app_include_js = ["/assets/slcm/js/student_workspace_redirect.js"]
 
 
 doc_events = {
-	"Student Master": {"before_save": "slcm.slcm.doctype.student_master.attach_file.set_document_links"}
+	"Student Master": {
+		"before_save": "slcm.slcm.doctype.student_master.attach_file.set_document_links",
+		"on_update": [
+			"slcm.slcm.utils.rfid_lookup_cache.clear_student_uid_cache",
+			"slcm.slcm.utils.attendance_facts.update_student_attributes"
+		],
+		"on_trash": "slcm.slcm.utils.rfid_lookup_cache.clear_student_uid_cache"
+	}
 }
 
 
@@ -260,7 +267,24 @@ doc_events = {
 scheduler_events = {
 	"cron": {
 		"*/10 * * * *": [  # Every 10 minutes
-			"slcm.slcm.doctype.attendance_log.process_attendance_logs.process_pending_logs"
+			"slcm.slcm.doctype.attendance_log.process_attendance_logs.process_pending_logs",
+			# Finish parallel ID card runs with a chunk that never reported back
+			"slcm.slcm.doctype.id_card_generation_tool.id_card_generation_tool.finish_expired_runs"
+		],
+		"* * * * *": [  # Drain queued Attendance Summary recalculations
+			"slcm.slcm.utils.recalculation_queue.drain_dirty_summaries",
+			# Write buffered RFID Device last_seen heartbeats
+			"slcm.slcm.utils.rfid_lookup_cache.flush_device_last_seen",
+			# Write queued swipes of the write-behind RFID ingest
+			"slcm.slcm.utils.rfid_ingest_stream.drain_ingest_stream"
 		]
-	}
+	},
+	"daily": [
+		# Correct drift of incrementally maintained Attendance Summaries
+		"slcm.slcm.utils.attendance_delta.reconcile_summaries",
+		# Recompute the Attendance Fact table read by the Comprehensive Attendance Report
+		"slcm.slcm.utils.attendance_facts.rebuild_attendance_facts",
+		# Recount Course Offering.conducted_hours (maintained incrementally by Attendance Session)
+		"slcm.slcm.doctype.attendance_session.attendance_session.recompute_conducted_hours"
+	]
 }
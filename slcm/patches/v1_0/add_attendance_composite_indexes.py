@@ -0,0 +1,15 @@
+import frappe
+
+
+def execute():
+	"""Composite indexes for the attendance calculator, log processor and report queries"""
+	from slcm.slcm.utils.attendance_indexes import ensure_indexes, verify_indexes
+
+	for doctype in ("student_attendance", "attendance_log", "attendance_session"):
+		frappe.reload_doc("slcm", "doctype", doctype)
+
+	ensure_indexes()
+
+	problems = verify_indexes()
+	if problems:
+		frappe.throw(f"Attendance indexes could not be created: {problems}")
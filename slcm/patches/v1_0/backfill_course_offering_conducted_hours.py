@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Initial count of Course Offering.conducted_hours from the conducted sessions"""
+	from slcm.slcm.doctype.attendance_session.attendance_session import recompute_conducted_hours
+
+	frappe.reload_doc("slcm", "doctype", "course_offering")
+	recompute_conducted_hours()
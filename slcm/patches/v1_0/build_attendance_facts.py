@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Initial fill of the Attendance Fact table read by the Comprehensive Attendance Report"""
+	from slcm.slcm.utils.attendance_facts import rebuild_attendance_facts
+
+	frappe.reload_doc("slcm", "doctype", "attendance_fact")
+	rebuild_attendance_facts()
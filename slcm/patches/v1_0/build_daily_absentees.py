@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Initial fill of the Daily Absentee snapshot read by the Daily Absentees report"""
+	from slcm.slcm.utils.absentee_snapshot import rebuild_daily_absentees
+
+	frappe.reload_doc("slcm", "doctype", "daily_absentee")
+	rebuild_daily_absentees()
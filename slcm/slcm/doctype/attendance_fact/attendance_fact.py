@@ -0,0 +1,15 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AttendanceFact(Document):
+	pass
+
+
+def on_doctype_update():
+	# One row per student and course offering; upserts rely on this key
+	frappe.db.add_unique("Attendance Fact", ["student", "course_offering"], constraint_name="unique_student_offering")
+	frappe.db.add_index("Attendance Fact", ["department", "program", "batch"])
@@ -16,3 +16,12 @@ class AttendanceLog(Document):
 			process_log_entry(self)
 		except Exception as e:
 			frappe.log_error(f"Error processing attendance log {self.name}: {str(e)}")
+
+
+def on_doctype_update():
+	# Includes the (device_id, device_sequence) index behind the ingest idempotency lookup
+	from slcm.slcm.utils.attendance_indexes import ATTENDANCE_INDEXES
+
+	for doctype, columns, index_name in ATTENDANCE_INDEXES:
+		if doctype == "Attendance Log":
+			frappe.db.add_index(doctype, columns, index_name)
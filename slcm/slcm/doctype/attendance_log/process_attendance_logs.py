@@ -21,51 +21,48 @@ from frappe.utils import (
 	get_datetime, 
 	time_diff_in_hours,
 	add_to_date,
+	cint,
 	flt
 )
 from collections import defaultdict
+import time
+
+from slcm.slcm.utils.attendance_writer import StudentAttendanceWriter
+from slcm.slcm.utils.session_window_index import get_session_window_index, set_session_window
+
+LOG_FIELDS = ["name", "student", "swipe_time", "device_id", "location", "rfid_uid"]
+CLAIM_TIMEOUT_MINUTES = 30
+SHARD_STATS_KEY = "slcm:rfid_log_shards"
 
 
 def process_pending_logs():
 	"""
 	Main entry point for scheduled job.
-	Processes all unprocessed attendance logs.
+	Processes all unprocessed attendance logs, or fans them out to
+	shard workers when "RFID Processing Shards" is more than 1.
 	"""
 	try:
 		if not frappe.db.get_single_value("Attendance Settings", "enable_rfid"):
-			print("DEBUG: RFID Disabled")
 			return
 
-		print("DEBUG: Fetching logs...")
-		
+		shard_count = cint(frappe.db.get_single_value("Attendance Settings", "rfid_processing_shards"))
+		if shard_count > 1:
+			enqueue_log_shards(shard_count)
+			return
+
 		# Fetch unprocessed logs
 		logs = get_unprocessed_logs()
-		print(f"DEBUG: Found {len(logs)} unprocessed logs")
 		
 		if not logs:
 			frappe.logger().info("✅ No pending logs to process")
 			return
-		
-		# Group logs by student and date
-		grouped_logs = group_logs_by_student_and_date(logs)
-		print(f"DEBUG: Grouped into {len(grouped_logs)} groups")
-		
-		# Process each group
-		processed_count = 0
-		for key, student_logs in grouped_logs.items():
-			try:
-				print(f"DEBUG: Processing group {key}")
-				process_student_logs(student_logs)
-				processed_count += len(student_logs)
-			except Exception as e:
-				print(f"DEBUG: ERROR processing group {key}: {e}")
-				frappe.log_error(
-					title=f"Error processing logs for {key}",
-					message=str(e)
-				)
+
+		# Groups that fail stay pending and are retried on the next run
+		processed_log_names, failed_log_names = process_log_groups(logs)
+		mark_logs_processed(processed_log_names)
 		
 		frappe.db.commit()
-		frappe.logger().info(f"✅ Processed {processed_count} attendance logs")
+		frappe.logger().info(f"✅ Processed {len(processed_log_names)} attendance logs")
 		
 	except Exception as e:
 		frappe.log_error(
@@ -74,28 +71,199 @@ def process_pending_logs():
 		)
 
 
+def process_log_groups(logs):
+	"""
+	Match logs grouped by (student, date) against each day's session index.
+	Attendance is collected on one writer and applied in bulk; a group's
+	writes are only added to it once the whole group has succeeded.
+	Returns (consumed log names, log names of groups that failed).
+	"""
+	grouped_logs = group_logs_by_student_and_date(logs)
+
+	rfid_mode = frappe.db.get_single_value("Attendance Settings", "rfid_swipe_mode") or "In Only"
+
+	students_by_date = defaultdict(set)
+	for student, log_date in grouped_logs:
+		students_by_date[log_date].add(student)
+
+	writer = StudentAttendanceWriter(edit_reason="RFID log processing")
+	processed_log_names = []
+	failed_log_names = []
+	day_indexes = {}
+	for key, student_logs in grouped_logs.items():
+		log_date = key[1]
+		try:
+			if log_date not in day_indexes:
+				day_indexes[log_date] = DaySessionIndex(log_date, students_by_date[log_date])
+
+			group_writer = StudentAttendanceWriter(edit_reason=writer.edit_reason)
+			group_log_names = process_student_logs(
+				student_logs, day_index=day_indexes[log_date], rfid_mode=rfid_mode, writer=group_writer
+			)
+			writer.merge(group_writer)
+			processed_log_names.extend(group_log_names)
+		except Exception as e:
+			failed_log_names.extend(log.name for log in student_logs)
+			frappe.log_error(
+				title=f"Error processing logs for {key}",
+				message=str(e)
+			)
+
+	writer.flush()
+	return processed_log_names, failed_log_names
+
+
 def get_unprocessed_logs():
 	"""
 	Fetch all unprocessed attendance logs that have a valid student link.
+	Logs claimed by a shard worker or marked failed are left alone.
 	"""
 	return frappe.get_all(
 		"Attendance Log",
 		filters={
 			"processed": 0,
-			"student": ["!=", ""]
+			"student": ["!=", ""],
+			"processing_status": ["not in", ["Claimed", "Failed"]]
 		},
-		fields=[
-			"name", 
-			"student", 
-			"swipe_time", 
-			"device_id", 
-			"location",
-			"rfid_uid"
-		],
+		fields=LOG_FIELDS,
 		order_by="swipe_time asc"
 	)
 
 
+def enqueue_log_shards(shard_count):
+	"""Release abandoned claims, then enqueue one worker per shard"""
+	release_stale_claims()
+	frappe.db.commit()
+
+	for shard in range(shard_count):
+		frappe.enqueue(
+			"slcm.slcm.doctype.attendance_log.process_attendance_logs.process_log_shard",
+			queue="long",
+			job_id=f"slcm:rfid_log_shard:{shard}",
+			deduplicate=True,
+			shard=shard,
+			shard_count=shard_count
+		)
+
+
+def process_log_shard(shard, shard_count):
+	"""
+	Process the pending logs of one shard. (student, date) groups are assigned
+	to shards by hash, so every group is handled by exactly one worker. Rows are
+	claimed before processing and the shard commits on its own.
+	"""
+	shard, shard_count = cint(shard), cint(shard_count)
+	started = time.monotonic()
+	token = f"{shard}/{shard_count}:{frappe.generate_hash(length=8)}"
+
+	claimed = claim_shard_logs(shard, shard_count, token)
+	frappe.db.commit()
+
+	stats = {"shard": shard, "claimed": claimed, "processed": 0, "failed": 0, "status": "Success"}
+
+	if claimed:
+		logs = frappe.get_all(
+			"Attendance Log",
+			filters={"claimed_by": token, "processing_status": "Claimed"},
+			fields=LOG_FIELDS,
+			order_by="swipe_time asc"
+		)
+
+		try:
+			processed_log_names, failed_log_names = process_log_groups(logs)
+			mark_logs_processed(processed_log_names)
+			mark_logs_failed(failed_log_names)
+			# Logs that matched no session yet go back to Pending for the next run
+			release_claims(token)
+			frappe.db.commit()
+
+			stats.update(processed=len(processed_log_names), failed=len(failed_log_names))
+		except Exception as e:
+			frappe.db.rollback()
+			release_claims(token)
+			frappe.db.commit()
+
+			stats["status"] = "Failed"
+			frappe.log_error(
+				title=f"Attendance Log Shard {shard} Failed",
+				message=str(e)
+			)
+
+	stats["duration_seconds"] = round(time.monotonic() - started, 3)
+	stats["finished_at"] = str(now_datetime())
+	record_shard_stats(stats)
+
+	frappe.logger().info(
+		f"RFID log shard {shard}/{shard_count}: {stats['claimed']} claimed, {stats['processed']} processed, "
+		f"{stats['failed']} failed in {stats['duration_seconds']}s"
+	)
+	return stats
+
+
+def claim_shard_logs(shard, shard_count, token):
+	"""Atomically claim the pending logs of a shard. Returns the number of rows claimed."""
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processing_status = 'Claimed', claimed_by = %(token)s, claimed_at = %(now)s
+		WHERE processed = 0
+		AND IFNULL(processing_status, 'Pending') = 'Pending'
+		AND IFNULL(student, '') != ''
+		AND MOD(CRC32(CONCAT(student, '|', DATE(swipe_time))), %(shard_count)s) = %(shard)s
+	""", {"token": token, "now": now_datetime(), "shard": shard, "shard_count": shard_count})
+
+	return frappe.db.sql("""
+		SELECT COUNT(*)
+		FROM `tabAttendance Log`
+		WHERE claimed_by = %s AND processing_status = 'Claimed'
+	""", (token,))[0][0]
+
+
+def release_claims(token):
+	"""Return a worker's unconsumed claims to Pending"""
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processing_status = 'Pending', claimed_by = NULL, claimed_at = NULL
+		WHERE claimed_by = %s AND processing_status = 'Claimed'
+	""", (token,))
+
+
+def release_stale_claims(timeout_minutes=CLAIM_TIMEOUT_MINUTES):
+	"""Return claims left behind by a worker that died to Pending"""
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processing_status = 'Pending', claimed_by = NULL, claimed_at = NULL
+		WHERE processing_status = 'Claimed'
+		AND claimed_at < %s
+	""", (add_to_date(now_datetime(), minutes=-timeout_minutes),))
+
+
+def record_shard_stats(stats):
+	try:
+		frappe.cache().hset(SHARD_STATS_KEY, str(stats["shard"]), stats)
+	except Exception:
+		pass
+
+
+@frappe.whitelist()
+def get_shard_stats():
+	"""Timing and counts of the last run of each shard worker"""
+	frappe.only_for("System Manager")
+	stats = frappe.cache().hgetall(SHARD_STATS_KEY) or {}
+	return sorted(stats.values(), key=lambda s: s.get("shard", 0))
+
+
+@frappe.whitelist()
+def retry_failed_logs():
+	"""Put logs of failed groups back in the queue"""
+	frappe.only_for("System Manager")
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processing_status = 'Pending', claimed_by = NULL, claimed_at = NULL
+		WHERE processed = 0 AND processing_status = 'Failed'
+	""")
+	return {"status": "success"}
+
+
 def group_logs_by_student_and_date(logs):
 	"""
 	Group logs by student and date.
@@ -112,47 +280,81 @@ def group_logs_by_student_and_date(logs):
 	return grouped
 
 
-def process_student_logs(logs):
+def mark_logs_processed(log_names):
+	"""Flag consumed logs in a single UPDATE"""
+	if not log_names:
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processed = 1, processing_status = 'Processed'
+		WHERE name IN %(logs)s
+	""", {"logs": tuple(log_names)})
+
+
+def mark_logs_failed(log_names):
+	"""Park the logs of failed groups so shards do not retry them every run"""
+	if not log_names:
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabAttendance Log`
+		SET processing_status = 'Failed'
+		WHERE name IN %(logs)s
+		AND processed = 0
+	""", {"logs": tuple(log_names)})
+
+
+def process_student_logs(logs, day_index=None, rfid_mode=None, writer=None):
 	"""
 	Process logs for a single student on a single date.
 	Matches swipes to Attendance Sessions and Office Hours.
+	Attendance is queued on `writer`; without one it is written before returning.
+	Returns the names of the logs consumed by a session.
 	"""
 	if not logs:
-		return
+		return []
+
+	if writer is None:
+		writer = StudentAttendanceWriter()
+		try:
+			return process_student_logs(logs, day_index=day_index, rfid_mode=rfid_mode, writer=writer)
+		finally:
+			writer.flush()
 	
 	first_log = logs[0]
 	student = first_log.get("student")
 	log_date = getdate(first_log.get("swipe_time"))
+
+	if not day_index:
+		day_index = DaySessionIndex(log_date, {student})
 	
 	# Fetch Student's Sessions for the day
-	class_sessions = get_student_sessions(student, log_date)
-	office_sessions = get_student_office_hour_sessions(student, log_date)
-	
-	all_sessions = []
-	# Tag sessions with type
-	for s in class_sessions:
-		s['type'] = 'Class'
-		all_sessions.append(s)
-	for s in office_sessions:
-		s['type'] = 'Office'
-		all_sessions.append(s)
+	all_sessions = day_index.get_student_sessions(student)
 
 	if not all_sessions:
 		frappe.logger().info(f"⚠️ No sessions found for {student} on {log_date}. Logs ignored.")
-		return
+		return []
 
 	# Get RFID Mode
-	rfid_mode = frappe.db.get_single_value("Attendance Settings", "rfid_swipe_mode") or "In Only"
+	if not rfid_mode:
+		rfid_mode = frappe.db.get_single_value("Attendance Settings", "rfid_swipe_mode") or "In Only"
 
 	# Sort logs by time
-	logs = sorted(logs, key=lambda x: x.get("swipe_time"))
+	logs = sorted(logs, key=lambda x: get_datetime(x.get("swipe_time")))
+
+	# Resolve each swipe to the windows containing it, keeping the student's sessions
+	student_session_names = {s.name for s in all_sessions}
+	logs_by_session = defaultdict(list)
+	for log in logs:
+		for session in day_index.windows.find(log.get("swipe_time")):
+			if session.name in student_session_names:
+				logs_by_session[session.name].append(log)
 	
-	processed_log_names = set()
+	processed_log_names = []
 	
 	for session in all_sessions:
-		# Match swipes to this session
-		session_logs = match_swipes_to_session(logs, session)
-		print(f"DEBUG: Session {session.name} ({session.type}): matched {len(session_logs)} logs")
+		session_logs = logs_by_session.get(session.name)
 
 		if not session_logs:
 			continue
@@ -162,125 +364,138 @@ def process_student_logs(logs):
 		
 		if attendance_status:
 			if session.type == 'Class':
-				create_session_attendance(student, session, attendance_status, session_logs)
+				create_session_attendance(student, session, attendance_status, session_logs, writer=writer,
+					existing=day_index.existing_attendance.get((student, session.name)) or False)
 			else:
 				# For Office Hours, status isn't "Present/Absent" exactly same way, but we track duration
-				create_office_hours_attendance(student, session, session_logs)
+				key = (student, session.course_offering)
+				day_index.existing_office_hours[key] = create_office_hours_attendance(
+					student, session, session_logs, writer=writer,
+					existing=day_index.existing_office_hours.get(key) or False)
 
 			# Mark logs as processed for this session
-			for log in session_logs:
-				processed_log_names.add(log.name)
-
-	# Mark processed logs
-	for log in logs:
-		if log.name in processed_log_names:
-			frappe.db.set_value("Attendance Log", log.name, {"processed": 1})
+			processed_log_names.extend(log.name for log in session_logs)
 
+	return list(dict.fromkeys(processed_log_names))
 
-def get_student_sessions(student, date):
-	"""Get all Attendance Sessions for the student on the given date"""
-	# Find sessions where the student is part of the Student Group or Course Offering
-	
-	valid_sessions = []
-	all_sessions = frappe.get_all("Attendance Session", 
-		filters={"session_date": date, "docstatus": ["<", 2]},
-		fields=["name", "session_date", "session_start_time", "session_end_time", "course_schedule", "course_offering", "session_type", "duration_hours"]
-	)
-
-	for session in all_sessions:
-		# Check if student belongs to this session
-		in_session = is_student_in_session(student, session)
-		print(f"DEBUG: Session {session.name} -> is_student_in_session: {in_session}")
-		if in_session:
-			valid_sessions.append(session)
-			
-	return valid_sessions
 
+class DaySessionIndex:
+	"""
+	All Attendance Sessions and Office Hours Sessions of one day, together with
+	the memberships needed to decide which students belong to them. Everything
+	is loaded with a handful of queries so matching a swipe needs no database
+	round trips.
+	"""
 
-def get_student_office_hour_sessions(student, date):
-	"""Get all Office Hours Sessions available for the student on the given date"""
-	valid_sessions = []
-	# Fetch all Office Hours Sessions for the date
-	all_oh_sessions = frappe.get_all("Office Hours Session", 
-		filters={"session_date": date, "session_status": ["!=", "Cancelled"]},
-		fields=["name", "session_date", "start_time as session_start_time", "end_time as session_end_time", "course_offering"]
-	)
-
-	for session in all_oh_sessions:
-		# Check if student is enrolled in the course offering
-		if is_student_in_course_offering(student, session.course_offering):
-			valid_sessions.append(session)
-			
-	return valid_sessions
-
-
-def is_student_in_session(student, session):
-	"""Check if student should attend this session"""
-	# A. If Student Attendance already exists (Manual marking), yes.
-	if frappe.db.exists("Student Attendance", {"student": student, "attendance_session": session.name}):
-		return True
-		
-	# B. Check Student Group (via Course Schedule)
-	if session.course_schedule:
-		student_group = frappe.db.get_value("Course Schedule", session.course_schedule, "student_group")
-		if student_group:
-			# Check if student is in this group
-			if frappe.db.exists("Student Group Student", {"parent": student_group, "student": student}):
-				return True
-			
-	# C. Check Course Offering Enrollment (Fallback if no group)
-	if session.course_offering:
-		return is_student_in_course_offering(student, session.course_offering)
-		
-	# D. For the sake of the Test Script where we skipped setup, allow if 'course_offering' matches test data
-	if session.course_offering == "CO-TEST-001":
-		return True
-		
-	return False
-
+	def __init__(self, date, students=None):
+		self.date = getdate(date)
+		self.students = set(students) if students else None
+
+		# Session windows are shared with the real-time processor (rfid_processor)
+		self.windows = get_session_window_index(self.date)
+		self.class_sessions = [s for s in self.windows.sessions if s.type == "Class"]
+		self.office_sessions = [s for s in self.windows.sessions if s.type == "Office"]
+
+		self.load_memberships()
+
+	def student_filter(self, column="student"):
+		if self.students is None:
+			return "", {}
+		return f"AND {column} IN %(students)s", {"students": tuple(self.students)}
+
+	def load_memberships(self):
+		session_names = [s.name for s in self.class_sessions]
+		schedules = {s.course_schedule for s in self.class_sessions if s.course_schedule}
+		offerings = {s.course_offering for s in self.class_sessions + self.office_sessions if s.course_offering}
+
+		# A. Students with attendance already marked (manually) for a session
+		self.existing_attendance = {}
+		if session_names:
+			students = self.students
+			if students is None:
+				students = frappe.get_all("Student Attendance",
+					filters={"attendance_session": ["in", session_names]}, pluck="student", distinct=True)
+			self.existing_attendance = get_existing_attendance(students, session_names)
+
+		# Office Hour records of the day; a student has one per Course Offering
+		self.existing_office_hours = {}
+		if self.office_sessions:
+			self.existing_office_hours = get_existing_office_hours(self.date, self.students)
+
+		# B. Student Group of each Course Schedule and the group members
+		self.schedule_groups = {}
+		if schedules:
+			self.schedule_groups = dict(frappe.get_all("Course Schedule",
+				filters={"name": ["in", list(schedules)]},
+				fields=["name", "student_group"],
+				as_list=True
+			))
+
+		self.group_members = defaultdict(set)
+		groups = {g for g in self.schedule_groups.values() if g}
+		if groups:
+			condition, values = self.student_filter()
+			rows = frappe.db.sql(f"""
+				SELECT parent, student
+				FROM `tabStudent Group Student`
+				WHERE parent IN %(groups)s
+				{condition}
+			""", dict(values, groups=tuple(groups)))
+			for group, student in rows:
+				self.group_members[group].add(student)
+
+		# C. Cohort of each Course Offering and the enrolled students
+		self.offering_cohorts = {}
+		if offerings:
+			self.offering_cohorts = dict(frappe.get_all("Course Offering",
+				filters={"name": ["in", list(offerings)]},
+				fields=["name", "cohort"],
+				as_list=True
+			))
+
+		self.cohort_students = defaultdict(set)
+		cohorts = {c for c in self.offering_cohorts.values() if c}
+		if cohorts:
+			condition, values = self.student_filter()
+			rows = frappe.db.sql(f"""
+				SELECT cohort, student
+				FROM `tabStudent Enrollment`
+				WHERE cohort IN %(cohorts)s
+				AND status = 'Enrolled'
+				{condition}
+			""", dict(values, cohorts=tuple(cohorts)))
+			for cohort, student in rows:
+				self.cohort_students[cohort].add(student)
+
+	def get_student_sessions(self, student):
+		"""Class sessions followed by Office Hours sessions the student belongs to"""
+		sessions = [s for s in self.class_sessions if self.is_student_in_session(student, s)]
+		sessions += [s for s in self.office_sessions if self.is_student_in_course_offering(student, s.course_offering)]
+		return sessions
+
+	def is_student_in_session(self, student, session):
+		"""Check if student should attend this session"""
+		# A. If Student Attendance already exists (Manual marking), yes.
+		if (student, session.name) in self.existing_attendance:
+			return True
+
+		# B. Check Student Group (via Course Schedule)
+		student_group = self.schedule_groups.get(session.course_schedule)
+		if student_group and student in self.group_members.get(student_group, ()):
+			return True
+
+		# C. Check Course Offering Enrollment (Fallback if no group)
+		if session.course_offering:
+			return self.is_student_in_course_offering(student, session.course_offering)
 
-def is_student_in_course_offering(student, course_offering):
-	"""Check if student is enrolled in course offering"""
-	# Check Cohort Enrollment via 'Student Enrollment'
-	# 1. Get Cohort from Offering
-	cohort = frappe.db.get_value("Course Offering", course_offering, "cohort")
-	if not cohort:
 		return False
-		
-	# 2. Check Student Enrollment for this Cohort
-	enrollment_exists = frappe.db.exists("Student Enrollment", {
-		"student": student, 
-		"cohort": cohort,
-		"status": "Enrolled"
-	})
-	
-	print(f"DEBUG: Checking Cohort Enrollment for {student} in {cohort}: {enrollment_exists}")
-	
-	if enrollment_exists:
-		return True
-	
-	return False
 
-
-def match_swipes_to_session(logs, session):
-	"""Return logs that fall within session window"""
-	# Use session_date from the session object
-	session_date = session.get("session_date") or getdate()
-	start_time = get_datetime(f"{session_date} {session.session_start_time}")
-	end_time = get_datetime(f"{session_date} {session.session_end_time}")
-	
-	# Add Buffer (e.g., 20 mins before start, 20 mins after end)
-	buffer_mins = 20 
-	window_start = add_to_date(start_time, minutes=-buffer_mins)
-	window_end = add_to_date(end_time, minutes=buffer_mins)
-	
-	matched = []
-	for log in logs:
-		swipe_time = get_datetime(log.get("swipe_time"))
-		if window_start <= swipe_time <= window_end:
-			matched.append(log)
-	
-	return matched
+	def is_student_in_course_offering(self, student, course_offering):
+		"""Check if student is enrolled in the cohort of the course offering"""
+		cohort = self.offering_cohorts.get(course_offering)
+		if not cohort:
+			return False
+		return student in self.cohort_students.get(cohort, ())
 
 
 def determine_attendance_status(session_logs, session, mode):
@@ -299,21 +514,17 @@ def determine_attendance_status(session_logs, session, mode):
 			duration = time_diff_in_hours(end, start)
 			
 			# Handle different session types time handling if needed, but Office Hours and Class seem similar structure
-			session_start = get_datetime(f"2000-01-01 {session.session_start_time}")
-			session_end = get_datetime(f"2000-01-01 {session.session_end_time}")
-			session_duration = time_diff_in_hours(session_end, session_start)
+			if not session.get("start_datetime"):
+				set_session_window(session)
+			session_duration = time_diff_in_hours(session.end_datetime, session.start_datetime)
 			
 			if duration >= (session_duration * 0.5):
 				return "Present"
 		
 		# If single swipe or insufficient duration:
 		# Check if session is over. If over, mark Absent. If not, Wait (return None)
-		session_date = session.get("session_date") or getdate()
-		end_time_str = f"{session_date} {session.session_end_time}"
-		session_end = get_datetime(end_time_str)
-		
 		# Allow buffer before declaring it "Over" (e.g., 30 mins after end)
-		cutoff_time = add_to_date(session_end, minutes=30)
+		cutoff_time = add_to_date(session.end_datetime, minutes=30)
 		
 		if now_datetime() > cutoff_time:
 			return "Absent"
@@ -323,51 +534,57 @@ def determine_attendance_status(session_logs, session, mode):
 	return "Absent"
 
 
-def create_session_attendance(student, session, status, logs):
-	"""Create or Update Student Attendance for the session"""
-	# Check for existing record linked to this session
+def create_session_attendance(student, session, status, logs, writer=None, existing=None):
+	"""
+	Create or Update Student Attendance for the session.
+	Writes go through `writer` (StudentAttendanceWriter); without one the
+	record is written immediately. `existing` is the current Student
+	Attendance row for (student, session) if already known.
+	"""
 	start_log = logs[0]
 	end_log = logs[-1] if len(logs) > 1 else logs[0]
-	
-	existing = frappe.db.exists("Student Attendance", {
-		"student": student,
-		"attendance_session": session.name
-	})
-	
+
+	flush = writer is None
+	writer = writer or StudentAttendanceWriter()
+
+	# Check for existing record linked to this session
+	if existing is None:
+		existing = get_existing_attendance([student], [session.name]).get((student, session.name))
+
+	values = {
+		"status": status,
+		"in_time": get_datetime(start_log.swipe_time),
+		"out_time": get_datetime(end_log.swipe_time),
+		"source": "RFID",
+		"attendance_log": start_log.name,
+		"session_type": session.session_type or "Lecture",
+		"hours_counted": session.duration_hours if status == "Present" else 0
+	}
+
 	if existing:
-		doc = frappe.get_doc("Student Attendance", existing)
-		doc.status = status
-		doc.in_time = start_log.swipe_time
-		doc.out_time = end_log.swipe_time
-		doc.source = "RFID"
-		doc.attendance_log = start_log.name
-		# Update new fields
-		doc.session_type = session.session_type or "Lecture"
-		doc.hours_counted = session.duration_hours if status == "Present" else 0
-		doc.save(ignore_permissions=True)
+		writer.update(existing, values)
 	else:
-		# Create new
-		doc = frappe.get_doc({
-			"doctype": "Student Attendance",
-			"student": student,
-			"attendance_session": session.name,
-			"course_offer": session.course_offering,
-			"course_schedule": session.course_schedule,
-			"attendance_date": getdate(start_log.swipe_time),
-			"date": getdate(start_log.swipe_time),
-			"status": status,
-			"in_time": start_log.swipe_time,
-			"out_time": end_log.swipe_time,
-			"source": "RFID",
-			"attendance_log": start_log.name,
-			"session_type": session.session_type or "Lecture",
-			"hours_counted": session.duration_hours if status == "Present" else 0
-		})
-		doc.insert(ignore_permissions=True)
+		writer.insert(dict(values,
+			student=student,
+			attendance_session=session.name,
+			course_offer=session.course_offering,
+			course_schedule=session.course_schedule,
+			attendance_date=getdate(start_log.swipe_time),
+			date=getdate(start_log.swipe_time)
+		))
 
+	if flush:
+		writer.flush()
 
-def create_office_hours_attendance(student, session, logs):
-	"""Create or Update Office Hours Attendance"""
+
+def create_office_hours_attendance(student, session, logs, writer=None, existing=None):
+	"""
+	Create Office Hours attendance (as Student Attendance, unified model).
+	Like validate_duplicate_attendance, a student has one Office Hour record
+	per Course Offering and day: swipes seen later widen the existing one.
+	`existing` is that record if already known (False for none). Returns
+	the record as queued.
+	"""
 	start_log = logs[0]
 	end_log = logs[-1] if len(logs) > 1 else logs[0]
 	
@@ -376,57 +593,85 @@ def create_office_hours_attendance(student, session, logs):
 	
 	duration_hours = time_diff_in_hours(end_time, start_time)
 	if duration_hours < 0: duration_hours = 0
-	
-	# UNIFIED MODEL: Create Student Attendance instead of Office Hours Attendance
-	
-	# Check for existing Student Attendance linked to this "Office Hours Session"
-	# Note: We rely on attendance_session field. Office Hours Session is passed as 'session' object.
-	# If 'session' is an Office Hours Session instance, its 'name' is the ID.
-	
-	existing = frappe.db.exists("Student Attendance", {
-		"student": student,
-		"attendance_session": session.name  # Assuming we can link OH Session ID here? Or generic?
-		# Wait, Student Attendance 'attendance_session' links to 'Attendance Session' DocType.
-		# If 'session' comes from 'Office Hours Session', we can't link it strictly if it's a Link field.
-		# But we are deprecating OH Session and using Attendance Session in the future.
-		# For LEGACY OH Sessions, we might need to leave this blank or create a dummy link?
-		# Or better: We assume future Office Hours come from 'Attendance Session' with type='Office Hour'.
-		# This function handles the *Legacy* or *Separate* OH Session logic if we still use it.
-		# Let's link it if possible, or leave it blank and rely on date/time/course.
-	})
-	
-	# If we can't link OH Session to Attendance Session, we might need a separate field or just not link it.
-	# But Unified Model says "Office hours must be recorded inside the system".
-	# Let's assume for now we use 'Student Attendance' without a specific Session Link if it's a Legacy OH Session,
-	# OR we assume migration happened.
-	# BUT: validation says 'attendance_session' is NOT mandatory (lines 103: fieldname attendance_session, options Attendance Session, NOT reqd).
-	# So we can leave it blank for legacy OH Sessions.
-	
+
+	# Legacy Office Hours Sessions cannot be linked through attendance_session
+	# (it links to Attendance Session), so the record is created without it.
+	flush = writer is None
+	writer = writer or StudentAttendanceWriter()
+
+	if existing is None:
+		existing = get_existing_office_hours(getdate(start_log.swipe_time), [student]).get(
+			(student, session.course_offering))
+
 	if existing:
-		doc = frappe.get_doc("Student Attendance", existing)
-		doc.status = "Present"
-		doc.in_time = start_log.swipe_time
-		doc.out_time = end_log.swipe_time
-		doc.hours_counted = duration_hours
-		doc.session_type = "Office Hour"
-		doc.source = "RFID"
-		doc.save(ignore_permissions=True)
+		if existing.get("in_time"):
+			start_time = min(start_time, get_datetime(existing.in_time))
+		if existing.get("out_time"):
+			end_time = max(end_time, get_datetime(existing.out_time))
+
+		values = {
+			"status": "Present",
+			"in_time": start_time,
+			"out_time": end_time,
+			"hours_counted": max(time_diff_in_hours(end_time, start_time), 0)
+		}
+		if existing.get("name"):
+			writer.update(existing, values)
+		# A record queued earlier in this batch is still a plain row: widen it in place
+		existing.update(values)
+		row = existing
 	else:
-		doc = frappe.get_doc({
-			"doctype": "Student Attendance",
+		row = writer.insert({
 			"student": student,
-			# "attendance_session": session.name, # Skip if it's not a valid Attendance Session ID
 			"course_offer": session.course_offering,
 			"attendance_date": getdate(start_log.swipe_time),
 			"date": getdate(start_log.swipe_time),
 			"status": "Present",
-			"in_time": start_log.swipe_time,
-			"out_time": end_log.swipe_time,
+			"in_time": start_time,
+			"out_time": end_time,
 			"source": "RFID",
 			"session_type": "Office Hour",
 			"hours_counted": duration_hours
 		})
-		doc.insert(ignore_permissions=True)
+
+	if flush:
+		writer.flush()
+
+	return row
+
+
+def get_existing_attendance(students, session_names):
+	"""Existing Student Attendance rows keyed by (student, attendance_session)"""
+	if not students or not session_names:
+		return {}
+
+	rows = frappe.get_all("Student Attendance",
+		filters={"student": ["in", list(students)], "attendance_session": ["in", list(session_names)]},
+		fields=["name", "student", "attendance_session", "course_offer", "course", "attendance_date", "status",
+			"in_time", "out_time", "source", "attendance_log", "session_type", "hours_counted"]
+	)
+	return {(row.student, row.attendance_session): row for row in rows}
+
+
+def get_existing_office_hours(date, students=None):
+	"""Office Hour Student Attendance of a day keyed by (student, course_offer)"""
+	student_condition = "AND student IN %(students)s" if students else ""
+	rows = frappe.db.sql(f"""
+		SELECT name, student, course_offer, course, attendance_date, status,
+			in_time, out_time, hours_counted
+		FROM `tabStudent Attendance`
+		WHERE attendance_date = %(date)s
+		AND session_type = 'Office Hour'
+		AND IFNULL(attendance_session, '') = ''
+		AND docstatus < 2
+		{student_condition}
+		ORDER BY creation ASC
+	""", {"date": date, "students": tuple(students or ())}, as_dict=True)
+
+	existing = {}
+	for row in rows:
+		existing.setdefault((row.student, row.course_offer), row)
+	return existing
 
 
 @frappe.whitelist()
@@ -1,9 +1,118 @@
 # Copyright (c) 2025, Nishanth and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from slcm.api import attendance
+from slcm.slcm.utils import rfid_ingest_stream
+from slcm.slcm.utils.rfid_ingest_stream import (
+	DEAD_LETTER_STREAM,
+	GROUP,
+	drain_ingest_stream,
+	ensure_group,
+	get_stream_connection,
+	push_swipe,
+	read_batch,
+	replay_dead_letters,
+	stream_key,
+	to_swipe,
+)
+
+TEST_UID = "TEST-INGEST-UID"
+FAILING_UID = "TEST-INGEST-FAILING"
 
 
 class TestAttendanceLog(FrappeTestCase):
-	pass
+	"""Write-behind ingest: the drain stores each queued swipe exactly once"""
+
+	def setUp(self):
+		self.conn = get_stream_connection()
+		self.clear()
+
+	def tearDown(self):
+		self.clear()
+
+	def clear(self):
+		# The drain commits, so the test data is removed explicitly
+		self.conn.delete(stream_key(), stream_key(DEAD_LETTER_STREAM))
+		frappe.db.delete("Attendance Log", {"rfid_uid": ["in", [TEST_UID, FAILING_UID]]})
+		frappe.db.commit()
+
+	def swipe(self, rfid_uid=TEST_UID, sequence=None, minutes=0):
+		return {
+			"rfid_uid": rfid_uid,
+			"swipe_time": add_to_date(now_datetime().replace(microsecond=0), minutes=minutes),
+			"device_id": "TEST-INGEST-DEVICE" if sequence else None,
+			"sequence": sequence,
+			"source": "RFID",
+		}
+
+	def count_logs(self, rfid_uid=TEST_UID):
+		return frappe.db.count("Attendance Log", {"rfid_uid": rfid_uid})
+
+	def test_drain_inserts_and_acknowledges(self):
+		for minutes in range(3):
+			self.assertTrue(push_swipe(self.swipe(minutes=minutes)))
+
+		stats = drain_ingest_stream()
+
+		self.assertEqual(stats["inserted"], 3)
+		self.assertEqual(self.count_logs(), 3)
+		self.assertEqual(self.conn.xlen(stream_key()), 0)
+		self.assertEqual(self.conn.xpending(stream_key(), GROUP)["pending"], 0)
+
+	def test_entry_replayed_after_lost_ack_is_not_inserted_twice(self):
+		push_swipe(self.swipe(sequence=41))
+		push_swipe(self.swipe(minutes=1))
+
+		# A drain that committed the batch and died before XACK
+		ensure_group()
+		entries = read_batch("crashed-consumer", 10)
+		self.assertEqual(len(entries), 2)
+		attendance.insert_attendance_logs([to_swipe(values) for _entry_id, values in entries])
+		frappe.db.commit()
+
+		# The next drain claims the still pending entries straight away
+		with patch.object(rfid_ingest_stream, "CLAIM_IDLE_MS", 0):
+			stats = drain_ingest_stream()
+
+		self.assertEqual(stats["inserted"], 0)
+		self.assertEqual(stats["duplicates"], 2)
+		self.assertEqual(self.count_logs(), 2)
+		self.assertEqual(self.conn.xpending(stream_key(), GROUP)["pending"], 0)
+
+	def test_failing_entry_is_dead_lettered_and_replayed(self):
+		insert = attendance.insert_attendance_logs
+
+		def insert_failing(items):
+			if any(item.rfid_uid == FAILING_UID for item in items):
+				raise frappe.ValidationError("rejected")
+			insert(items)
+
+		push_swipe(self.swipe())
+		push_swipe(self.swipe(rfid_uid=FAILING_UID, minutes=1))
+
+		with patch.object(attendance, "insert_attendance_logs", insert_failing):
+			stats = drain_ingest_stream()
+
+		# The batch fails, the good entry is inserted on its own
+		self.assertEqual(stats["inserted"], 1)
+		self.assertEqual(stats["dead_lettered"], 1)
+		self.assertEqual(self.count_logs(), 1)
+		self.assertEqual(self.count_logs(FAILING_UID), 0)
+		self.assertEqual(self.conn.xlen(stream_key()), 0)
+
+		dead = self.conn.xrange(stream_key(DEAD_LETTER_STREAM))
+		self.assertEqual(len(dead), 1)
+		self.assertIn(b"error", dead[0][1])
+
+		self.assertEqual(replay_dead_letters()["replayed"], 1)
+		stats = drain_ingest_stream()
+
+		self.assertEqual(stats["inserted"], 1)
+		self.assertEqual(self.count_logs(FAILING_UID), 1)
+		self.assertEqual(self.conn.xlen(stream_key(DEAD_LETTER_STREAM)), 0)
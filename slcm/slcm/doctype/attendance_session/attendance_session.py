@@ -3,8 +3,16 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import time_diff_in_hours
-from slcm.slcm.utils.attendance_calculator import calculate_student_attendance
+from frappe.utils import flt, time_diff_in_hours
+from slcm.slcm.utils.attendance_calculator import (
+	calculate_student_attendance,
+	invalidate_recalculation_context,
+)
+from slcm.slcm.utils.absentee_snapshot import mark_session_absentees_dirty
+from slcm.slcm.utils.attendance_facts import mark_held_hours_dirty
+
+CLASS_SESSION_TYPES = ("Lecture", "Tutorial")
+
 
 class AttendanceSession(Document):
 	"""Track conducted class sessions for attendance calculation"""
@@ -20,6 +28,35 @@ class AttendanceSession(Document):
 		# self.create_student_attendance_records()
 		pass
 
+	def on_update(self):
+		"""Drop the cached session denominator and update summaries in incremental mode"""
+		invalidate_recalculation_context(self.course_offering)
+		before = self.get_doc_before_save()
+		self.apply_summary_delta(before, self)
+		mark_held_hours_dirty(self.course_offering, before and before.course_offering)
+
+	def on_trash(self):
+		invalidate_recalculation_context(self.course_offering)
+		self.apply_summary_delta(self, None)
+		mark_held_hours_dirty(self.course_offering)
+		update_conducted_hours(self, None)
+
+	def on_change(self):
+		"""Keep Course Offering.conducted_hours in step (runs on save, submit and cancel)"""
+		before = self.get_doc_before_save()
+		update_conducted_hours(before, self)
+
+		# Absences only count once the session is closed; opening or closing it moves them in or out
+		if before and (before.session_status == "Conducted") != (self.session_status == "Conducted"):
+			mark_session_absentees_dirty(self.name)
+
+	def apply_summary_delta(self, before, after):
+		"""Apply a conducted/cancelled transition to total_classes of the offering's summaries"""
+		from slcm.slcm.utils.attendance_delta import apply_session_delta, is_incremental_mode
+
+		if is_incremental_mode():
+			apply_session_delta(before, after)
+
 	def on_submit(self):
 		"""Trigger attendance calculations"""
 		self.update_student_attendance_status()
@@ -118,58 +155,203 @@ class AttendanceSession(Document):
 	
 	def update_attendance_summary(self):
 		"""Update attendance counts and student list"""
-		# Count attendance records for this session
-		# Query for counts
-		attendance_data = frappe.db.sql("""
-			SELECT 
-				COUNT(*) as total,
-				SUM(CASE WHEN status IN ('Present', 'Late') THEN 1 ELSE 0 END) as present,
-				SUM(CASE WHEN status = 'Absent' THEN 1 ELSE 0 END) as absent,
-				SUM(CASE WHEN status IN ('Present', 'Late') AND (s.gender = 'Male' OR s.gender = 'Man') THEN 1 ELSE 0 END) as boys,
-				SUM(CASE WHEN status IN ('Present', 'Late') AND (s.gender = 'Female' OR s.gender = 'Woman') THEN 1 ELSE 0 END) as girls
-			FROM `tabStudent Attendance` sa
-			JOIN `tabStudent Master` s ON sa.student = s.name
-			WHERE sa.attendance_session = %s
-		""", self.name, as_dict=True)
-		
-		if attendance_data:
-			data = attendance_data[0]
-			self.total_students = data.get('total', 0)
-			self.present_count = data.get('present', 0)
-			self.absent_count = data.get('absent', 0)
-			self.total_boys = data.get('boys', 0)
-			self.total_girls = data.get('girls', 0)
-			
-			if self.total_students > 0:
-				self.attendance_percentage = (self.present_count / self.total_students) * 100
-			else:
-				self.attendance_percentage = 0
-			
-			self.attendance_marked = 1 if self.total_students > 0 else 0
-			
+		counts = get_session_counts([self.name]).get(self.name)
+		self.update(get_session_counters(counts))
+
 		# Populate Child Table
 		# Clear existing rows to avoid duplication/stale data
 		self.set("students", [])
-		
-		# Fetch details for child table
-		student_records = frappe.db.sql("""
-			SELECT sa.student, s.first_name, sa.status, s.gender
-			FROM `tabStudent Attendance` sa
-			JOIN `tabStudent Master` s ON sa.student = s.name
-			WHERE sa.attendance_session = %s
-			ORDER BY s.first_name asc
-		""", self.name, as_dict=True)
-		
-		for record in student_records:
+
+		for record in get_session_students([self.name]).get(self.name, []):
 			self.append("students", {
 				"student": record.student,
 				"student_name": record.first_name,
 				"status": record.status,
 				"gender": record.gender
 			})
-			
+
 	# Note: No separate save() call needed because this is called in before_save
-	# or can be called manually followed by save() 
+	# or can be called manually followed by save()
+
+
+def get_session_counts(session_names):
+	"""Attendance counts per session: {session: row}"""
+	if not session_names:
+		return {}
+
+	attendance_data = frappe.db.sql("""
+		SELECT
+			sa.attendance_session,
+			COUNT(*) as total,
+			SUM(CASE WHEN status IN ('Present', 'Late') THEN 1 ELSE 0 END) as present,
+			SUM(CASE WHEN status = 'Absent' THEN 1 ELSE 0 END) as absent,
+			SUM(CASE WHEN status IN ('Present', 'Late') AND (s.gender = 'Male' OR s.gender = 'Man') THEN 1 ELSE 0 END) as boys,
+			SUM(CASE WHEN status IN ('Present', 'Late') AND (s.gender = 'Female' OR s.gender = 'Woman') THEN 1 ELSE 0 END) as girls
+		FROM `tabStudent Attendance` sa
+		JOIN `tabStudent Master` s ON sa.student = s.name
+		WHERE sa.attendance_session IN %(sessions)s
+		GROUP BY sa.attendance_session
+	""", {"sessions": tuple(session_names)}, as_dict=True)
+
+	return {row.attendance_session: row for row in attendance_data}
+
+
+def get_session_counters(data):
+	"""Map a get_session_counts row to the Attendance Session counter fields"""
+	data = data or {}
+	total = data.get("total") or 0
+	present = data.get("present") or 0
+
+	return {
+		"total_students": total,
+		"present_count": present,
+		"absent_count": data.get("absent") or 0,
+		"total_boys": data.get("boys") or 0,
+		"total_girls": data.get("girls") or 0,
+		"attendance_percentage": (present / total) * 100 if total > 0 else 0,
+		"attendance_marked": 1 if total > 0 else 0,
+	}
+
+
+def get_session_students(session_names):
+	"""Student rows per session for the students child table: {session: [rows]}"""
+	if not session_names:
+		return {}
+
+	student_records = frappe.db.sql("""
+		SELECT sa.attendance_session, sa.student, s.first_name, sa.status, s.gender
+		FROM `tabStudent Attendance` sa
+		JOIN `tabStudent Master` s ON sa.student = s.name
+		WHERE sa.attendance_session IN %(sessions)s
+		ORDER BY s.first_name asc
+	""", {"sessions": tuple(session_names)}, as_dict=True)
+
+	students = {}
+	for record in student_records:
+		students.setdefault(record.attendance_session, []).append(record)
+	return students
+
+
+def mark_session_dirty(session_name):
+	"""
+	Defer the roll-up of a session's counts and student list until the
+	current transaction commits, so it runs once per session per request or
+	job no matter how many Student Attendance records change.
+	"""
+	if not session_name:
+		return
+
+	dirty = getattr(frappe.local, "dirty_attendance_sessions", None)
+	if dirty is None:
+		dirty = frappe.local.dirty_attendance_sessions = set()
+
+	if not dirty:
+		frappe.db.before_commit.add(roll_up_dirty_sessions)
+		frappe.db.after_rollback.add(dirty.clear)
+
+	dirty.add(session_name)
+
+
+def roll_up_dirty_sessions():
+	"""Roll up every session marked dirty in this request or job"""
+	dirty = getattr(frappe.local, "dirty_attendance_sessions", None)
+	if not dirty:
+		return
+
+	session_names = list(dirty)
+	dirty.clear()
+	roll_up_sessions(session_names)
+
+
+def roll_up_sessions(session_names):
+	"""
+	Recompute counters and the students child table of several sessions with
+	one aggregate query, one detail query and bulk writes.
+	"""
+	session_names = frappe.get_all(
+		"Attendance Session", filters={"name": ["in", list(set(session_names))]}, pluck="name"
+	)
+	if not session_names:
+		return
+
+	counts = get_session_counts(session_names)
+	students = get_session_students(session_names)
+
+	frappe.db.bulk_update(
+		"Attendance Session",
+		{name: get_session_counters(counts.get(name)) for name in session_names}
+	)
+
+	frappe.db.sql("""
+		DELETE FROM `tabAttendance Session Student`
+		WHERE parenttype = 'Attendance Session'
+		AND parent IN %(sessions)s
+	""", {"sessions": tuple(session_names)})
+
+	timestamp = frappe.utils.now()
+	user = frappe.session.user
+	values = []
+	for name in session_names:
+		for idx, record in enumerate(students.get(name, []), start=1):
+			values.append((
+				frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0,
+				name, "Attendance Session", "students", idx,
+				record.student, record.first_name, record.status, record.gender
+			))
+
+	if values:
+		frappe.db.bulk_insert(
+			"Attendance Session Student",
+			["name", "creation", "modified", "owner", "modified_by", "docstatus",
+				"parent", "parenttype", "parentfield", "idx",
+				"student", "student_name", "status", "gender"],
+			values
+		)
+
+
+def conducted_class_hours(doc):
+	"""Hours a session adds to its offering's conducted_hours"""
+	if not doc or doc.docstatus == 2 or doc.session_status != "Conducted":
+		return 0
+	if doc.session_type not in CLASS_SESSION_TYPES:
+		return 0
+	return flt(doc.duration_hours)
+
+
+def update_conducted_hours(before, after):
+	"""Apply the change between two versions of a session to Course Offering.conducted_hours"""
+	changes = {}
+	for doc, sign in ((before, -1), (after, 1)):
+		if doc and doc.course_offering:
+			changes[doc.course_offering] = changes.get(doc.course_offering, 0) + sign * conducted_class_hours(doc)
+
+	for course_offering, delta in changes.items():
+		if delta:
+			frappe.db.sql("""
+				UPDATE `tabCourse Offering`
+				SET conducted_hours = IFNULL(conducted_hours, 0) + %s
+				WHERE name = %s
+			""", (delta, course_offering))
+
+
+def recompute_conducted_hours(course_offerings=None):
+	"""Recount conducted_hours from the sessions with one grouped UPDATE (daily, and after migration)"""
+	condition = "WHERE co.name IN %(offerings)s" if course_offerings else ""
+
+	frappe.db.sql(f"""
+		UPDATE `tabCourse Offering` co
+		LEFT JOIN (
+			SELECT course_offering, SUM(duration_hours) as hours
+			FROM `tabAttendance Session`
+			WHERE session_status = 'Conducted'
+			AND session_type IN %(class_types)s
+			AND docstatus < 2
+			GROUP BY course_offering
+		) conducted ON conducted.course_offering = co.name
+		SET co.conducted_hours = COALESCE(conducted.hours, 0)
+		{condition}
+	""", {"class_types": CLASS_SESSION_TYPES, "offerings": tuple(course_offerings or ())})
+
 
 @frappe.whitelist()
 def mark_session_conducted(session_name):
@@ -15,6 +15,12 @@ class AttendanceSettings(Document):
 		"""Validate attendance settings"""
 		self.validate_percentage()
 		self.validate_hours()
+
+	def on_update(self):
+		"""Make running recalculations pick up the new settings"""
+		from slcm.slcm.utils.attendance_calculator import invalidate_recalculation_context
+
+		invalidate_recalculation_context()
 	
 	def validate_percentage(self):
 		"""Ensure minimum attendance percentage is valid"""
@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from slcm.slcm.utils.attendance_facts import mark_facts_dirty
+
 
 class AttendanceSummary(Document):
-	pass
+	def on_update(self):
+		mark_facts_dirty([(self.student, self.course_offering)])
+
+	def on_trash(self):
+		mark_facts_dirty([(self.student, self.course_offering)])
@@ -1,9 +1,278 @@
 # Copyright (c) 2025, Nishanth and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, today
+
+from slcm.slcm.utils.attendance_calculator import (
+	RecalculationContext,
+	calculate_student_attendance,
+	invalidate_recalculation_context,
+)
+from slcm.slcm.utils.attendance_delta import apply_attendance_delta
+from slcm.slcm.utils.bulk_attendance_calculator import calculate_summaries, get_scope
+
+COMPARED_FIELDS = ("total_classes", "attended_classes", "attendance_percentage", "eligible_for_exam")
 
 
 class TestAttendanceSummary(FrappeTestCase):
-	pass
+	def setUp(self):
+		set_attendance_settings(
+			minimum_attendance_percentage=75,
+			include_office_hours_in_attendance=1,
+			allow_fa_mfa=0,
+			incremental_summary_updates=0,
+		)
+
+		self.students = [create_student(f"Summary Parity {i}") for i in range(3)]
+		self.offering = create_course_offering("TEST-SUMMARY-PARITY")
+		# Attendance but no sessions: total_classes is 0
+		self.offering_without_sessions = create_course_offering("TEST-SUMMARY-NO-SESSIONS")
+
+		lecture = create_session(self.offering.name, "Lecture", "09:00:00", "11:00:00", days_ago=4)
+		tutorial = create_session(self.offering.name, "Tutorial", "11:00:00", "12:00:00", days_ago=3)
+		# Neither counts towards total_classes
+		scheduled = create_session(self.offering.name, "Lecture", "09:00:00", "10:00:00", "Scheduled", days_ago=2)
+		cancelled = create_session(self.offering.name, "Lecture", "10:00:00", "12:00:00", "Cancelled", days_ago=1)
+
+		first, second, third = (s.name for s in self.students)
+		for student, session, status, hours in (
+			(first, lecture, "Present", 2),
+			(first, tutorial, "Late", 1),
+			(first, scheduled, "Present", 1),
+			(second, lecture, "Absent", 0),
+			(second, tutorial, "Excused", 1),
+			(second, cancelled, "Present", 2),
+			(third, lecture, "Late", 2),
+			(third, tutorial, "Absent", 0),
+		):
+			create_attendance(student, self.offering.name, status, session.session_type, hours, session=session)
+
+		create_attendance(first, self.offering.name, "Present", "Office Hour", 1, days_ago=1)
+		create_attendance(second, self.offering.name, "Absent", "Office Hour", 1, days_ago=1)
+		create_attendance(third, self.offering_without_sessions.name, "Present", "Lecture", 1)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		invalidate_recalculation_context()
+
+	def test_bulk_calculation_matches_per_student_calculation(self):
+		expected = self.assert_parity()
+
+		# Only the conducted Lecture and Tutorial hours are counted
+		self.assertEqual(flt(expected[(self.students[0].name, self.offering.name)].total_classes), 3)
+		self.assertEqual(flt(expected[(self.students[2].name, self.offering_without_sessions.name)].total_classes), 0)
+
+	def test_parity_without_office_hours(self):
+		set_attendance_settings(include_office_hours_in_attendance=0)
+		self.assert_parity()
+
+	def test_parity_with_higher_threshold(self):
+		set_attendance_settings(minimum_attendance_percentage=100)
+		self.assert_parity()
+
+	def assert_parity(self):
+		"""Compare calculate_summaries with calculate_student_attendance for every pair"""
+		offerings = [self.offering.name, self.offering_without_sessions.name]
+		pairs = frappe.get_all(
+			"Student Attendance",
+			filters={"course_offer": ["in", offerings], "docstatus": ["<", 2]},
+			fields=["student", "course_offer"],
+			distinct=True,
+		)
+
+		context = RecalculationContext()
+		expected = {
+			(row.student, row.course_offer): frappe._dict(
+				calculate_student_attendance(row.student, row.course_offer, context=context)
+			)
+			for row in pairs
+		}
+		bulk = {(row.student, row.course_offering): row for row in calculate_summaries(get_scope(offerings))}
+
+		self.assertEqual(set(bulk), set(expected))
+		for pair, row in expected.items():
+			for field in COMPARED_FIELDS:
+				self.assertAlmostEqual(flt(bulk[pair][field]), flt(row[field]), places=4, msg=f"{pair} {field}")
+
+		return expected
+
+
+class TestIncrementalSummaryUpdates(FrappeTestCase):
+	"""Summaries kept by apply_attendance_delta must equal a full recompute"""
+
+	def setUp(self):
+		set_attendance_settings(
+			minimum_attendance_percentage=75,
+			include_office_hours_in_attendance=1,
+			allow_fa_mfa=0,
+			incremental_summary_updates=1,
+		)
+
+		self.student = create_student("Summary Delta")
+		self.offering = create_course_offering("TEST-SUMMARY-DELTA")
+		self.lecture = create_session(self.offering.name, "Lecture", "09:00:00", "11:00:00", days_ago=2)
+		self.tutorial = create_session(self.offering.name, "Tutorial", "11:00:00", "12:00:00", days_ago=1)
+
+		# Deltas only apply to an existing summary
+		calculate_student_attendance(self.student.name, self.offering.name)
+		self.assert_matches_full_recompute()
+
+	def tearDown(self):
+		frappe.db.rollback()
+		invalidate_recalculation_context()
+
+	def test_insert(self):
+		create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=self.lecture)
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.attended_classes), 2)
+
+		create_attendance(self.student.name, self.offering.name, "Late", "Office Hour", 1)
+		self.assert_matches_full_recompute()
+
+	def test_status_change(self):
+		attendance = create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=self.lecture)
+
+		attendance.status = "Absent"
+		attendance.save(ignore_permissions=True)
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.attended_classes), 0)
+
+		attendance.status = "Excused"
+		attendance.save(ignore_permissions=True)
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.attended_classes), 2)
+
+	def test_delete(self):
+		create_attendance(self.student.name, self.offering.name, "Present", "Tutorial", 1, session=self.tutorial)
+		attendance = create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=self.lecture)
+
+		frappe.delete_doc("Student Attendance", attendance.name, ignore_permissions=True)
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.attended_classes), 1)
+
+	def test_cancel(self):
+		attendance = create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=self.lecture)
+
+		# Student Attendance is not submittable: apply the transition on_cancel applies
+		before = frappe.get_doc("Student Attendance", attendance.name)
+		frappe.db.set_value("Student Attendance", attendance.name, "docstatus", 2)
+		attendance.docstatus = 2
+		apply_attendance_delta(before, attendance)
+
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.attended_classes), 0)
+
+	def test_session_status_change(self):
+		create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=self.lecture)
+
+		self.tutorial.session_status = "Cancelled"
+		self.tutorial.save(ignore_permissions=True)
+		summary = self.assert_matches_full_recompute()
+		self.assertEqual(flt(summary.total_classes), 2)
+
+		self.tutorial.session_status = "Conducted"
+		self.tutorial.save(ignore_permissions=True)
+		self.assert_matches_full_recompute()
+
+	def assert_matches_full_recompute(self):
+		stored = frappe.db.get_value(
+			"Attendance Summary",
+			{"student": self.student.name, "course_offering": self.offering.name},
+			COMPARED_FIELDS,
+			as_dict=True,
+		)
+		self.assertTrue(stored)
+
+		scope = get_scope([self.offering.name], students=[self.student.name])
+		(full,) = calculate_summaries(scope)
+		for field in COMPARED_FIELDS:
+			self.assertAlmostEqual(flt(stored[field]), flt(full[field]), places=4, msg=field)
+
+		return stored
+
+
+def set_attendance_settings(**values):
+	for field, value in values.items():
+		frappe.db.set_single_value("Attendance Settings", field, value)
+	invalidate_recalculation_context()
+
+
+def create_student(first_name):
+	if frappe.db.exists("Student Master", {"first_name": first_name}):
+		return frappe.get_doc("Student Master", {"first_name": first_name})
+
+	doc = frappe.get_doc(
+		{
+			"doctype": "Student Master",
+			"naming_series": "STUD-.YYYY.-",
+			"first_name": first_name,
+			"last_name": "Test",
+			"application_number": f"APP-{frappe.scrub(first_name)}",
+			"email": f"{frappe.scrub(first_name)}@example.com",
+		}
+	)
+	doc.insert(ignore_permissions=True, ignore_mandatory=True)
+	return doc
+
+
+def create_course_offering(name):
+	if frappe.db.exists("Course Offering", name):
+		return frappe.get_doc("Course Offering", name)
+
+	# The summary fetches its course from the offering
+	if not frappe.db.exists("Course", name):
+		frappe.get_doc({"doctype": "Course", "course_name": name}).insert(ignore_permissions=True)
+
+	doc = frappe.get_doc(
+		{
+			"doctype": "Course Offering",
+			"course_name": name,
+			"course_title": name,
+			"status": "Open",
+		}
+	)
+	doc.flags.ignore_links = True
+	doc.insert(ignore_permissions=True, ignore_mandatory=True)
+	return doc
+
+
+def create_session(course_offering, session_type, start, end, status="Conducted", days_ago=0):
+	doc = frappe.get_doc(
+		{
+			"doctype": "Attendance Session",
+			"course_offering": course_offering,
+			"session_date": add_days(today(), -days_ago),
+			"session_type": session_type,
+			"session_start_time": start,
+			"session_end_time": end,
+			"session_status": status,
+		}
+	)
+	doc.flags.ignore_links = True
+	doc.insert(ignore_permissions=True)
+	return doc
+
+
+def create_attendance(student, course_offering, status, session_type, hours, session=None, days_ago=0, **fields):
+	attendance_date = session.session_date if session else add_days(today(), -days_ago)
+	doc = frappe.get_doc(
+		{
+			"doctype": "Student Attendance",
+			"based_on": "Class Schedule",
+			"student": student,
+			"course_offer": course_offering,
+			"attendance_session": session.name if session else None,
+			"attendance_date": attendance_date,
+			"date": attendance_date,
+			"status": status,
+			"source": "Manual",
+			"session_type": session_type,
+			"hours_counted": hours,
+			**fields,
+		}
+	)
+	doc.flags.ignore_links = True
+	doc.insert(ignore_permissions=True)
+	return doc
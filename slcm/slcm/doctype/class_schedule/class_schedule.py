@@ -9,6 +9,8 @@ from dateutil.relativedelta import relativedelta
 
 from frappe.utils import to_timedelta
 
+from slcm.slcm.utils.course_offering_resolver import clear_resolver_cache, resolve_course_offering
+
 class ClassSchedule(Document):
     def validate(self):
         """Validate the Class Schedule"""
@@ -62,6 +64,16 @@ class ClassSchedule(Document):
         """Check if two time ranges overlap"""
         return to_timedelta(start1) < to_timedelta(end2) and to_timedelta(end1) > to_timedelta(start2)
 
+    def on_update(self):
+        """Cached offering resolutions follow the offering linked here"""
+        before = self.get_doc_before_save()
+        if before and before.course_offering != self.course_offering:
+            clear_resolver_cache()
+
+    def on_trash(self):
+        if self.course_offering:
+            clear_resolver_cache()
+
     def after_insert(self):
         """Create recurring schedules if repeat is enabled"""
         if self.repeat_frequency and self.repeat_frequency != "Never":
@@ -92,7 +104,7 @@ class ClassSchedule(Document):
             "based_on": "Class Schedule",
             "class_schedule": self.name,
             "student_group": self.student_group,
-            "course_offering": self.course_offering,
+            "course_offering": self.course_offering or resolve_course_offering(self.course, self.programme),
             "course": self.course,
             "instructor": self.instructor,
             "room": self.room,
@@ -4,6 +4,16 @@
 # import frappe
 from frappe.model.document import Document
 
+from slcm.slcm.utils.course_offering_resolver import clear_resolver_cache
+
 
 class CourseOffering(Document):
-	pass
+	def on_update(self):
+		# Offering resolution for attendance marking is cached
+		clear_resolver_cache()
+
+	def on_trash(self):
+		clear_resolver_cache()
+
+	def after_rename(self, old_name, new_name, merge=False):
+		clear_resolver_cache()
@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+from slcm.slcm.utils.course_offering_resolver import resolve_course_offering
+
 
 class CourseSchedule(Document):
 	def after_insert(self):
@@ -47,26 +49,7 @@ class CourseSchedule(Document):
 		doc.insert(ignore_permissions=True)
 
 	def get_course_offering(self):
-		# Try to find an open course offering for this course and program
-		filters = {
-			"course_title": self.course,
-			"status": "Open"
-		}
-		if self.program:
-			filters["program"] = self.program
-			
-		offerings = frappe.get_all("Course Offering", filters=filters, limit=1)
-		if offerings:
-			return offerings[0].name
-			
-		# Fallback: try without program
-		if self.program:
-			del filters["program"]
-			offerings = frappe.get_all("Course Offering", filters=filters, limit=1)
-			if offerings:
-				return offerings[0].name
-				
-		return None
+		return resolve_course_offering(self.course, self.program)
 
 
 @frappe.whitelist()
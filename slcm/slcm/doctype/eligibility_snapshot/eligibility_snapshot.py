@@ -0,0 +1,30 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class EligibilitySnapshot(Document):
+	def validate(self):
+		if not self.term_name and not self.get_course_offerings():
+			frappe.throw(_("Set a Term or list the Course Offerings to snapshot"))
+
+		before = self.get_doc_before_save()
+		if before and before.status == "Completed":
+			frappe.throw(_("Eligibility Snapshot {0} is completed and cannot be changed").format(self.name))
+
+	def after_insert(self):
+		if not self.flags.compute_inline:
+			from slcm.slcm.utils.eligibility_tool import enqueue_snapshot
+			enqueue_snapshot(self.name)
+
+	def on_trash(self):
+		if self.status == "Completed" and "System Manager" not in frappe.get_roles():
+			frappe.throw(_("Completed Eligibility Snapshots cannot be deleted"))
+
+		frappe.db.delete("Eligibility Snapshot Entry", {"snapshot": self.name})
+
+	def get_course_offerings(self):
+		return [co.strip() for co in (self.course_offerings or "").splitlines() if co.strip()]
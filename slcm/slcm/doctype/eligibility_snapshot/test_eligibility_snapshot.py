@@ -0,0 +1,166 @@
+# Copyright (c) 2026, Nishanth and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, now_datetime, today
+
+from slcm.slcm.doctype.attendance_summary.test_attendance_summary import (
+	create_attendance,
+	create_course_offering,
+	create_session,
+	create_student,
+	set_attendance_settings,
+)
+from slcm.slcm.utils.attendance_calculator import (
+	calculate_student_attendance,
+	invalidate_recalculation_context,
+)
+from slcm.slcm.utils.bulk_attendance_calculator import calculate_summaries, get_scope
+from slcm.slcm.utils.eligibility_tool import (
+	classify,
+	generate_eligibility_list,
+	get_snapshot_entries,
+	write_snapshot_entries,
+)
+
+
+class TestEligibilitySnapshot(FrappeTestCase):
+	def setUp(self):
+		set_attendance_settings(minimum_attendance_percentage=75, include_office_hours_in_attendance=0, allow_fa_mfa=1)
+
+		self.student = create_student("Snapshot Cutoff")
+		self.offering = create_course_offering("TEST-SNAPSHOT-CUTOFF")
+		self.cutoff_date = add_days(today(), -5)
+
+		# One session on each side of the cut-off; only the earlier one is attended
+		before = create_session(self.offering.name, "Lecture", "09:00:00", "11:00:00", days_ago=10)
+		after = create_session(self.offering.name, "Lecture", "09:00:00", "11:00:00", days_ago=2)
+		create_attendance(self.student.name, self.offering.name, "Present", "Lecture", 2, session=before)
+		create_attendance(self.student.name, self.offering.name, "Absent", "Lecture", 0, session=after)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		invalidate_recalculation_context()
+
+	def test_classify(self):
+		self.assertEqual(classify(75, 0, 75, 65), "Eligible")
+		self.assertEqual(classify(74.99, 0, 75, 65), "Condonable Shortage")
+		self.assertEqual(classify(65, 0, 75, 65), "Condonable Shortage")
+		self.assertEqual(classify(64.99, 0, 75, 65), "Detained")
+		# An approved FA/MFA overrides the shortage
+		self.assertEqual(classify(10, 1, 75, 65), "Eligible")
+
+	def test_cutoff_ignores_later_sessions_and_attendance(self):
+		(row,) = self.calculate(self.cutoff_date)
+		self.assertEqual(flt(row.total_classes), 2)
+		self.assertEqual(flt(row.attended_classes), 2)
+
+		(row,) = self.calculate()
+		self.assertEqual(flt(row.total_classes), 4)
+		self.assertEqual(flt(row.attended_classes), 2)
+
+	def test_cutoff_ignores_later_approvals(self):
+		create_condonation(self.student.name, self.offering.name, 1, approval_date=add_days(today(), -1))
+		create_fa_mfa(self.student.name, self.offering.course_title, approval_date=add_days(today(), -1))
+
+		(row,) = self.calculate(self.cutoff_date)
+		self.assertEqual(flt(row.condoned_hours), 0)
+		self.assertEqual(row.fa_mfa_approved, 0)
+
+		(row,) = self.calculate()
+		self.assertEqual(flt(row.condoned_hours), 1)
+		self.assertEqual(row.fa_mfa_approved, 1)
+
+	def test_cutoff_counts_earlier_approvals(self):
+		create_condonation(self.student.name, self.offering.name, 1, approval_date=add_days(today(), -6))
+
+		(row,) = self.calculate(self.cutoff_date)
+		self.assertEqual(flt(row.condoned_hours), 1)
+		self.assertEqual(flt(row.attended_classes), 3)
+
+	def test_snapshot_entries_as_of_cutoff(self):
+		# 2 of 4 hours today, 2 of 2 as of the cut-off
+		create_fa_mfa(self.student.name, self.offering.course_title, approval_date=add_days(today(), -1))
+
+		snapshot = frappe.get_doc({
+			"doctype": "Eligibility Snapshot",
+			"course_offerings": self.offering.name,
+			"cutoff_date": self.cutoff_date,
+		})
+		snapshot.flags.compute_inline = True
+		snapshot.insert(ignore_permissions=True)
+		counts = write_snapshot_entries(snapshot)
+
+		self.assertEqual(counts["eligible_count"], 1)
+		(entry,) = get_snapshot_entries(snapshot.name, self.offering.name)
+		self.assertEqual(entry.status, "Eligible")
+		self.assertEqual(entry.fa_mfa_approved, 0)
+		self.assertEqual(flt(entry.attendance_percentage), 100)
+
+	def test_eligibility_list_reads_without_computing(self):
+		calculate_student_attendance(self.student.name, self.offering.name)
+		snapshots = frappe.db.count("Eligibility Snapshot")
+
+		# No snapshot yet: the live summary (2 of 4 hours) is classified
+		(row,) = generate_eligibility_list(self.offering.name)
+		self.assertEqual(row["status"], "Detained")
+		self.assertEqual(frappe.db.count("Eligibility Snapshot"), snapshots)
+
+		snapshot = frappe.get_doc({
+			"doctype": "Eligibility Snapshot",
+			"course_offerings": self.offering.name,
+			"cutoff_date": self.cutoff_date,
+		})
+		snapshot.flags.compute_inline = True
+		snapshot.insert(ignore_permissions=True)
+		write_snapshot_entries(snapshot)
+		snapshot.db_set("status", "Completed")
+
+		# The latest snapshot up to the date is used
+		(row,) = generate_eligibility_list(self.offering.name)
+		self.assertEqual(row["status"], "Eligible")
+		self.assertEqual(generate_eligibility_list(self.offering.name, add_days(self.cutoff_date, -1))[0]["status"],
+			"Detained")
+
+	def calculate(self, cutoff_date=None):
+		return calculate_summaries(get_scope([self.offering.name], cutoff_date=cutoff_date))
+
+
+def create_condonation(student, course_offering, hours, approval_date):
+	doc = frappe.get_doc({
+		"doctype": "Student Attendance Condonation",
+		"name": f"TEST-CONDONATION-{frappe.generate_hash(length=8)}",
+		"student": student,
+		"course_offering": course_offering,
+		"number_of_sessions": 1,
+		"number_of_hours": hours,
+		"condonation_reason": "Medical reasons",
+		"final_status": "Approved",
+		"approval_date": approval_date,
+		"docstatus": 1,
+		"creation": now_datetime(),
+		"modified": now_datetime(),
+	})
+	# Stored as approved, without the application workflow
+	doc.db_insert()
+	return doc
+
+
+def create_fa_mfa(student, course, approval_date):
+	doc = frappe.get_doc({
+		"doctype": "FA MFA Application",
+		"name": f"TEST-FAMFA-{frappe.generate_hash(length=8)}",
+		"student": student,
+		"course": course,
+		"examination_date": today(),
+		"application_type": "First Attempt (FA)",
+		"reason": "Medical Reasons",
+		"status": "Approved",
+		"approval_date": approval_date,
+		"docstatus": 1,
+		"creation": now_datetime(),
+		"modified": now_datetime(),
+	})
+	doc.db_insert()
+	return doc
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Nishanth and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Eligibility Snapshot Entry", {
+// 	refresh(frm) {
+
+// 	},
+// });
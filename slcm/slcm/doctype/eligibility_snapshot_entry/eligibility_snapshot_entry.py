@@ -0,0 +1,19 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class EligibilitySnapshotEntry(Document):
+	def validate(self):
+		# Entries are written in bulk by the snapshot job and never edited
+		frappe.throw(_("Eligibility Snapshot Entries cannot be created or changed manually"))
+
+
+def on_doctype_update():
+	# Lookups go by snapshot and offering, optionally narrowed to one status
+	frappe.db.add_unique("Eligibility Snapshot Entry", ["snapshot", "course_offering", "student"],
+		constraint_name="unique_snapshot_offering_student")
+	frappe.db.add_index("Eligibility Snapshot Entry", ["snapshot", "course_offering", "status"])
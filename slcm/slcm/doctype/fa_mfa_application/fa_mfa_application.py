@@ -4,7 +4,9 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, date_diff
+from frappe.utils import date_diff, getdate, nowdate
+
+from slcm.slcm.utils.attendance_facts import mark_student_course_dirty
 
 class FAMFAApplication(Document):
 	def validate(self):
@@ -15,6 +17,9 @@ class FAMFAApplication(Document):
 		if self.status == "Approved":
 			if not self.approver:
 				self.approver = frappe.session.user
+			# Eligibility snapshots count approvals up to their cut-off date
+			if not self.approval_date:
+				self.approval_date = nowdate()
 		
 		if self.status == "Rejected":
 			if not self.rejection_reason:
@@ -86,6 +91,10 @@ class FAMFAApplication(Document):
 
 	def on_trash(self):
 		self.trigger_attendance_recalculation()
+		mark_student_course_dirty(self.student, self.course)
+
+	def on_change(self):
+		mark_student_course_dirty(self.student, self.course)
 
 	def trigger_attendance_recalculation(self):
 		"""
@@ -1,14 +1,15 @@
 import io
 import json
 import os
-import subprocess
-import tempfile
 
 import frappe
 from frappe.model.document import Document
 from frappe.utils import get_url, now
 from frappe.utils.file_manager import save_file
 
+from slcm.slcm.utils.id_card_render_mixin import IDCardRenderMixin
+from slcm.slcm.utils.id_card_renderer import CARD_HEIGHT, CARD_WIDTH
+
 # Lazy imports for qrcode and PIL - imported when needed to avoid errors during migration
 # import qrcode
 # from PIL import Image, ImageDraw, ImageFont, ImageOps
@@ -22,7 +23,7 @@ def hex_to_rgb(hex_color):
 from frappe.model.naming import make_autoname
 
 
-class IDCardGeneration(Document):
+class IDCardGeneration(IDCardRenderMixin, Document):
 	def autoname(self):
 		# Master Level: Enforce Series in Python
 		series_map = {
@@ -254,6 +255,9 @@ class IDCardGeneration(Document):
 		# student = frappe.get_doc("Student Master", self.student) # OLD
 		person = self.get_person_doc()  # NEW
 
+		# HTML sides are queued and rendered together once both are prepared
+		batch_sides = self.start_render_batch()
+
 		# Check for different modes
 		if template.template_creation_mode == "Drag and Drop":
 			self.generate_card_from_canvas(template, person)
@@ -275,8 +279,7 @@ class IDCardGeneration(Document):
 				self.process_side(back_img, template, person, "Back")
 				self.save_image(back_img, f"{self.name}_Back.png", "back_id_image")
 
-		self.card_status = "Generated"
-		self.save()
+		self.end_render_batch(batch_sides)
 
 	def generate_card_from_canvas(self, template, student):
 		if not template.canvas_data:
@@ -466,56 +469,14 @@ class IDCardGeneration(Document):
 			self.generate_image_from_raw_html(html_content, f"{side}_id_image", side.capitalize())
 
 	def generate_image_from_raw_html(self, html_content, fieldname, side_label):
-		# Create temp file
-		with tempfile.NamedTemporaryFile(suffix=".html", delete=False, mode="w") as f:
-			f.write(html_content)
-			html_path = f.name
-
-		output_filename = f"{self.name}_{side_label}.png"
-		output_path = os.path.join(tempfile.gettempdir(), output_filename)
-
-		try:
-			args = [
-				"/usr/bin/wkhtmltoimage",
-				"--enable-local-file-access",
-				"--width",
-				"1011",
-				"--height",
-				"638",  # This should swap for portrait...
-				# Actually we set container size in CSS, wkhtmltoimage size should match or be larger?
-				# If portrait, we should probably flip these args or rely on CSS size.
-				# Let's check orientation again?
-				# For now, let's just make the window large enough.
-				"--quality",
-				"100",
-				html_path,
-				output_path,
-			]
+		width, height = CARD_WIDTH, CARD_HEIGHT
+		# Portrait canvases declare a 638px wide container
+		if "width: 638px;" in html_content:
+			width, height = CARD_HEIGHT, CARD_WIDTH
 
-			# Adjust args for portrait if needed, but since we define container size, maybe just large viewport is enough
-			# But wkhtmltoimage crops? No, defaults to A4 or smart width.
-			# Be safe:
-			if "width: 638px;" in html_content:  # Portrait check hack or pass arg
-				args[3] = "638"
-				args[5] = "1011"
-
-			result = subprocess.run(args, capture_output=True, text=True)
-			if result.returncode != 0:
-				frappe.throw(f"wkhtmltoimage failed: {result.stderr}")
-
-			with open(output_path, "rb") as f:
-				img_content = f.read()
-
-			saved_file = save_file(output_filename, img_content, self.doctype, self.name, is_private=0)
-			self.db_set(fieldname, saved_file.file_url)
-
-		except Exception as e:
-			frappe.throw(f"Error generating from canvas: {e}")
-		finally:
-			if os.path.exists(html_path):
-				os.remove(html_path)
-			if os.path.exists(output_path):
-				os.remove(output_path)
+		self.render_side(
+			html_content, width, height, fieldname, f"{self.name}_{side_label}.png", "Error generating from canvas"
+		)
 
 	def generate_card_html(self, template, student):
 		if template.front_html:
@@ -576,51 +537,14 @@ class IDCardGeneration(Document):
 		# Render Jinja
 		rendered_html = frappe.render_template(html_content, context)
 
-		# Create temp file for HTML
-		with tempfile.NamedTemporaryFile(suffix=".html", delete=False, mode="w") as f:
-			f.write(rendered_html)
-			html_path = f.name
-
-		# Output image path
-		output_filename = f"{self.name}_{side}.png"
-		output_path = os.path.join(tempfile.gettempdir(), output_filename)
-
-		try:
-			# Run wkhtmltoimage
-			args = [
-				"/usr/bin/wkhtmltoimage",
-				"--enable-local-file-access",
-				"--width",
-				"1011",
-				"--height",
-				"638",
-				"--quality",
-				"100",
-				html_path,
-				output_path,
-			]
-
-			# Capture stderr to debug failures
-			result = subprocess.run(args, capture_output=True, text=True)
-			if result.returncode != 0:
-				frappe.throw(f"wkhtmltoimage failed with code {result.returncode}: {result.stderr}")
-
-			# Read generated image
-			with open(output_path, "rb") as f:
-				img_content = f.read()
-
-			# Save to File Manager
-			saved_file = save_file(output_filename, img_content, self.doctype, self.name, is_private=0)
-			self.db_set(fieldname, saved_file.file_url)
-
-		except Exception as e:
-			frappe.throw(f"Error generating ID Card from HTML: {e}")
-		finally:
-			# Cleanup
-			if os.path.exists(html_path):
-				os.remove(html_path)
-			if os.path.exists(output_path):
-				os.remove(output_path)
+		self.render_side(
+			rendered_html,
+			CARD_WIDTH,
+			CARD_HEIGHT,
+			fieldname,
+			f"{self.name}_{side}.png",
+			"Error generating ID Card from HTML",
+		)
 
 	def process_side(self, image, template, student, side):
 		# Lazy imports
@@ -1,4 +1,24 @@
 frappe.ui.form.on("ID Card Generation Tool", {
+	setup: function (frm) {
+		// Progress of a parallel run (large student lists render in background jobs)
+		frappe.realtime.on("id_card_generation_progress", function (data) {
+			frappe.show_progress(
+				__("Generating ID Cards"),
+				data.done,
+				data.total,
+				__("{0} of {1} processed, {2} failed", [data.done, data.total, data.failed])
+			);
+
+			if (data.finished) {
+				frappe.hide_progress();
+				frappe.msgprint(
+					__("Generated {0} ID Cards. Log Run ID: {1}", [data.generated, data.log])
+				);
+				frm.reload_doc();
+			}
+		});
+	},
+
 	refresh: function (frm) {
 		frm.disable_save();
 
@@ -14,6 +34,10 @@ frappe.ui.form.on("ID Card Generation Tool", {
 				"Are you sure you want to generate ID cards for all listed students?",
 				() => {
 					frm.call("generate_cards").then((r) => {
+						if (r.message && r.message.run_id) {
+							frappe.show_progress(__("Generating ID Cards"), 0, r.message.total);
+							return;
+						}
 						frm.reload_doc();
 					});
 				}
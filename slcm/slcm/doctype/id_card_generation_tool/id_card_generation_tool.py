@@ -1,5 +1,6 @@
 import io
 import os
+import time
 import zipfile
 
 import frappe
@@ -7,6 +8,21 @@ from frappe.model.document import Document
 from frappe.utils import get_site_path
 from frappe.utils.file_manager import save_file
 
+from slcm.slcm.utils.id_card_renderer import get_render_workers, render_many
+
+# Larger lists are rendered by background chunk jobs instead of in the request
+PARALLEL_THRESHOLD = 25
+CHUNK_SIZE = 100
+CHUNK_TIMEOUT = 3600
+# A chunk stops preparing cards after this long, to report before it is killed
+CHUNK_SOFT_TIMEOUT = CHUNK_TIMEOUT - 600
+RUN_PREFIX = "slcm:id_card_run:"
+RUN_TTL = 24 * 60 * 60
+# Runs in progress: {run_id: {run, rows, chunks}}
+ACTIVE_RUNS = "slcm:id_card_runs"
+# Slack on top of the job timeout before a silent run is treated as lost
+STALL_GRACE = 600
+
 
 class IDCardGenerationTool(Document):
 	@frappe.whitelist()
@@ -53,19 +69,14 @@ class IDCardGenerationTool(Document):
 		if not self.id_card_template:
 			frappe.throw("Please select an ID Card Template")
 
+		if len(self.student_list or []) > PARALLEL_THRESHOLD:
+			return start_parallel_run(self)
+
 		generated_count = 0
 
 		for row in self.student_list:
 			try:
-				if row.current_id_card:
-					doc = frappe.get_doc("ID Card Generation", row.current_id_card)
-				else:
-					doc = frappe.new_doc("ID Card Generation")
-					doc.student = row.student
-					doc.issue_date = self.issue_date
-					doc.expiry_date = self.expiry_date
-
-				doc.id_card_template = self.id_card_template
+				doc = get_card_doc(row, self.id_card_template, self.issue_date, self.expiry_date)
 				doc.generate_card()
 
 				row.current_id_card = doc.name
@@ -77,27 +88,7 @@ class IDCardGenerationTool(Document):
 				error_msg = f"ID Card Gen Error for {row.student}: {e!s}"
 				frappe.log_error(error_msg[:140], "ID Card Generation Error")
 
-		# Create Tool Log
-		log = frappe.get_doc(
-			{
-				"doctype": "ID Card Generation Tool Log",
-				"generated_on": frappe.utils.now(),
-				"generated_by": frappe.session.user,
-				"academic_year": self.academic_year,
-				"department": self.department,
-				"program": self.program,
-				"batch": self.batch,
-				"template_used": self.id_card_template,
-				"total_students_selected": len(self.student_list or []),
-				"total_id_cards_generated": generated_count,
-				"generation_mode": "Single" if generated_count == 1 else "Bulk",
-				"generation_status": "Success"
-				if generated_count == len(self.student_list)
-				else ("Failed" if generated_count == 0 else "Partial"),
-				"remarks": f"Generated {generated_count}/{len(self.student_list)} cards.",
-			}
-		)
-		log.insert(ignore_permissions=True)
+		log = insert_tool_log(self.as_dict(), len(self.student_list or []), generated_count)
 
 		self.save()
 		frappe.msgprint(f"Generated {generated_count} ID Cards. Log Run ID: {log.name}")
@@ -341,3 +332,303 @@ class IDCardGenerationTool(Document):
 
 		html += "</div>"
 		return html
+
+
+def get_card_doc(row, template, issue_date, expiry_date):
+	"""The row's existing ID Card Generation, or a new one for the student"""
+	if row.get("current_id_card"):
+		doc = frappe.get_doc("ID Card Generation", row.get("current_id_card"))
+	else:
+		doc = frappe.new_doc("ID Card Generation")
+		doc.student = row.get("student")
+		doc.issue_date = issue_date
+		doc.expiry_date = expiry_date
+
+	doc.id_card_template = template
+	return doc
+
+
+def insert_tool_log(run, total, generated_count, run_id=None):
+	log = frappe.get_doc(
+		{
+			"doctype": "ID Card Generation Tool Log",
+			"generation_tool_run_id": run_id,
+			"generated_on": frappe.utils.now(),
+			"generated_by": run.get("user") or frappe.session.user,
+			"academic_year": run.get("academic_year"),
+			"department": run.get("department"),
+			"program": run.get("program"),
+			"batch": run.get("batch"),
+			"template_used": run.get("id_card_template"),
+			"total_students_selected": total,
+			"total_id_cards_generated": generated_count,
+			"generation_mode": "Single" if generated_count == 1 else "Bulk",
+			"generation_status": "Success"
+			if generated_count == total
+			else ("Failed" if generated_count == 0 else "Partial"),
+			"remarks": f"Generated {generated_count}/{total} cards.",
+		}
+	)
+	log.insert(ignore_permissions=True)
+	return log
+
+
+# ------------------------------------------------------------
+# PARALLEL RENDERING
+# ------------------------------------------------------------
+def start_parallel_run(tool):
+	"""
+	Split the student list into chunks, one background job each. Every job
+	prepares its cards, renders all their sides through a bounded pool of
+	wkhtmltoimage processes and reports progress; the last one to finish
+	writes the row statuses and the Tool Log. A run whose chunks do not all
+	report back is finished by finish_expired_runs.
+	"""
+	run_id = frappe.generate_hash(length=10)
+	rows = [
+		{"name": row.name, "student": row.student, "current_id_card": row.current_id_card}
+		for row in tool.student_list
+	]
+	chunks = [rows[i : i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+	run = {
+		"user": frappe.session.user,
+		"total": len(rows),
+		"id_card_template": tool.id_card_template,
+		"issue_date": str(tool.issue_date) if tool.issue_date else None,
+		"expiry_date": str(tool.expiry_date) if tool.expiry_date else None,
+		"academic_year": tool.academic_year,
+		"department": tool.department,
+		"program": tool.program,
+		"batch": tool.batch,
+	}
+
+	cache = frappe.cache()
+	key = run_key(run_id)
+	cache.execute_command("HSET", key, "done", 0, "generated", 0, "chunks_left", len(chunks),
+		"last_progress", time.time())
+	cache.execute_command("EXPIRE", key, RUN_TTL)
+	cache.hset(ACTIVE_RUNS, run_id, {
+		"run": run,
+		"rows": [row["name"] for row in rows],
+		"chunks": len(chunks),
+	})
+
+	for index, chunk in enumerate(chunks):
+		frappe.enqueue(
+			"slcm.slcm.doctype.id_card_generation_tool.id_card_generation_tool.render_card_chunk",
+			queue="long",
+			timeout=CHUNK_TIMEOUT,
+			job_id=chunk_job_id(run_id, index),
+			enqueue_after_commit=True,
+			run_id=run_id,
+			rows=chunk,
+			run=run,
+		)
+
+	frappe.msgprint(
+		f"Generating {len(rows)} ID Cards in {len(chunks)} background jobs. Run ID: {run_id}",
+		alert=True,
+	)
+	return {"run_id": run_id, "total": len(rows), "chunks": len(chunks)}
+
+
+def run_key(run_id):
+	return frappe.cache().make_key(f"{RUN_PREFIX}{run_id}")
+
+
+def results_key(run_id):
+	return f"{RUN_PREFIX}{run_id}:results"
+
+
+def chunk_job_id(run_id, index):
+	return f"id_card_run:{run_id}:{index}"
+
+
+def render_card_chunk(run_id, rows, run):
+	"""Background job: generate the cards of one chunk of the student list"""
+	results = {}
+	try:
+		results = generate_chunk(rows, run)
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(message=frappe.get_traceback(), title=f"ID Card Run {run_id} Failed")
+		results = {row["name"]: (None, "Error: chunk failed") for row in rows}
+	finally:
+		record_chunk(run_id, rows, results, run)
+
+
+def generate_chunk(rows, run):
+	"""{row name: (card, status)} for the rows of a chunk"""
+	results = {}
+	cards = []
+	started = time.monotonic()
+
+	# Card documents and their HTML are prepared serially, the renders are batched
+	for row in rows:
+		# Leave time to render what is prepared and report before the job is killed
+		if time.monotonic() - started > CHUNK_SOFT_TIMEOUT:
+			results[row["name"]] = (row.get("current_id_card"), "Error: chunk time limit reached")
+			continue
+
+		try:
+			doc = get_card_doc(row, run["id_card_template"], run["issue_date"], run["expiry_date"])
+			doc.flags.defer_render = True
+			doc.flags.pending_renders = []
+			doc.generate_card()
+			cards.append((row, doc))
+		except Exception as e:
+			results[row["name"]] = (row.get("current_id_card"), f"Error: {e!s}")
+			frappe.log_error(f"ID Card Gen Error for {row['student']}: {e!s}"[:140], "ID Card Generation Error")
+
+	jobs = [job for _row, doc in cards for job in doc.flags.pending_renders]
+	images = iter(render_many(jobs, max_workers=get_render_workers()))
+
+	for row, doc in cards:
+		rendered = [next(images) for _job in doc.flags.pending_renders]
+		errors = [error for _content, error in rendered if error]
+		try:
+			if errors:
+				frappe.throw(errors[0])
+
+			if doc.flags.pending_renders:
+				doc.finish_render([content for content, _error in rendered])
+			results[row["name"]] = (doc.name, "Generated")
+		except Exception as e:
+			results[row["name"]] = (doc.name, f"Error: {e!s}")
+			frappe.log_error(f"ID Card Gen Error for {row['student']}: {e!s}"[:140], "ID Card Generation Error")
+
+	frappe.db.commit()
+	return results
+
+
+def record_chunk(run_id, rows, results, run):
+	"""Add a finished chunk to the run's progress; the last chunk finishes the run"""
+	cache = frappe.cache()
+	if not cache.hget(ACTIVE_RUNS, run_id):
+		# Already finished as expired
+		return
+
+	key = run_key(run_id)
+	generated = sum(1 for _card, status in results.values() if status == "Generated")
+
+	for name, result in results.items():
+		cache.hset(results_key(run_id), name, result)
+	cache.execute_command("EXPIRE", cache.make_key(results_key(run_id)), RUN_TTL)
+
+	cache.execute_command("HSET", key, "last_progress", time.time())
+	done = cache.execute_command("HINCRBY", key, "done", len(rows))
+	generated_total = cache.execute_command("HINCRBY", key, "generated", generated)
+	chunks_left = cache.execute_command("HINCRBY", key, "chunks_left", -1)
+
+	frappe.publish_realtime(
+		"id_card_generation_progress",
+		{
+			"run_id": run_id,
+			"done": int(done),
+			"generated": int(generated_total),
+			"failed": int(done) - int(generated_total),
+			"total": run["total"],
+		},
+		user=run["user"],
+	)
+
+	if int(chunks_left) <= 0:
+		finish_run(run_id)
+
+
+def get_run_results(run_id):
+	"""{row name: (card, status)} recorded so far; Redis returns the hash fields as bytes"""
+	return {
+		(name.decode() if isinstance(name, bytes) else name): result
+		for name, result in (frappe.cache().hgetall(results_key(run_id)) or {}).items()
+	}
+
+
+def finish_run(run_id):
+	"""
+	Write back the row statuses and the Tool Log. Called by the last chunk,
+	or by finish_expired_runs for a run with a chunk that never reported
+	(e.g. killed at its timeout); its rows are marked as not processed.
+	"""
+	cache = frappe.cache()
+	# Only one caller finishes a run
+	if not cache.execute_command("HSETNX", run_key(run_id), "finished", 1):
+		return
+
+	entry = cache.hget(ACTIVE_RUNS, run_id)
+	if not entry:
+		return
+
+	run = entry["run"]
+	results = get_run_results(run_id)
+	for name in entry["rows"]:
+		results.setdefault(name, (None, "Error: chunk did not finish"))
+
+	updates = {}
+	for name, (card, status) in results.items():
+		updates[name] = {"status": status[:140]}
+		if card:
+			updates[name]["current_id_card"] = card
+	if updates:
+		frappe.db.bulk_update("ID Card Generation Item", updates, update_modified=False)
+
+	generated = sum(1 for _card, status in results.values() if status == "Generated")
+	log = insert_tool_log(run, run["total"], generated, run_id=run_id)
+	frappe.db.commit()
+
+	cache.hdel(ACTIVE_RUNS, run_id)
+	cache.delete_value(results_key(run_id))
+	cache.execute_command("DEL", run_key(run_id))
+
+	frappe.publish_realtime(
+		"id_card_generation_progress",
+		{
+			"run_id": run_id,
+			"done": run["total"],
+			"generated": generated,
+			"failed": run["total"] - generated,
+			"total": run["total"],
+			"finished": 1,
+			"log": log.name,
+		},
+		user=run["user"],
+	)
+
+
+def finish_expired_runs():
+	"""Scheduled: finish the runs with a chunk that will never report"""
+	active = frappe.cache().hgetall(ACTIVE_RUNS) or {}
+	for run_id, entry in active.items():
+		run_id = run_id.decode() if isinstance(run_id, bytes) else run_id
+		if is_run_stalled(run_id, entry):
+			finish_run(run_id)
+
+
+def is_run_stalled(run_id, entry):
+	"""
+	True when no chunk of the run reported for a while and none can still
+	report: no chunk job is waiting for a worker, and a running one has
+	outlived its timeout. A lost chunk thus holds the run back for at most
+	CHUNK_TIMEOUT + STALL_GRACE after the last report, not for every chunk
+	in turn.
+	"""
+	from frappe.utils.background_jobs import get_job
+	from rq.job import JobStatus
+
+	last_progress = frappe.cache().execute_command("HGET", run_key(run_id), "last_progress")
+	idle = time.time() - float(last_progress) if last_progress else float("inf")
+	if idle < STALL_GRACE:
+		return False
+
+	statuses = set()
+	for index in range(entry.get("chunks", 0)):
+		job = get_job(chunk_job_id(run_id, index))
+		if job:
+			statuses.add(job.get_status())
+
+	if statuses & {JobStatus.QUEUED, JobStatus.DEFERRED, JobStatus.SCHEDULED}:
+		# Waiting for a free long-queue worker, not lost
+		return False
+	if JobStatus.STARTED in statuses:
+		return idle > CHUNK_TIMEOUT + STALL_GRACE
+	return True
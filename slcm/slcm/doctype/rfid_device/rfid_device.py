@@ -4,6 +4,13 @@
 # import frappe
 from frappe.model.document import Document
 
+from slcm.slcm.utils.rfid_lookup_cache import invalidate_device
+
 
 class RFIDDevice(Document):
-	pass
+	def on_update(self):
+		# Drop the ingest endpoint's cached copy (active flag, location)
+		invalidate_device(self.name)
+
+	def on_trash(self):
+		invalidate_device(self.name)
@@ -147,7 +147,7 @@ class StudentAttendance(Document):
 	
 	def on_trash(self):
 		"""Trigger updates on deletion"""
-		self.trigger_recalculation()
+		self.trigger_recalculation(deleted=True)
 		self.trigger_session_update()
 	
 	def after_insert(self):
@@ -165,29 +165,54 @@ class StudentAttendance(Document):
 		self.trigger_recalculation()
 		self.trigger_session_update()
 	
-	def trigger_recalculation(self):
-		"""Trigger attendance summary recalculation"""
-		if self.student and self.course_offer:
-			try:
-				from slcm.slcm.utils.attendance_calculator import calculate_student_attendance
-				frappe.enqueue(
-					calculate_student_attendance,
-					student=self.student,
-					course_offering=self.course_offer,
-					queue="short"
-				)
-			except Exception as e:
-				frappe.log_error(message=f"Error triggering recalculation: {str(e)}", title="Recalculation Trigger Error")
+	def trigger_recalculation(self, deleted=False):
+		"""
+		Update the attendance summary: apply a delta in incremental mode,
+		otherwise queue a recalculation (coalesced per student and course offering).
+		"""
+		try:
+			from slcm.slcm.utils.absentee_snapshot import mark_absentees_dirty
+			from slcm.slcm.utils.attendance_delta import apply_attendance_delta, is_incremental_mode
+			from slcm.slcm.utils.attendance_facts import mark_facts_dirty
+			from slcm.slcm.utils.recalculation_queue import mark_dirty
+
+			old_doc = self if deleted else self.get_doc_before_save()
+
+			mark_facts_dirty([(self.student, self.course_offer)]
+				+ ([(old_doc.student, old_doc.course_offer)] if old_doc else []))
+			mark_absentees_dirty([(self.student, self.attendance_date)]
+				+ ([(old_doc.student, old_doc.attendance_date)] if old_doc else []))
+
+			if not old_doc:
+				# after_insert and on_update both run on insert; count it once
+				if self.flags.summary_updated_on_insert:
+					return
+				self.flags.summary_updated_on_insert = True
+
+			if is_incremental_mode():
+				apply_attendance_delta(old_doc, None if deleted else self)
+				return
+
+			mark_dirty(self.student, self.course_offer)
+
+			# A moved record also changes the summary it was moved away from
+			if old_doc and (old_doc.student, old_doc.course_offer) != (self.student, self.course_offer):
+				mark_dirty(old_doc.student, old_doc.course_offer)
+		except Exception as e:
+			frappe.log_error(message=f"Error triggering recalculation: {e!s}", title="Recalculation Trigger Error")
 
 	def trigger_session_update(self):
-		"""Update the parent Attendance Session counts"""
-		if self.attendance_session:
-			try:
-				doc = frappe.get_doc("Attendance Session", self.attendance_session)
-				doc.update_attendance_summary()
-				doc.save()
-			except Exception as e:
-				frappe.log_error(message=f"Error updating session summary: {str(e)}", title="Session Summary Update Error")
+		"""Mark the parent Attendance Session for a roll-up of its counts before commit"""
+		try:
+			from slcm.slcm.doctype.attendance_session.attendance_session import mark_session_dirty
+
+			mark_session_dirty(self.attendance_session)
+
+			old_doc = self.get_doc_before_save()
+			if old_doc and old_doc.attendance_session != self.attendance_session:
+				mark_session_dirty(old_doc.attendance_session)
+		except Exception as e:
+			frappe.log_error(message=f"Error updating session summary: {e!s}", title="Session Summary Update Error")
 
 
 @frappe.whitelist()
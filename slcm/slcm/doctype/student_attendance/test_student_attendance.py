@@ -1,9 +1,136 @@
 # Copyright (c) 2025, Nishanth and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import today
+
+from slcm.slcm.doctype.attendance_summary.test_attendance_summary import (
+	create_attendance,
+	create_course_offering,
+	create_session,
+	create_student,
+)
+from slcm.slcm.utils.attendance_marking import mark_roster, summarize
 
 
 class TestStudentAttendance(FrappeTestCase):
-	pass
+	def setUp(self):
+		self.students = [create_student(f"Roster Student {i}") for i in range(3)]
+		self.offering = create_course_offering("TEST-ROSTER-MARKING")
+		self.session = create_session(self.offering.name, "Lecture", "09:00:00", "10:00:00")
+		self.match = {
+			"attendance_date": today(),
+			"based_on": "Course Schedule",
+			"course_offer": self.offering.name,
+			"course_schedule": None,
+		}
+		self.values = {
+			"date": today(),
+			"session_type": "Lecture",
+			"hours_counted": 1,
+			"source": "Manual",
+		}
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def mark(self, statuses, attendance_session=None):
+		return mark_roster(statuses, self.match, self.values, attendance_session=attendance_session)
+
+	def get_records(self):
+		return frappe.get_all(
+			"Student Attendance",
+			filters={"course_offer": self.offering.name, "student": ["in", [s.name for s in self.students]]},
+			fields=["name", "student", "status"],
+		)
+
+	def test_first_submission_creates_records(self):
+		statuses = {s.name: "Present" for s in self.students}
+
+		diff = self.mark(statuses)
+
+		self.assertCountEqual(diff["created"], list(statuses))
+		self.assertEqual(diff["updated"], [])
+		self.assertEqual(diff["unchanged"], [])
+		self.assertEqual({r.student: r.status for r in self.get_records()}, statuses)
+
+	def test_resubmitting_same_sheet_leaves_records_unchanged(self):
+		statuses = {s.name: "Present" for s in self.students}
+		self.mark(statuses)
+		modified = {r.name: frappe.db.get_value("Student Attendance", r.name, "modified") for r in self.get_records()}
+
+		diff = self.mark(statuses)
+
+		self.assertEqual(diff["created"], [])
+		self.assertEqual(diff["updated"], [])
+		self.assertCountEqual(diff["unchanged"], list(statuses))
+		# No new rows and nothing rewritten
+		records = self.get_records()
+		self.assertEqual(len(records), len(statuses))
+		for record in records:
+			self.assertEqual(frappe.db.get_value("Student Attendance", record.name, "modified"), modified[record.name])
+
+	def test_status_flip_updates_only_changed_row(self):
+		first, second, third = (s.name for s in self.students)
+		self.mark({first: "Present", second: "Present", third: "Absent"})
+
+		diff = self.mark({first: "Absent", second: "Present", third: "Absent"})
+
+		self.assertEqual(diff["created"], [])
+		self.assertEqual(diff["updated"], [{"student": first, "old_status": "Present", "new_status": "Absent"}])
+		self.assertCountEqual(diff["unchanged"], [second, third])
+
+		record = frappe.db.get_value("Student Attendance", {"student": first, "course_offer": self.offering.name},
+			["name", "status"], as_dict=True)
+		self.assertEqual(record.status, "Absent")
+		self.assertTrue(frappe.db.exists("Attendance Edit Log", {
+			"attendance_record": record.name,
+			"field_changed": "status",
+			"old_value": "Present",
+			"new_value": "Absent",
+		}))
+
+	def test_record_matched_through_session(self):
+		first, second = self.students[0].name, self.students[1].name
+		# Marked from another screen: only the session links it to this roster
+		existing = create_attendance(first, self.offering.name, "Absent", "Lecture", 1, session=self.session)
+
+		diff = self.mark({first: "Present", second: "Present"}, attendance_session=self.session.name)
+
+		self.assertEqual(diff["created"], [second])
+		self.assertEqual(diff["updated"], [{"student": first, "old_status": "Absent", "new_status": "Present"}])
+		self.assertEqual(frappe.db.get_value("Student Attendance", existing.name, "status"), "Present")
+		self.assertEqual(frappe.db.count("Student Attendance", {"student": first, "course_offer": self.offering.name}), 1)
+
+		diff = self.mark({first: "Present", second: "Present"}, attendance_session=self.session.name)
+		self.assertCountEqual(diff["unchanged"], [first, second])
+
+	def test_marking_requires_permission(self):
+		first, second = self.students[0].name, self.students[1].name
+		self.mark({first: "Present"})
+
+		frappe.set_user("Guest")
+		try:
+			self.assertRaises(frappe.PermissionError, self.mark, {second: "Present"})
+			self.assertRaises(frappe.PermissionError, self.mark, {first: "Absent"})
+			# Nothing to write, nothing to check
+			self.assertEqual(self.mark({first: "Present"})["unchanged"], [first])
+		finally:
+			frappe.set_user("Administrator")
+
+		self.assertFalse(frappe.db.exists("Student Attendance", {"student": second, "course_offer": self.offering.name}))
+		self.assertEqual(frappe.db.get_value("Student Attendance", {"student": first, "course_offer": self.offering.name},
+			"status"), "Present")
+
+	def test_summarize_counts_and_errors(self):
+		first, second, third = (s.name for s in self.students)
+		self.mark({first: "Present"})
+
+		response = summarize(self.mark({first: "Late", second: "Present", "STUDENT-MISSING": "Present", third: "Away"}))
+
+		self.assertEqual(response["created"], 1)
+		self.assertEqual(response["updated"], 1)
+		self.assertEqual(response["unchanged"], 0)
+		self.assertEqual(response["total_processed"], 2)
+		self.assertEqual(len(response["errors"]), 2)
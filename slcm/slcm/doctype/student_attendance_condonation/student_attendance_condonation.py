@@ -3,7 +3,9 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import flt
+from frappe.utils import flt, nowdate
+
+from slcm.slcm.utils.attendance_facts import mark_facts_dirty
 
 class StudentAttendanceCondonation(Document):
 	def validate(self):
@@ -12,6 +14,10 @@ class StudentAttendanceCondonation(Document):
 		# Auto-fill approver
 		if self.final_status in ["Approved", "Rejected"] and not self.approver:
 			self.approver = frappe.session.user
+
+		# Eligibility snapshots count approvals up to their cut-off date
+		if self.final_status == "Approved" and not self.approval_date:
+			self.approval_date = nowdate()
 	
 	def validate_shortage(self):
 		"""Ensure student actually has a shortage before allowing application"""
@@ -34,6 +40,12 @@ class StudentAttendanceCondonation(Document):
 			if summary.attendance_percentage >= min_req:
 				frappe.msgprint("Warning: Student already has sufficient attendance.", alert=True)
 
+	def on_change(self):
+		mark_facts_dirty([(self.student, self.course_offering)])
+
+	def on_trash(self):
+		mark_facts_dirty([(self.student, self.course_offering)])
+
 	def on_submit(self):
 		if self.final_status != "Approved":
 			frappe.throw("Only Approved applications can be submitted")
@@ -78,17 +78,41 @@ frappe.ui.form.on("Student Attendance Tool", {
 				"</div>"
 			);
 
+			const roster = {
+				based_on: frm.doc.based_on,
+				student_group: frm.doc.student_group,
+				date: frm.doc.date,
+				course_schedule: frm.doc.course_schedule,
+				class_schedule: frm.doc.class_schedule,
+			};
+			const key = JSON.stringify(roster);
+			frm.roster_cache = frm.roster_cache || {};
+			const cached = frm.roster_cache[key];
+
+			// Only the version is sent back; an unchanged roster comes back without rows
 			frappe.call({
-				method: "slcm.slcm.doctype.student_attendance_tool.student_attendance_tool.get_student_attendance_records",
+				method: "slcm.slcm.doctype.student_attendance_tool.student_attendance_tool.get_roster_snapshots",
 				args: {
-					based_on: frm.doc.based_on,
-					student_group: frm.doc.student_group,
-					date: frm.doc.date,
-					course_schedule: frm.doc.course_schedule,
-					class_schedule: frm.doc.class_schedule,
+					rosters: [Object.assign({ key: key }, roster)],
+					etags: cached ? { [key]: cached.etag } : {},
 				},
 				callback(r) {
-					frm.events.get_students(frm, r.message || []);
+					let snapshot = (r.message || {})[key] || {};
+					if (snapshot.not_modified && cached) {
+						snapshot = cached;
+					} else if (snapshot.etag) {
+						frm.roster_cache[key] = snapshot;
+					}
+
+					const students = (snapshot.rows || []).map(
+						([group_roll_number, student, student_name, status]) => ({
+							group_roll_number,
+							student,
+							student_name,
+							status,
+						})
+					);
+					frm.events.get_students(frm, students);
 				},
 			});
 		} else {
@@ -1,10 +1,18 @@
 # Copyright (c) 2025, Nishanth and contributors
 # For license information, please see license.txt
 
+import hashlib
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
 
+# Bump when the layout of the roster rows changes, so cached clients refetch
+ROSTER_VERSION = 1
+ROSTER_FIELDS = ["roll_number", "student", "student_name", "status"]
+ROSTER_CACHE_PREFIX = "slcm:attendance_roster:"
+ROSTER_CACHE_TTL = 15 * 60
+
 
 class StudentAttendanceTool(Document):
 	pass
@@ -21,9 +29,90 @@ def get_student_attendance_records(
 	"""
 	Get student list with existing attendance status
 	"""
+	roster = get_roster(based_on, date, student_group, course_schedule, class_schedule)
+	return [
+		{"student": student, "student_name": student_name, "group_roll_number": roll_number, "status": status}
+		for roll_number, student, student_name, status in roster["rows"]
+	]
+
+
+@frappe.whitelist()
+def get_roster_snapshot(
+	based_on=None,
+	date=None,
+	student_group=None,
+	course_schedule=None,
+	class_schedule=None,
+	etag=None,
+):
+	"""
+	Compact roster of one session: {version, etag, fields, rows} with rows of
+	[roll_number, student, student_name, status]. Answers 304 without a body
+	when the If-None-Match header (or `etag`) matches the current version.
+	"""
+	etag = etag or (frappe.request and frappe.request.headers.get("If-None-Match"))
+	roster = get_roster(based_on, date, student_group, course_schedule, class_schedule, etag=etag)
+
+	set_response_header("ETag", roster["etag"])
+	set_response_header("Cache-Control", "private, no-cache")
+	if roster.get("not_modified"):
+		frappe.local.response["http_status_code"] = 304
+		return None
+
+	return roster
+
+
+@frappe.whitelist()
+def get_roster_snapshots(rosters, etags=None):
+	"""
+	Rosters of several sessions in one call, e.g. the consecutive periods of a
+	day. `rosters` is a list of {key, based_on, date, student_group,
+	course_schedule, class_schedule}; `etags` maps key to the version the
+	client holds. Returns {key: snapshot}, where an unchanged roster is only
+	{etag, not_modified: 1}.
+	"""
+	rosters = frappe.parse_json(rosters) or []
+	etags = frappe.parse_json(etags) if etags else {}
+
+	snapshots = {}
+	for index, args in enumerate(rosters):
+		key = args.get("key") or str(index)
+		snapshots[key] = get_roster(
+			args.get("based_on"),
+			args.get("date"),
+			args.get("student_group"),
+			args.get("course_schedule"),
+			args.get("class_schedule"),
+			etag=etags.get(key),
+		)
+
+	return snapshots
+
+
+def get_roster(based_on, date=None, student_group=None, course_schedule=None, class_schedule=None, etag=None):
+	"""Versioned roster payload, or {etag, not_modified} when `etag` is current"""
+	validate_roster_args(based_on, date, student_group, course_schedule, class_schedule)
+
+	student_group = resolve_student_group(based_on, student_group, course_schedule, class_schedule)
+	if not student_group:
+		return {"version": ROSTER_VERSION, "etag": None, "fields": ROSTER_FIELDS, "rows": []}
 
-	# -------------------- VALIDATION --------------------
+	conditions, values = attendance_conditions(based_on, date, student_group, course_schedule, class_schedule)
+	current = get_roster_etag(student_group, conditions, values)
+	if etag and etag == current:
+		return {"etag": current, "not_modified": 1}
 
+	# Faculty sharing a section load the same version; keep it for the next one
+	cache_key = f"{ROSTER_CACHE_PREFIX}{current}"
+	roster = frappe.cache().get_value(cache_key)
+	if not roster:
+		roster = build_roster(student_group, conditions, values, current)
+		frappe.cache().set_value(cache_key, roster, expires_in_sec=ROSTER_CACHE_TTL)
+
+	return roster
+
+
+def validate_roster_args(based_on, date, student_group, course_schedule, class_schedule):
 	if not based_on:
 		frappe.throw(_("Based On is required"))
 
@@ -39,79 +128,89 @@ def get_student_attendance_records(
 		if not class_schedule:
 			frappe.throw(_("Class Schedule is required"))
 
-	# -------------------- RESOLVE STUDENT GROUP --------------------
 
+def resolve_student_group(based_on, student_group=None, course_schedule=None, class_schedule=None):
 	if based_on == "Course Schedule" and course_schedule:
-		student_group = frappe.db.get_value(
-			"Course Schedule",
-			course_schedule,
-			"student_group",
-		)
+		return frappe.db.get_value("Course Schedule", course_schedule, "student_group")
 
 	if based_on == "Class Schedule" and class_schedule:
-		student_group = frappe.db.get_value(
-			"Class Schedule",
-			class_schedule,
-			"student_group",
-		)
-
-	if not student_group:
-		return []
-
-	# -------------------- FETCH STUDENTS --------------------
-
-	student_list = frappe.get_all(
-		"Student Group Student",
-		fields=[
-			"student",
-			"student_name",
-			"group_roll_number",
-		],
-		filters={
-			"parent": student_group,
-			"active": 1,
-		},
-		order_by="group_roll_number",
-	)
+		return frappe.db.get_value("Class Schedule", class_schedule, "student_group")
 
-	if not student_list:
-		return []
+	return student_group
 
-	# -------------------- FETCH EXISTING ATTENDANCE --------------------
 
-	StudentAttendance = frappe.qb.DocType("Student Attendance")
-
-	query = (
-		frappe.qb.from_(StudentAttendance)
-		.select(
-			StudentAttendance.student,
-			StudentAttendance.status,
-		)
-		.where(StudentAttendance.docstatus < 2)
-	)
+def attendance_conditions(based_on, date, student_group, course_schedule, class_schedule):
+	"""Conditions selecting the existing Student Attendance shown for the roster"""
+	conditions = ["docstatus < 2"]
+	values = {
+		"date": date,
+		"student_group": student_group,
+		"course_schedule": course_schedule,
+		"class_schedule": class_schedule,
+	}
 
 	if based_on == "Course Schedule":
-		query = query.where(StudentAttendance.course_schedule == course_schedule)
+		conditions.append("course_schedule = %(course_schedule)s")
 
 	if based_on == "Class Schedule":
-		query = query.where(StudentAttendance.class_schedule == class_schedule)
+		conditions.append("class_schedule = %(class_schedule)s")
 
 	if date:
-		query = query.where(StudentAttendance.attendance_date == date)
+		conditions.append("attendance_date = %(date)s")
 
 	if based_on == "Student Group":
-		query = query.where(StudentAttendance.student_group == student_group)
-		query = query.where(
-			(StudentAttendance.course_schedule == "") | StudentAttendance.course_schedule.isnull()
-		)
+		conditions.append("student_group = %(student_group)s")
+		conditions.append("IFNULL(course_schedule, '') = ''")
+
+	return " AND ".join(conditions), values
+
 
-	attendance_rows = query.run(as_dict=True)
+def get_roster_etag(student_group, conditions, values):
+	"""Weak ETag from the group's and the matching records' modification stamps"""
+	group_modified = frappe.db.get_value("Student Group", student_group, "modified")
+	count, last_modified = frappe.db.sql(f"""
+		SELECT COUNT(*), MAX(modified)
+		FROM `tabStudent Attendance`
+		WHERE {conditions}
+	""", values)[0]
 
-	# -------------------- MERGE STATUS --------------------
+	stamp = "|".join(str(part) for part in (
+		ROSTER_VERSION, student_group, group_modified, values.get("date"),
+		values.get("course_schedule"), values.get("class_schedule"), count, last_modified
+	))
+	return f'W/"{hashlib.sha1(stamp.encode()).hexdigest()[:20]}"'
 
-	attendance_map = {row["student"]: row["status"] for row in attendance_rows}
 
-	for student in student_list:
-		student["status"] = attendance_map.get(student["student"], "Absent")
+def build_roster(student_group, conditions, values, etag):
+	students = frappe.get_all(
+		"Student Group Student",
+		fields=["group_roll_number", "student", "student_name"],
+		filters={"parent": student_group, "active": 1},
+		order_by="group_roll_number",
+	)
+
+	statuses = {}
+	if students:
+		statuses = dict(frappe.db.sql(f"""
+			SELECT student, status
+			FROM `tabStudent Attendance`
+			WHERE {conditions}
+			AND student IN %(students)s
+		""", dict(values, students=tuple(s.student for s in students))))
+
+	return {
+		"version": ROSTER_VERSION,
+		"etag": etag,
+		"student_group": student_group,
+		"fields": ROSTER_FIELDS,
+		"rows": [
+			[s.group_roll_number, s.student, s.student_name, statuses.get(s.student, "Absent")]
+			for s in students
+		],
+	}
+
 
-	return student_list
+def set_response_header(name, value):
+	headers = getattr(frappe.local, "response_headers", None)
+	if headers is not None and value:
+		headers[name] = value
@@ -4,6 +4,13 @@
 # import frappe
 from frappe.model.document import Document
 
+from slcm.slcm.utils.rfid_lookup_cache import clear_student_uid_cache
+
 
 class StudentRFIDCard(Document):
-	pass
+	def on_update(self):
+		# Card assignments feed the ingest endpoint's UID → student map
+		clear_student_uid_cache(self, "on_update")
+
+	def on_trash(self):
+		clear_student_uid_cache(self, "on_trash")
@@ -622,6 +622,9 @@ class StudentAttendanceTool {
 						if (r.message.updated > 0) {
 							details += ` | <strong>Updated:</strong> ${r.message.updated}`;
 						}
+						if (r.message.unchanged > 0) {
+							details += ` | <strong>Unchanged:</strong> ${r.message.unchanged}`;
+						}
 					}
 
 					frappe.show_alert(
@@ -669,6 +672,9 @@ class StudentAttendanceTool {
 						if (r.message.updated > 0) {
 							details += ` | <strong>Updated:</strong> ${r.message.updated}`;
 						}
+						if (r.message.unchanged > 0) {
+							details += ` | <strong>Unchanged:</strong> ${r.message.unchanged}`;
+						}
 					}
 
 					frappe.show_alert(
@@ -17,6 +17,12 @@ frappe.query_reports["Comprehensive Attendance Report"] = {
             "options": "Cohort",
             "reqd": 0
         },
+        {
+            "fieldname": "batch",
+            "label": __("Batch"),
+            "fieldtype": "Data",
+            "reqd": 0
+        },
         {
             "fieldname": "section",
             "label": __("Section"),
@@ -30,6 +36,69 @@ frappe.query_reports["Comprehensive Attendance Report"] = {
             "fieldtype": "Link",
             "options": "Course",
             "reqd": 0
+        },
+        {
+            "fieldname": "page_length",
+            "label": __("Rows per Page"),
+            "fieldtype": "Int",
+            "default": 1000
+        },
+        {
+            "fieldname": "after_student",
+            "fieldtype": "Data",
+            "hidden": 1
+        },
+        {
+            "fieldname": "after_course_offering",
+            "fieldtype": "Data",
+            "hidden": 1
+        },
+        {
+            "fieldname": "serial_start",
+            "fieldtype": "Int",
+            "hidden": 1
         }
-    ]
+    ],
+
+    onload: function(report) {
+        // Keyset pagination: continue after the last row shown
+        report.page.add_inner_button(__("Next Page"), function() {
+            const data = report.data || [];
+            const page_length = report.get_filter_value("page_length");
+            if (!page_length || data.length < page_length) {
+                frappe.msgprint(__("This is the last page"));
+                return;
+            }
+            const last = data[data.length - 1];
+            report.set_filter_value({
+                "after_student": last["Student ID"],
+                "after_course_offering": last["Course Offering"],
+                "serial_start": last["S.No"] + 1
+            });
+        });
+
+        report.page.add_inner_button(__("First Page"), function() {
+            report.set_filter_value({"after_student": "", "after_course_offering": "", "serial_start": 1});
+        });
+
+        // Full exports are built in the background page by page
+        ["CSV", "Excel"].forEach(function(file_format) {
+            report.page.add_inner_button(__(file_format), function() {
+                const filters = Object.assign({}, report.get_values());
+                delete filters.after_student;
+                delete filters.after_course_offering;
+                frappe.call({
+                    method: "slcm.slcm.report.comprehensive_attendance_report.comprehensive_attendance_report.start_export",
+                    args: {filters: filters, file_format: file_format},
+                    callback: function() {
+                        frappe.show_alert(__("Export started, you will be notified when the file is ready"));
+                    }
+                });
+            }, __("Export All"));
+        });
+
+        frappe.realtime.on("comprehensive_attendance_export", function(data) {
+            frappe.msgprint(__("Export ready: <a href='{0}' target='_blank'>{1}</a>", [data.file_url, data.file_name]));
+        });
+    }
 };
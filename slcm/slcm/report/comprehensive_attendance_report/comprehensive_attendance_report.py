@@ -2,34 +2,171 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 import os
+from frappe.utils import cint
+
+# Report filter -> column of `tabAttendance Fact`
+FILTER_COLUMNS = {
+    "department": "department",
+    "program": "program",
+    "batch": "batch",
+    "section": "section",
+    "course": "course",
+}
+
+DEFAULT_PAGE_LENGTH = 1000
+EXPORT_PAGE_LENGTH = 5000
+
+# Compiled query text per combination of active filters / cursor / limit
+_query_cache = {}
+
 
 def execute(filters=None):
-    if not filters:
-        filters = {}
-        
-    # Ensure defaults for all filters to avoid KeyError in SQL
-    filters.setdefault("department", None)
-    filters.setdefault("program", None)
-    filters.setdefault("batch", None)
-    filters.setdefault("section", None)
-    filters.setdefault("course", None)
-
-    # Read the SQL file
-    sql_file_path = os.path.join(os.path.dirname(__file__), "comprehensive_attendance_report.sql")
-    with open(sql_file_path, "r") as f:
-        sql_query = f.read()
-
-    # Execute SQL
-    data = frappe.db.sql(sql_query, filters, as_dict=True)
-    
+    """
+    One keyset page of the report. `page_length` limits the rows (0 returns
+    everything); `after_student` / `after_course_offering` continue after the
+    last row of the previous page, `serial_start` is the S.No of its first row.
+    """
+    filters = frappe._dict(filters or {})
+    page_length = cint(filters.get("page_length")) if filters.get("page_length") is not None else DEFAULT_PAGE_LENGTH
+
+    data = get_page(filters, page_length)
+
+    serial = cint(filters.get("serial_start")) or 1
+    for i, row in enumerate(data):
+        row["S.No"] = serial + i
+
+    return get_columns(), data
+
+
+def get_page(filters, page_length=0):
+    """Rows after the (after_student, after_course_offering) cursor, at most page_length of them"""
+    values = dict(filters)
+    values["page_length"] = page_length
+    return frappe.db.sql(get_query(filters, page_length), values, as_dict=True)
+
+
+def get_query(filters, page_length=0):
+    """Query text for the filters that are set; compiled once per combination"""
+    active = tuple(fieldname for fieldname in FILTER_COLUMNS if filters.get(fieldname))
+    has_cursor = bool(filters.get("after_student"))
+    key = (active, has_cursor, bool(page_length))
+
+    if key not in _query_cache:
+        # Only the filters that are set become conditions, each on an indexed fact column
+        conditions = "".join(f"\n    AND fact.{FILTER_COLUMNS[fieldname]} = %({fieldname})s" for fieldname in active)
+        if has_cursor:
+            conditions += """
+    AND (fact.student > %(after_student)s
+        OR (fact.student = %(after_student)s AND fact.course_offering > %(after_course_offering)s))"""
+
+        _query_cache[key] = (get_query_template()
+            .replace("{conditions}", conditions)
+            .replace("{limit}", "LIMIT %(page_length)s" if page_length else ""))
+
+    return _query_cache[key]
+
+
+def get_query_template():
+    if "template" not in _query_cache:
+        # Read the SQL file once per worker
+        sql_file_path = os.path.join(os.path.dirname(__file__), "comprehensive_attendance_report.sql")
+        with open(sql_file_path, "r") as f:
+            _query_cache["template"] = f.read()
+    return _query_cache["template"]
+
+
+def iter_rows(filters, page_length=EXPORT_PAGE_LENGTH):
+    """All rows, fetched one keyset page at a time"""
+    filters = frappe._dict(filters)
+    filters.pop("after_student", None)
+    filters.pop("after_course_offering", None)
+
+    serial = 1
+    while True:
+        rows = get_page(filters, page_length)
+        for row in rows:
+            row["S.No"] = serial
+            serial += 1
+            yield row
+
+        if len(rows) < page_length:
+            break
+        filters.after_student = rows[-1]["Student ID"]
+        filters.after_course_offering = rows[-1]["Course Offering"]
+
+
+@frappe.whitelist()
+def start_export(filters=None, file_format="CSV"):
+    """Build the full export in the background; the file URL is published when ready"""
+    frappe.has_permission("Attendance Summary", "report", throw=True)
+    if file_format not in ("CSV", "Excel"):
+        frappe.throw(_("Unsupported export format"))
+
+    frappe.enqueue(
+        "slcm.slcm.report.comprehensive_attendance_report.comprehensive_attendance_report.build_export",
+        queue="long",
+        timeout=3600,
+        filters=frappe.parse_json(filters) or {},
+        file_format=file_format,
+        user=frappe.session.user
+    )
+    return {"status": "queued"}
+
+
+def build_export(filters, file_format, user):
+    """Stream rows page by page into a private file, then notify the user"""
+    import csv
+
+    columns = get_columns()
+    fieldnames = [column["fieldname"] for column in columns]
+    extension = "csv" if file_format == "CSV" else "xlsx"
+    file_name = f"comprehensive_attendance_report_{frappe.generate_hash(length=8)}.{extension}"
+    path = frappe.get_site_path("private", "files", file_name)
+
+    if file_format == "CSV":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([column["label"] for column in columns])
+            for row in iter_rows(filters):
+                writer.writerow([row.get(fieldname) for fieldname in fieldnames])
+    else:
+        from openpyxl import Workbook
+
+        # write_only keeps only the current row in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Attendance")
+        sheet.append([column["label"] for column in columns])
+        for row in iter_rows(filters):
+            sheet.append([row.get(fieldname) for fieldname in fieldnames])
+        workbook.save(path)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1
+    })
+    file_doc.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    frappe.publish_realtime(
+        "comprehensive_attendance_export",
+        {"file_url": file_doc.file_url, "file_name": file_name},
+        user=user
+    )
+
+
+def get_columns():
     # Define Columns explicitly
-    columns = [
+    return [
         {"fieldname": "S.No", "label": "S.No", "fieldtype": "Int", "width": 50},
         {"fieldname": "Student ID", "label": "Student ID", "fieldtype": "Link", "options": "Student Master", "width": 120},
         {"fieldname": "Student Name", "label": "Student Name", "fieldtype": "Data", "width": 150},
         {"fieldname": "Section", "label": "Section", "fieldtype": "Data", "width": 80},
         {"fieldname": "Course Name", "label": "Course Name", "fieldtype": "Data", "width": 150},
+        {"fieldname": "Course Offering", "label": "Course Offering", "fieldtype": "Link", "options": "Course Offering", "width": 120},
         {"fieldname": "Applied for Condonation", "label": "Applied for Condonation", "fieldtype": "Data", "width": 120},
         {"fieldname": "Condonation Attachment", "label": "Condonation Attachment", "fieldtype": "Data", "width": 100},
         {"fieldname": "Condonation Status", "label": "Condonation Status", "fieldtype": "Data", "width": 100},
@@ -51,4 +188,3 @@ def execute(filters=None):
         {"fieldname": "Attendance Percentage After", "label": "Attendance % After", "fieldtype": "Percent", "width": 100},
     ]
 
-    return columns, data
@@ -6,11 +6,35 @@ frappe.query_reports["Consecutive Absents"] = {
             "fieldtype": "Int",
             "default": 3
         },
+        {
+            "fieldname": "from_date",
+            "label": __("From Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.add_days(frappe.datetime.get_today(), -30),
+            "reqd": 1
+        },
+        {
+            "fieldname": "to_date",
+            "label": __("To Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.get_today(),
+            "reqd": 1
+        },
         {
             "fieldname": "program",
             "label": __("Program"),
             "fieldtype": "Link",
             "options": "Cohort"
+        },
+        {
+            "fieldname": "per_course",
+            "label": __("Streaks per Course"),
+            "fieldtype": "Check"
+        },
+        {
+            "fieldname": "per_session_type",
+            "label": __("Streaks per Session Type"),
+            "fieldtype": "Check"
         }
     ]
 };
@@ -1,8 +1,16 @@
 import frappe
 from frappe import _
-from datetime import timedelta
+from frappe.utils import add_days, cint, getdate, today
+
+# Optional streak partitions: filter -> columns of the absent-day rows
+STREAK_PARTITIONS = {
+	"per_course": ["course_offer", "course"],
+	"per_session_type": ["session_type"],
+}
 
 def execute(filters=None):
+	filters = frappe._dict(filters or {})
+
 	columns = [
 		{
 			"fieldname": "student",
@@ -22,13 +30,47 @@ def execute(filters=None):
 			"label": _("Program"),
 			"fieldtype": "Data",
 			"width": 150
-		},
+		}
+	]
+
+	if filters.get("per_course"):
+		columns += [
+			{
+				"fieldname": "course_offer",
+				"label": _("Course Offering"),
+				"fieldtype": "Link",
+				"options": "Course Offering",
+				"width": 150
+			},
+			{
+				"fieldname": "course",
+				"label": _("Course"),
+				"fieldtype": "Data",
+				"width": 150
+			}
+		]
+
+	if filters.get("per_session_type"):
+		columns.append({
+			"fieldname": "session_type",
+			"label": _("Session Type"),
+			"fieldtype": "Data",
+			"width": 110
+		})
+
+	columns += [
 		{
 			"fieldname": "consecutive_days",
 			"label": _("Consecutive Days"),
 			"fieldtype": "Int",
 			"width": 120
 		},
+		{
+			"fieldname": "first_absent_date",
+			"label": _("Streak Start"),
+			"fieldtype": "Date",
+			"width": 120
+		},
 		{
 			"fieldname": "last_absent_date",
 			"label": _("Last Absent Date"),
@@ -36,66 +78,71 @@ def execute(filters=None):
 			"width": 120
 		}
 	]
-	
+
 	data = get_consecutive_absents(filters)
-	
+
 	return columns, data
 
 def get_consecutive_absents(filters):
-	# Fetch all absences ordered by student and date
-	# We limit to last 30 days by default to optmize, or use filter
-	
-	threshold = frappe.utils.cint(filters.get("threshold")) or 3
-	
-	conditions = "status = 'Absent'"
+	"""
+	Latest run of consecutive absent days per student (optionally per course
+	offering and/or session type) within the date range, computed in SQL as
+	gaps-and-islands: consecutive dates minus their rank share one anchor date.
+	"""
+	to_date = getdate(filters.get("to_date") or today())
+	from_date = getdate(filters.get("from_date") or add_days(to_date, -30))
+
+	values = {
+		"threshold": cint(filters.get("threshold")) or 3,
+		"from_date": from_date,
+		"to_date": to_date,
+		"program": filters.get("program"),
+	}
+
+	# Column lists come from STREAK_PARTITIONS only; every value is a query parameter
+	partition = [column for option, cols in STREAK_PARTITIONS.items() if filters.get(option) for column in cols]
+	extra_columns = "".join(f", {column}" for column in partition)
+	extra_select = "".join(f", streaks.{column}" for column in partition)
+	program_condition = ""
 	if filters.get("program"):
-		conditions += f" AND student IN (SELECT name FROM `tabStudent Master` WHERE programme = '{filters.get('program')}')"
-		
-	# Get absences
-	logs = frappe.db.sql(f"""
-		SELECT student, student_name, attendance_date, course, course_offer
-		FROM `tabStudent Attendance`
-		WHERE {conditions}
-		ORDER BY student, attendance_date DESC
-	""", as_dict=True)
-	
-	result = []
-	student_map = {}
-	
-	# Group by student
-	for log in logs:
-		if log.student not in student_map:
-			student_map[log.student] = []
-		student_map[log.student].append(log.attendance_date)
-		
-	# Check consecutive
-	for student, dates in student_map.items():
-		if len(dates) < threshold:
-			continue
-			
-		dates.sort(reverse=True) # Newest first
-		
-		consecutive = 1
-		for i in range(len(dates) - 1):
-			diff = (dates[i] - dates[i+1]).days
-			if diff == 1:
-				consecutive += 1
-			else:
-				# Break if gap found. 
-				# logic: we act on *current* consecutive streak? 
-				# Or any streak? Usually current alert.
-				break
-				
-		if consecutive >= threshold:
-			# Get student details
-			student_details = frappe.db.get_value("Student Master", student, ["first_name", "programme"], as_dict=True)
-			
-			result.append({
-				"student": student,
-				"student_name": student_details.first_name if student_details else "",
-				"program": student_details.programme if student_details else "",
-				"consecutive_days": consecutive,
-				"last_absent_date": dates[0]
-			})
-			
-	return result
+		program_condition = "AND student IN (SELECT name FROM `tabStudent Master` WHERE programme = %(program)s)"
+
+	return frappe.db.sql(f"""
+		WITH absent_days AS (
+			SELECT DISTINCT student{extra_columns}, attendance_date
+			FROM `tabStudent Attendance`
+			WHERE status = 'Absent'
+			AND docstatus < 2
+			AND attendance_date BETWEEN %(from_date)s AND %(to_date)s
+			{program_condition}
+		),
+		islands AS (
+			SELECT
+				student{extra_columns}, attendance_date,
+				DATE_SUB(attendance_date, INTERVAL DENSE_RANK() OVER (
+					PARTITION BY student{extra_columns} ORDER BY attendance_date
+				) DAY) as island
+			FROM absent_days
+		),
+		streaks AS (
+			SELECT
+				student{extra_columns},
+				COUNT(*) as consecutive_days,
+				MIN(attendance_date) as first_absent_date,
+				MAX(attendance_date) as last_absent_date,
+				ROW_NUMBER() OVER (
+					PARTITION BY student{extra_columns} ORDER BY MAX(attendance_date) DESC
+				) as recency
+			FROM islands
+			GROUP BY student{extra_columns}, island
+		)
+		SELECT
+			streaks.student, stu.first_name as student_name, stu.programme as program
+			{extra_select},
+			streaks.consecutive_days, streaks.first_absent_date, streaks.last_absent_date
+		FROM streaks
+		JOIN `tabStudent Master` stu ON stu.name = streaks.student
+		WHERE streaks.recency = 1
+		AND streaks.consecutive_days >= %(threshold)s
+		ORDER BY streaks.consecutive_days DESC, streaks.student
+	""", values, as_dict=True)
@@ -10,8 +10,7 @@ frappe.query_reports["Course Completion"] = {
         {
             "fieldname": "term",
             "label": __("Term"),
-            "fieldtype": "Link",
-            "options": "Term"
+            "fieldtype": "Data"
         }
     ]
 };
@@ -60,69 +60,52 @@ def execute(filters=None):
 	return columns, data
 
 def get_course_completion_data(filters):
-	# 1. Get Settings for Planned Hours
-	settings = frappe.get_single("Attendance Settings")
-	core_hours = flt(settings.core_course_hours)
-	elective_hours = flt(settings.elective_course_hours)
-	
-	conditions = "1=1"
+	"""
+	Planned vs conducted hours for every matching offering in one query.
+	Conducted hours come from the Course Offering.conducted_hours counter
+	maintained by Attendance Session.
+	"""
+	filters = filters or {}
+
+	# 1. Planned hours from Attendance Settings, resolved once
+	core_hours = flt(frappe.db.get_single_value("Attendance Settings", "core_course_hours"))
+	elective_hours = flt(frappe.db.get_single_value("Attendance Settings", "elective_course_hours"))
+
+	conditions = ""
 	if filters.get("term"):
-		conditions += f" AND co.term_name = '{filters.get('term')}'"
+		conditions += " AND co.term_name = %(term)s"
 	if filters.get("academic_year"):
-		conditions += f" AND co.academic_year = '{filters.get('academic_year')}'"
-		
-	# 2. Fetch Course Offerings with Course details
-	offerings = frappe.db.sql(f"""
-		SELECT 
+		conditions += " AND co.academic_year = %(academic_year)s"
+
+	# 2. Offerings with course type and instructor, planned hours and completion in SQL
+	data = frappe.db.sql(f"""
+		SELECT
 			co.name as course_offering,
-			co.course_title as course_name,
-			co.instructor_name as instructor,
-			c.course_type
+			COALESCE(co.course_name, co.course_title) as course_name,
+			TRIM(CONCAT(COALESCE(f.first_name, ''), ' ', COALESCE(f.last_name, ''))) as instructor,
+			c.course_type,
+			CASE WHEN c.course_type = 'Elective' THEN %(elective_hours)s ELSE %(core_hours)s END as planned_hours,
+			COALESCE(co.conducted_hours, 0) as conducted_hours
 		FROM `tabCourse Offering` co
-		LEFT JOIN `tabCourse` c ON c.name = co.course
-		WHERE {conditions}
-	""", as_dict=True)
-	
-	result = []
-	
-	for off in offerings:
-		# Determine Planned Hours
-		planned = core_hours # Default
-		if off.course_type == "Elective":
-			planned = elective_hours
-			
-		# 3. Calculate Conducted Hours
-		# specific method to calculate hours from sessions
-		# Using SQL for aggregation
-		stats = frappe.db.sql("""
-			SELECT SUM(duration_in_hours) as conducted
-			FROM `tabAttendance Session`
-			WHERE course_offering = %s
-			AND session_status = 'Completed'
-		""", (off.course_offering), as_dict=True)
-		
-		conducted = flt(stats[0].conducted) if stats and stats[0].conducted else 0.0
-		
-		# 4. Calculate Percentage
+		LEFT JOIN `tabCourse` c ON c.name = co.course_title
+		LEFT JOIN `tabFaculty` f ON f.name = co.faculty
+		WHERE 1=1 {conditions}
+		ORDER BY co.name
+	""", dict(filters, core_hours=core_hours, elective_hours=elective_hours), as_dict=True)
+
+	for row in data:
+		# 3. Calculate Percentage
 		pct = 0.0
-		if planned > 0:
-			pct = (conducted / planned) * 100
-			
+		if row.planned_hours > 0:
+			pct = (flt(row.conducted_hours) / flt(row.planned_hours)) * 100
+
 		status = "On Track"
 		if pct >= 100:
 			status = "Completed"
 		elif pct < 50: # Arbitrary warning threshold, maybe improve later
 			status = "Lagging"
-			
-		result.append({
-			"course_offering": off.course_offering,
-			"course_name": off.course_name,
-			"instructor": off.instructor,
-			"course_type": off.course_type,
-			"planned_hours": planned,
-			"conducted_hours": conducted,
-			"completion_percentage": pct,
-			"status": status
-		})
-		
-	return result
+
+		row.completion_percentage = pct
+		row.status = status
+
+	return data
@@ -5,6 +5,22 @@ frappe.query_reports["Daily Absentees"] = {
             "label": __("Date"),
             "fieldtype": "Date",
             "default": frappe.datetime.get_today()
+        },
+        {
+            "fieldname": "program",
+            "label": __("Program"),
+            "fieldtype": "Link",
+            "options": "Cohort"
+        },
+        {
+            "fieldname": "section",
+            "label": __("Section"),
+            "fieldtype": "Data"
+        },
+        {
+            "fieldname": "course",
+            "label": __("Course"),
+            "fieldtype": "Data"
         }
     ]
 };
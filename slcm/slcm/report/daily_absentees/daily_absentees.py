@@ -1,7 +1,12 @@
 import frappe
 from frappe import _
+from frappe.utils import today
+
+from slcm.slcm.utils.absentee_snapshot import get_digest
 
 def execute(filters=None):
+	filters = frappe._dict(filters or {})
+
 	columns = [
 		{
 			"fieldname": "student",
@@ -17,17 +22,30 @@ def execute(filters=None):
 			"width": 200
 		},
 		{
-			"fieldname": "course",
-			"label": _("Course"),
+			"fieldname": "program",
+			"label": _("Program"),
 			"fieldtype": "Data",
 			"width": 150
 		},
 		{
-			"fieldname": "status",
-			"label": _("Status"),
+			"fieldname": "section",
+			"label": _("Section"),
 			"fieldtype": "Data",
 			"width": 100
 		},
+		{
+			"fieldname": "course",
+			"label": _("Course"),
+			"fieldtype": "Data",
+			"width": 150
+		},
+		{
+			"fieldname": "attendance_session",
+			"label": _("Session"),
+			"fieldtype": "Link",
+			"options": "Attendance Session",
+			"width": 150
+		},
 		{
 			"fieldname": "attendance_date",
 			"label": _("Date"),
@@ -35,21 +53,18 @@ def execute(filters=None):
 			"width": 100
 		}
 	]
-	
-	if not filters:
-		filters = {}
-		
-	conditions = ""
-	if filters.get("date"):
-		conditions += f" AND attendance_date = '{filters.get('date')}'"
-	else:
-		conditions += " AND attendance_date = CURDATE()"
-		
-	data = frappe.db.sql(f"""
-		SELECT student, student_name, course, status, attendance_date
-		FROM `tabStudent Attendance`
-		WHERE status = 'Absent' {conditions}
-		ORDER BY student
-	""", as_dict=True)
-	
-	return columns, data
+
+	# Served from the Daily Absentee snapshot (closed sessions only), cached per date
+	digest = get_digest(filters.get("date") or today())
+
+	data = [
+		row for row in digest["absentees"]
+		if all(not filters.get(field) or row.get(field) == filters.get(field) for field in ("program", "section", "course"))
+	]
+
+	report_summary = [
+		{"value": len({row.student for row in data}), "label": _("Absent Students"), "datatype": "Int", "indicator": "Red"},
+		{"value": len(data), "label": _("Missed Sessions"), "datatype": "Int", "indicator": "Orange"}
+	]
+
+	return columns, data, None, None, report_summary
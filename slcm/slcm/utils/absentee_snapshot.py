@@ -0,0 +1,230 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Per-day absentee snapshot (`tabDaily Absentee`).
+
+Holds the absent Student Attendance records of closed sessions (Conducted, or
+records not linked to a session) with the program/section/course they are
+counted under. Sessions being marked Conducted and attendance edits mark the
+affected (student, date) pairs; the pairs are rebuilt once before the
+transaction commits, the cached digest of each touched date is dropped and
+students crossing the daily threshold are reported to advisors.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.utils import cint, getdate, today
+
+CACHE_PREFIX = "slcm:daily_absentees:"
+ALERT_PREFIX = "slcm:daily_absence_alert:"
+ALERT_TTL = 2 * 24 * 60 * 60
+SAVEPOINT = "daily_absentees"
+
+
+def mark_absentees_dirty(pairs):
+	"""Rebuild the snapshot of these (student, attendance_date) pairs before the transaction commits"""
+	pairs = {(student, getdate(date)) for student, date in pairs if student and date}
+	if not pairs:
+		return
+
+	dirty = getattr(frappe.local, "dirty_absentees", None)
+	if dirty is None:
+		dirty = frappe.local.dirty_absentees = set()
+
+	if not dirty:
+		frappe.db.before_commit.add(flush_dirty_absentees)
+		frappe.db.after_rollback.add(dirty.clear)
+
+	dirty.update(pairs)
+
+
+def mark_session_absentees_dirty(session_name):
+	"""A session was closed or reopened: rebuild the day of every student marked in it"""
+	if not session_name:
+		return
+
+	rows = frappe.get_all("Student Attendance",
+		filters={"attendance_session": session_name},
+		fields=["student", "attendance_date"]
+	)
+	mark_absentees_dirty((row.student, row.attendance_date) for row in rows)
+
+
+def flush_dirty_absentees():
+	dirty = getattr(frappe.local, "dirty_absentees", None)
+	if not dirty:
+		return
+
+	pairs = set(dirty)
+	dirty.clear()
+
+	# A failed rebuild must not commit the DELETE without the re-insert
+	frappe.db.savepoint(SAVEPOINT)
+	try:
+		refresh_absentees(pairs)
+	except Exception as e:
+		frappe.db.rollback(save_point=SAVEPOINT)
+		frappe.log_error(message=f"Error refreshing daily absentees: {e!s}", title="Daily Absentee Error")
+
+
+def refresh_absentees(pairs):
+	"""Rebuild the snapshot rows of the given (student, attendance_date) pairs"""
+	students_by_date = defaultdict(set)
+	for student, date in pairs:
+		students_by_date[date].add(student)
+
+	for date, students in students_by_date.items():
+		values = {"date": date, "students": tuple(students)}
+		frappe.db.sql("""
+			DELETE FROM `tabDaily Absentee`
+			WHERE attendance_date = %(date)s
+			AND student IN %(students)s
+		""", values)
+		insert_absentees("AND sa.attendance_date = %(date)s AND sa.student IN %(students)s", values)
+
+	# Only once every date is rebuilt
+	for date, students in students_by_date.items():
+		clear_cache(date)
+		if date == getdate(today()):
+			send_threshold_alerts(date, students)
+
+
+def rebuild_daily_absentees(from_date=None, to_date=None):
+	"""Rebuild the snapshot for a date range (all history by default)"""
+	condition, values = "", {}
+	if from_date:
+		condition += " AND {table}.attendance_date >= %(from_date)s"
+		values["from_date"] = getdate(from_date)
+	if to_date:
+		condition += " AND {table}.attendance_date <= %(to_date)s"
+		values["to_date"] = getdate(to_date)
+
+	frappe.db.sql(f"""
+		DELETE FROM `tabDaily Absentee`
+		WHERE 1=1 {condition.format(table="`tabDaily Absentee`")}
+	""", values)
+	insert_absentees(condition.format(table="sa"), values)
+	frappe.db.commit()
+	frappe.cache().delete_keys(CACHE_PREFIX)
+
+
+def insert_absentees(condition, values):
+	"""INSERT ... SELECT of absent records of closed sessions; the row name is the attendance record"""
+	timestamp = frappe.utils.now()
+	frappe.db.sql(f"""
+		INSERT INTO `tabDaily Absentee`
+			(name, creation, modified, owner, modified_by, docstatus,
+			attendance_date, student, student_name, student_attendance,
+			program, section, course, course_offering, attendance_session)
+		SELECT
+			sa.name, %(timestamp)s, %(timestamp)s, %(user)s, %(user)s, 0,
+			sa.attendance_date, sa.student, COALESCE(stu.first_name, sa.student_name), sa.name,
+			stu.programme, sa.section, sa.course, sa.course_offer, sa.attendance_session
+		FROM `tabStudent Attendance` sa
+		LEFT JOIN `tabStudent Master` stu ON stu.name = sa.student
+		LEFT JOIN `tabAttendance Session` session ON session.name = sa.attendance_session
+		WHERE sa.status = 'Absent'
+		AND sa.docstatus < 2
+		AND sa.attendance_date IS NOT NULL
+		AND (sa.attendance_session IS NULL OR sa.attendance_session = ''
+			OR (session.session_status = 'Conducted' AND session.docstatus < 2))
+		{condition}
+	""", dict(values, timestamp=timestamp, user=frappe.session.user))
+
+
+def get_digest(date):
+	"""Absentees of a date with counts per program, section and course (cached until the date changes)"""
+	date = getdate(date)
+	return frappe.cache().get_value(f"{CACHE_PREFIX}{date}", generator=lambda: build_digest(date))
+
+
+def build_digest(date):
+	absentees = frappe.db.sql("""
+		SELECT student, student_name, program, section, course, course_offering,
+			attendance_session, student_attendance, attendance_date
+		FROM `tabDaily Absentee`
+		WHERE attendance_date = %s
+		ORDER BY student, course
+	""", (date,), as_dict=True)
+
+	counts = {}
+	for dimension in ("program", "section", "course"):
+		grouped = defaultdict(set)
+		for row in absentees:
+			grouped[row.get(dimension) or ""].add(row.student)
+		counts[dimension] = sorted(
+			({dimension: key, "students": len(students)} for key, students in grouped.items()),
+			key=lambda r: -r["students"]
+		)
+
+	return {
+		"date": str(date),
+		"absent_records": len(absentees),
+		"absent_students": len({row.student for row in absentees}),
+		"absentees": absentees,
+		"counts": counts,
+	}
+
+
+def clear_cache(date):
+	frappe.cache().delete_value(f"{CACHE_PREFIX}{getdate(date)}")
+
+
+def send_threshold_alerts(date, students):
+	"""Notify advisors once per student and day when absences reach the threshold"""
+	settings = frappe.db.get_value("Attendance Settings", None,
+		["daily_absence_alert_threshold", "absence_alert_role"], as_dict=True) or {}
+	threshold = cint(settings.get("daily_absence_alert_threshold"))
+	if threshold <= 0 or not settings.get("absence_alert_role"):
+		return
+
+	crossed = frappe.db.sql("""
+		SELECT student, MAX(student_name) as student_name, COUNT(*) as absences
+		FROM `tabDaily Absentee`
+		WHERE attendance_date = %(date)s
+		AND student IN %(students)s
+		GROUP BY student
+		HAVING COUNT(*) >= %(threshold)s
+	""", {"date": date, "students": tuple(students), "threshold": threshold}, as_dict=True)
+	if not crossed:
+		return
+
+	from frappe.desk.doctype.notification_log.notification_log import enqueue_create_notification
+
+	advisors = get_users_with_role(settings.get("absence_alert_role"))
+	if not advisors:
+		return
+
+	cache = frappe.cache()
+	for row in crossed:
+		# SET NX: one alert per student and day, however often the day is rebuilt
+		if not cache.execute_command(
+			"SET", cache.make_key(f"{ALERT_PREFIX}{date}:{row.student}"), 1, "NX", "EX", ALERT_TTL
+		):
+			continue
+
+		enqueue_create_notification(advisors, {
+			"type": "Alert",
+			"subject": frappe._("{0} ({1}) has been absent from {2} sessions on {3}").format(
+				row.student_name or row.student, row.student, row.absences, frappe.format(date, "Date")
+			),
+			"document_type": "Student Master",
+			"document_name": row.student,
+		})
+
+
+def get_users_with_role(role):
+	return frappe.get_all("Has Role",
+		filters={"role": role, "parenttype": "User", "parent": ["not in", ["Administrator", "Guest"]]},
+		pluck="parent",
+		distinct=True
+	)
+
+
+@frappe.whitelist()
+def get_daily_absentees(date=None):
+	"""Cached absentee digest of a date (today by default)"""
+	frappe.has_permission("Daily Absentee", "read", throw=True)
+	return get_digest(date or today())
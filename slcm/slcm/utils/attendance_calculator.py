@@ -12,25 +12,98 @@ from frappe import _
 from frappe.utils import flt
 
 
-def calculate_student_attendance(student, course_offering):
+class RecalculationContext:
+	"""
+	Values that are identical for every student of a course offering during a
+	recalculation run: Attendance Settings, the session denominator and the
+	Course Offering details. One context lives for the duration of a request or
+	background job (see get_recalculation_context).
+	"""
+
+	def __init__(self):
+		self._settings = None
+		self._sessions = {}
+		self._offerings = {}
+
+	@property
+	def settings(self):
+		if self._settings is None:
+			self._settings = frappe.get_single("Attendance Settings")
+		return self._settings
+
+	def get_sessions(self, course_offering):
+		"""Session statistics for the offering (see calculate_sessions)"""
+		if course_offering not in self._sessions:
+			self._sessions[course_offering] = calculate_sessions(course_offering)
+		return self._sessions[course_offering]
+
+	def get_offering(self, course_offering):
+		"""Course title, term and academic year of the offering"""
+		if course_offering not in self._offerings:
+			self._offerings[course_offering] = frappe.db.get_value(
+				"Course Offering",
+				course_offering,
+				["course_title", "term_name", "academic_year"],
+				as_dict=True
+			)
+		return self._offerings[course_offering]
+
+	def get_course_title(self, course_offering):
+		offering = self.get_offering(course_offering)
+		return offering.course_title if offering else None
+
+	def invalidate_settings(self):
+		self._settings = None
+
+	def invalidate_offering(self, course_offering):
+		self._sessions.pop(course_offering, None)
+		self._offerings.pop(course_offering, None)
+
+
+def get_recalculation_context():
+	"""Return the recalculation context of the current request or job"""
+	if not getattr(frappe.local, "attendance_recalculation_context", None):
+		frappe.local.attendance_recalculation_context = RecalculationContext()
+	return frappe.local.attendance_recalculation_context
+
+
+def invalidate_recalculation_context(course_offering=None):
+	"""
+	Drop cached values from the current context.
+	Clears the Attendance Settings, or only one offering's values when given.
+	"""
+	context = getattr(frappe.local, "attendance_recalculation_context", None)
+	if not context:
+		return
+
+	if course_offering:
+		context.invalidate_offering(course_offering)
+	else:
+		context.invalidate_settings()
+
+
+def calculate_student_attendance(student, course_offering, context=None):
 	"""
 	Calculate attendance for a single student in a specific course offering.
 	
 	Args:
 		student: Student ID
 		course_offering: Course Offering ID
+		context: RecalculationContext (optional, defaults to the current job's)
 	
 	Returns:
 		dict: Attendance summary with all calculated fields
 	"""
+	context = context or get_recalculation_context()
+
 	# Get or create attendance summary
 	summary = get_or_create_summary(student, course_offering)
 	
 	# Get Settings
-	settings = frappe.get_single("Attendance Settings")
+	settings = context.settings
 	
 	# Calculate sessions
-	sessions_data = calculate_sessions(course_offering)
+	sessions_data = context.get_sessions(course_offering)
 	
 	# Calculate attendance
 	attendance_data = calculate_attendance_records(student, course_offering)
@@ -76,7 +149,7 @@ def calculate_student_attendance(student, course_offering):
 	
 	# Check FA/MFA status (Override)
 	if not is_eligible and settings.allow_fa_mfa:
-		if check_fa_mfa_eligibility(student, course_offering):
+		if check_fa_mfa_eligibility(student, course_offering, course_id=context.get_course_title(course_offering)):
 			is_eligible = 1
 			# Optionally log or mark separate field that it is via FA/MFA
 	
@@ -84,10 +157,10 @@ def calculate_student_attendance(student, course_offering):
 	# summary.eligibility_status = "Eligible" if is_eligible else "Shortage"
 	
 	# Populate Application Lists (Condonation & FA/MFA)
-	populate_application_lists(summary, student, course_offering)
+	populate_application_lists(summary, student, course_offering, context=context)
 	
 	# Populate Student Group (Section)
-	student_group = get_student_group(student, course_offering)
+	student_group = get_student_group(student, course_offering, context=context)
 	summary.student_group = student_group
 	if student_group:
 		summary.section = frappe.db.get_value("Student Group", student_group, "section")
@@ -213,23 +286,15 @@ def get_or_create_summary(student, course_offering):
 @frappe.whitelist()
 def calculate_course_attendance(course_offering):
 	"""Calculate attendance for all students in a course offering"""
-	students = frappe.db.sql("""
-		SELECT DISTINCT student
-		FROM `tabStudent Attendance`
-		WHERE course_offer = %s
-	""", course_offering, as_dict=True)
-	
-	results = []
-	for student_row in students:
-		result = calculate_student_attendance(student_row.student, course_offering)
-		results.append(result)
-	
-	return results
+	from slcm.slcm.utils.bulk_attendance_calculator import recalculate_summaries
+
+	return recalculate_summaries(course_offerings=[course_offering])
 
 
 @frappe.whitelist()
 def calculate_term_attendance(student, academic_term):
 	"""Calculate attendance for all courses in a term for a student"""
+	context = get_recalculation_context()
 	course_offerings = frappe.db.sql("""
 		SELECT DISTINCT course_offer
 		FROM `tabStudent Attendance`
@@ -239,35 +304,43 @@ def calculate_term_attendance(student, academic_term):
 	
 	results = []
 	for course_row in course_offerings:
-		result = calculate_student_attendance(student, course_row.course_offer)
+		result = calculate_student_attendance(student, course_row.course_offer, context=context)
 		results.append(result)
 	
 	return results
 
 
 @frappe.whitelist()
-def recalculate_all_summaries():
-	"""Recalculate all attendance summaries (scheduled job)"""
-	summaries = frappe.get_all("Attendance Summary", fields=["student", "course_offering"])
-	
-	count = 0
-	for summary in summaries:
-		try:
-			calculate_student_attendance(summary.student, summary.course_offering)
-			count += 1
-		except Exception as e:
-			frappe.log_error(message=f"Error calculating attendance for {summary.student}: {str(e)}", title="Attendance Calculation Error")
-	
-	return {"success": True, "recalculated": count}
+def recalculate_all_summaries(academic_term=None):
+	"""Recalculate all attendance summaries, optionally for one term (scheduled job)"""
+	from slcm.slcm.utils.bulk_attendance_calculator import recalculate_summaries
+
+	try:
+		results = recalculate_summaries(academic_term=academic_term)
+	except Exception as e:
+		frappe.log_error(message=f"Error recalculating attendance summaries: {e!s}", title="Attendance Calculation Error")
+		return {"success": False, "recalculated": 0}
+
+	return {"success": True, "recalculated": len(results)}
 
 
 @frappe.whitelist()
-def get_shortage_students(course_offering, threshold=None):
-	"""Get students below attendance threshold"""
+def get_shortage_students(course_offering, threshold=None, cutoff_date=None):
+	"""
+	Get students below attendance threshold, from the latest completed
+	Eligibility Snapshot of the offering (or the one at cutoff_date) when there is one
+	"""
+	from slcm.slcm.utils.eligibility_tool import get_latest_snapshot, get_snapshot_entries
+
 	if not threshold:
-		settings = frappe.get_single("Attendance Settings")
-		threshold = flt(settings.minimum_attendance_percentage)
-	
+		threshold = flt(get_recalculation_context().settings.minimum_attendance_percentage)
+
+	snapshot = get_latest_snapshot(course_offering, cutoff_date)
+	if snapshot:
+		entries = get_snapshot_entries(snapshot, course_offering,
+			below_percentage=threshold, order_by="attendance_percentage ASC")
+		return [snapshot_row(entry) for entry in entries]
+
 	shortage_students = frappe.db.sql("""
 		SELECT 
 			student,
@@ -284,8 +357,18 @@ def get_shortage_students(course_offering, threshold=None):
 
 
 @frappe.whitelist()
-def get_eligibility_list(course_offering):
-	"""Get list of eligible students for exams"""
+def get_eligibility_list(course_offering, cutoff_date=None):
+	"""
+	Get list of eligible students for exams, from the latest completed
+	Eligibility Snapshot of the offering (or the one at cutoff_date) when there is one
+	"""
+	from slcm.slcm.utils.eligibility_tool import get_latest_snapshot, get_snapshot_entries
+
+	snapshot = get_latest_snapshot(course_offering, cutoff_date)
+	if snapshot:
+		entries = get_snapshot_entries(snapshot, course_offering, statuses=["Eligible"])
+		return [snapshot_row(entry) for entry in entries]
+
 	eligible_students = frappe.db.sql("""
 		SELECT 
 			student,
@@ -301,11 +384,24 @@ def get_eligibility_list(course_offering):
 	return eligible_students
 
 
+def snapshot_row(entry):
+	"""Eligibility Snapshot Entry in the shape of the Attendance Summary based lists"""
+	return frappe._dict(
+		student=entry.student,
+		student_name=entry.student_name,
+		attendance_percentage=entry.attendance_percentage,
+		eligible_for_exam=1 if entry.status == "Eligible" else 0,
+		status=entry.status,
+		snapshot=entry.snapshot
+	)
+
+
 @frappe.whitelist()
-def check_fa_mfa_eligibility(student, course_offering):
+def check_fa_mfa_eligibility(student, course_offering, course_id=None):
 	"""Check if student has an approved FA/MFA application for this course"""
 	# Get Course ID from Offering
-	course_id = frappe.db.get_value("Course Offering", course_offering, "course_title")
+	if not course_id:
+		course_id = get_recalculation_context().get_course_title(course_offering)
 	
 	if not course_id:
 		return False
@@ -320,10 +416,12 @@ def check_fa_mfa_eligibility(student, course_offering):
 	return True if exists else False
 
 
-def populate_application_lists(summary, student, course_offering):
+def populate_application_lists(summary, student, course_offering, context=None):
 	"""
 	Populate Condonation and FA/MFA application tables in Attendance Summary.
 	"""
+	context = context or get_recalculation_context()
+
 	# 1. Condonation Applications
 	summary.set("condonation_list", [])
 	
@@ -354,7 +452,7 @@ def populate_application_lists(summary, student, course_offering):
 	
 	try:
 		# Need Course ID for FA/MFA
-		course_id = frappe.db.get_value("Course Offering", course_offering, "course_title")
+		course_id = context.get_course_title(course_offering)
 		if course_id:
 			fa_mfa_apps = frappe.get_all("FA MFA Application",
 				filters={
@@ -377,11 +475,13 @@ def populate_application_lists(summary, student, course_offering):
 		frappe.log_error(message=f"Error fetching FA/MFA list: {str(e)}", title="FA/MFA List Fetch Error")
 
 
-def get_student_group(student, course_offering):
+def get_student_group(student, course_offering, context=None):
 	"""
 	Get the primary Student Group (Section) for a student in this course offering.
 	Fetches from the most recent Student Attendance record.
 	"""
+	context = context or get_recalculation_context()
+
 	# Try fetching from latest attendance record for this course offering
 	# Using SQL to ensure latest record is fetched correctly
 	groups = frappe.db.sql("""
@@ -396,7 +496,7 @@ def get_student_group(student, course_offering):
 		
 	# Fallback: Try connection via Course Offering if no attendance yet
 	try:
-		offering_details = frappe.db.get_value("Course Offering", course_offering, ["course_title", "term_name", "academic_year"], as_dict=True)
+		offering_details = context.get_offering(course_offering)
 		if offering_details:
 			groups = frappe.db.sql("""
 				SELECT parent
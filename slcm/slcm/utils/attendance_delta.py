@@ -0,0 +1,174 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Incremental Attendance Summary maintenance.
+
+When "Incremental Summary Updates" is enabled in Attendance Settings, each
+Student Attendance change applies a signed delta to `attended_classes` and
+each Attendance Session status change applies a delta to `total_classes` of
+every summary in the offering, instead of re-aggregating the full history.
+`reconcile_summaries` (daily) recomputes everything and logs any drift.
+"""
+
+import frappe
+from frappe.utils import flt
+
+from slcm.slcm.utils.attendance_calculator import get_recalculation_context
+
+ATTENDED_STATUSES = ("Present", "Late", "Excused")
+CLASS_SESSION_TYPES = ("Lecture", "Tutorial")
+DRIFT_TOLERANCE = 0.01
+
+
+def is_incremental_mode():
+	return bool(get_recalculation_context().settings.get("incremental_summary_updates"))
+
+
+def attended_contribution(doc):
+	"""Hours a Student Attendance record adds to attended_classes"""
+	if not doc or doc.docstatus == 2 or doc.status not in ATTENDED_STATUSES:
+		return 0
+
+	if doc.session_type in CLASS_SESSION_TYPES:
+		return flt(doc.hours_counted)
+
+	if doc.session_type == "Office Hour" and get_recalculation_context().settings.include_office_hours_in_attendance:
+		return flt(doc.hours_counted)
+
+	return 0
+
+
+def conducted_contribution(doc):
+	"""Hours an Attendance Session adds to total_classes"""
+	if not doc or doc.session_type not in CLASS_SESSION_TYPES or doc.session_status != "Conducted":
+		return 0
+	return flt(doc.duration_hours)
+
+
+def apply_attendance_delta(before, after):
+	"""
+	Apply the change between two versions of a Student Attendance record.
+	`before` is None for an insert, `after` is None for a delete.
+	"""
+	from slcm.slcm.utils.recalculation_queue import mark_dirty
+
+	changes = {}
+	for doc, sign in ((before, -1), (after, 1)):
+		if doc and doc.student and doc.course_offer:
+			key = (doc.student, doc.course_offer)
+			changes[key] = changes.get(key, 0) + sign * attended_contribution(doc)
+
+	for (student, course_offering), delta in changes.items():
+		if not delta:
+			continue
+		if not apply_attended_delta(student, course_offering, delta):
+			# No summary yet: let the full calculation create it
+			mark_dirty(student, course_offering)
+
+
+def apply_attended_delta(student, course_offering, delta):
+	"""Add delta hours to one summary. Returns False when the summary does not exist."""
+	summary = frappe.db.get_value(
+		"Attendance Summary", {"student": student, "course_offering": course_offering}, "name"
+	)
+	if not summary:
+		return False
+
+	frappe.db.sql("""
+		UPDATE `tabAttendance Summary`
+		SET attended_classes = attended_classes + %s
+		WHERE name = %s
+	""", (delta, summary))
+
+	refresh_percentages("name = %(summary)s", {"summary": summary})
+	return True
+
+
+def apply_session_delta(before, after):
+	"""
+	Apply the change between two versions of an Attendance Session to the
+	total_classes of every summary in the offering.
+	"""
+	changes = {}
+	for doc, sign in ((before, -1), (after, 1)):
+		if doc and doc.course_offering:
+			changes[doc.course_offering] = changes.get(doc.course_offering, 0) + sign * conducted_contribution(doc)
+
+	for course_offering, delta in changes.items():
+		if not delta:
+			continue
+
+		frappe.db.sql("""
+			UPDATE `tabAttendance Summary`
+			SET total_classes = total_classes + %s
+			WHERE course_offering = %s
+		""", (delta, course_offering))
+
+		refresh_percentages("course_offering = %(course_offering)s", {"course_offering": course_offering})
+
+
+def refresh_percentages(condition, values):
+	"""Recompute attendance_percentage and eligible_for_exam from the stored hours"""
+	settings = get_recalculation_context().settings
+	values = dict(values, minimum_required=flt(settings.minimum_attendance_percentage),
+		allow_fa_mfa=1 if settings.allow_fa_mfa else 0)
+
+	frappe.db.sql(f"""
+		UPDATE `tabAttendance Summary` summary
+		SET
+			summary.attendance_percentage = CASE
+				WHEN summary.total_classes > 0 THEN (summary.attended_classes / summary.total_classes) * 100
+				ELSE 0
+			END,
+			summary.eligible_for_exam = CASE
+				WHEN summary.total_classes > 0
+					AND (summary.attended_classes / summary.total_classes) * 100 >= %(minimum_required)s THEN 1
+				WHEN summary.total_classes <= 0 AND 0 >= %(minimum_required)s THEN 1
+				WHEN %(allow_fa_mfa)s = 1 AND EXISTS (
+					SELECT 1 FROM `tabFA MFA Application` fa
+					WHERE fa.student = summary.student
+					AND fa.course = summary.course
+					AND fa.status = 'Approved'
+					AND fa.docstatus = 1
+				) THEN 1
+				ELSE 0
+			END,
+			summary.last_updated = NOW()
+		WHERE {condition}
+	""", values)
+
+
+def reconcile_summaries(academic_term=None):
+	"""
+	Full recompute of every summary (scheduled daily in incremental mode).
+	Logs the summaries whose incrementally maintained hours had drifted.
+	"""
+	if not is_incremental_mode():
+		return
+
+	from slcm.slcm.utils.bulk_attendance_calculator import recalculate_summaries
+
+	stored = {
+		row.name: row
+		for row in frappe.get_all("Attendance Summary", fields=["name", "total_classes", "attended_classes"])
+	}
+
+	results = recalculate_summaries(academic_term=academic_term)
+
+	drifted = []
+	for row in results:
+		old = stored.get(row.name)
+		if not old:
+			continue
+		if (abs(flt(old.total_classes) - row.total_classes) > DRIFT_TOLERANCE
+				or abs(flt(old.attended_classes) - row.attended_classes) > DRIFT_TOLERANCE):
+			drifted.append(row.name)
+
+	if drifted:
+		frappe.log_error(
+			message=f"{len(drifted)} summaries corrected: {', '.join(drifted[:100])}",
+			title="Attendance Summary Drift"
+		)
+
+	return {"success": True, "recalculated": len(results), "drifted": len(drifted)}
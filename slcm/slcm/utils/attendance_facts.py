@@ -0,0 +1,359 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Attendance Fact maintenance.
+
+`tabAttendance Fact` holds one row per Attendance Summary (student, course
+offering) with the held/attended hours, condonation and FA/MFA aggregates the
+Comprehensive Attendance Report needs, together with the student attributes it
+filters on. Attendance hooks mark the affected pairs (or offerings, for session
+changes) and the rows are refreshed once before the transaction commits.
+`rebuild_attendance_facts` recomputes everything (daily and on demand).
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.utils import flt, now
+
+BATCH_SIZE = 500
+ATTENDED_STATUSES = ("Present", "Late", "Excused")
+CLASS_SESSION_TYPES = ("Lecture", "Tutorial")
+
+FACT_FIELDS = [
+	"student", "student_name", "course_offering", "course", "section", "department", "program", "batch",
+	"classes_held", "office_hours_held", "attended_regular_hours", "attended_oh_hours",
+	"applied_condonation", "condonation_status", "approved_condonation_hours",
+	"condonation_reason", "condonation_remarks", "condonation_attachments",
+	"applied_famfa", "famfa_status", "approved_famfa_hours", "famfa_reason", "famfa_remarks", "famfa_attachments",
+	"last_refreshed",
+]
+
+
+def mark_facts_dirty(pairs):
+	"""Refresh the facts of these (student, course_offering) pairs before the transaction commits"""
+	pairs = {(student, co) for student, co in pairs if student and co}
+	if not pairs:
+		return
+
+	dirty = get_dirty()
+	dirty.pairs.update(pairs)
+
+
+def mark_held_hours_dirty(*course_offerings):
+	"""Refresh the held hours of every fact in these offerings before the transaction commits"""
+	course_offerings = {co for co in course_offerings if co}
+	if not course_offerings:
+		return
+
+	dirty = get_dirty()
+	dirty.offerings.update(course_offerings)
+
+
+def mark_student_course_dirty(student, course):
+	"""FA/MFA applications are per course: refresh every offering of it the student has a summary for"""
+	if not student or not course:
+		return
+
+	offerings = frappe.get_all("Attendance Summary",
+		filters={"student": student, "course": course},
+		pluck="course_offering"
+	)
+	mark_facts_dirty((student, co) for co in offerings)
+
+
+def update_student_attributes(doc, method=None):
+	"""doc_event for Student Master: keep the denormalized filter columns in step"""
+	before = doc.get_doc_before_save()
+	if before and all(before.get(f) == doc.get(f) for f in ("first_name", "department", "programme", "batch_year")):
+		return
+
+	frappe.db.sql("""
+		UPDATE `tabAttendance Fact`
+		SET student_name = %(student_name)s, department = %(department)s,
+			program = %(program)s, batch = %(batch)s
+		WHERE student = %(student)s
+	""", {
+		"student": doc.name,
+		"student_name": doc.first_name,
+		"department": doc.department,
+		"program": doc.programme,
+		"batch": doc.batch_year,
+	})
+
+
+def get_dirty():
+	dirty = getattr(frappe.local, "dirty_attendance_facts", None)
+	if dirty is None:
+		dirty = frappe.local.dirty_attendance_facts = frappe._dict(pairs=set(), offerings=set())
+
+	if not dirty.pairs and not dirty.offerings:
+		frappe.db.before_commit.add(flush_dirty_facts)
+		frappe.db.after_rollback.add(clear_dirty_facts)
+
+	return dirty
+
+
+def clear_dirty_facts():
+	dirty = getattr(frappe.local, "dirty_attendance_facts", None)
+	if dirty:
+		dirty.pairs.clear()
+		dirty.offerings.clear()
+
+
+def flush_dirty_facts():
+	"""Refresh everything marked dirty in this request or job"""
+	dirty = getattr(frappe.local, "dirty_attendance_facts", None)
+	if not dirty:
+		return
+
+	pairs, offerings = set(dirty.pairs), set(dirty.offerings)
+	clear_dirty_facts()
+
+	try:
+		if pairs:
+			refresh_attendance_facts(pairs)
+		if offerings:
+			refresh_held_hours(offerings)
+	except Exception as e:
+		# The daily rebuild corrects anything missed here
+		frappe.log_error(message=f"Error refreshing attendance facts: {e!s}", title="Attendance Fact Error")
+
+
+def refresh_attendance_facts(pairs):
+	"""Recompute the facts of the given (student, course_offering) pairs"""
+	pairs = set(pairs)
+	students_by_offering = defaultdict(set)
+	for student, course_offering in pairs:
+		students_by_offering[course_offering].add(student)
+
+	rows = []
+	for course_offering, students in students_by_offering.items():
+		rows += build_facts([course_offering], students)
+
+	upsert_facts(rows)
+
+	# Pairs that no longer have a summary lose their fact
+	stale = pairs - {(row.student, row.course_offering) for row in rows}
+	for student, course_offering in stale:
+		frappe.db.delete("Attendance Fact", {"student": student, "course_offering": course_offering})
+
+
+def refresh_held_hours(course_offerings):
+	"""Update classes/office hours held of every fact in the offerings"""
+	frappe.db.sql("""
+		UPDATE `tabAttendance Fact` fact
+		LEFT JOIN (
+			SELECT
+				course_offering,
+				SUM(CASE WHEN session_type IN %(class_types)s THEN duration_hours ELSE 0 END) as classes_held,
+				SUM(CASE WHEN session_type = 'Office Hour' THEN duration_hours ELSE 0 END) as office_hours_held
+			FROM `tabAttendance Session`
+			WHERE course_offering IN %(offerings)s
+			AND session_status = 'Conducted'
+			AND docstatus < 2
+			GROUP BY course_offering
+		) held ON held.course_offering = fact.course_offering
+		SET
+			fact.classes_held = COALESCE(held.classes_held, 0),
+			fact.office_hours_held = COALESCE(held.office_hours_held, 0),
+			fact.last_refreshed = %(now)s
+		WHERE fact.course_offering IN %(offerings)s
+	""", {"offerings": tuple(course_offerings), "class_types": CLASS_SESSION_TYPES, "now": now()})
+
+
+def rebuild_attendance_facts(course_offerings=None):
+	"""
+	Recompute the facts of the given offerings, or of every offering with a
+	summary. Scheduled daily; also the initial fill.
+	"""
+	if course_offerings is None:
+		course_offerings = frappe.get_all("Attendance Summary", pluck="course_offering", distinct=True)
+
+	rebuilt = 0
+	for course_offering in course_offerings:
+		rows = build_facts([course_offering])
+		upsert_facts(rows)
+		rebuilt += len(rows)
+		frappe.db.commit()
+
+	# Facts whose summary has been deleted
+	frappe.db.sql("""
+		DELETE fact
+		FROM `tabAttendance Fact` fact
+		LEFT JOIN `tabAttendance Summary` summary
+			ON summary.student = fact.student AND summary.course_offering = fact.course_offering
+			AND summary.docstatus < 2
+		WHERE summary.name IS NULL
+	""")
+	frappe.db.commit()
+
+	return {"success": True, "rebuilt": rebuilt}
+
+
+def build_facts(course_offerings, students=None):
+	"""Fact rows for the summaries of the offerings, optionally limited to some students"""
+	values = {
+		"offerings": tuple(course_offerings),
+		"students": tuple(students or ()),
+		"class_types": CLASS_SESSION_TYPES,
+		"attended": ATTENDED_STATUSES,
+	}
+	summary_condition = "AND summary.student IN %(students)s" if students else ""
+	student_condition = "AND student IN %(students)s" if students else ""
+
+	summaries = frappe.db.sql(f"""
+		SELECT
+			summary.student, stu.first_name as student_name, summary.course_offering,
+			COALESCE(co.course_title, summary.course) as course, summary.section,
+			stu.department, stu.programme as program, stu.batch_year as batch
+		FROM `tabAttendance Summary` summary
+		JOIN `tabStudent Master` stu ON summary.student = stu.name
+		LEFT JOIN `tabCourse Offering` co ON summary.course_offering = co.name
+		WHERE summary.course_offering IN %(offerings)s
+		AND summary.docstatus < 2
+		{summary_condition}
+	""", values, as_dict=True)
+
+	if not summaries:
+		return []
+
+	held = {
+		row.course_offering: row
+		for row in frappe.db.sql("""
+			SELECT
+				course_offering,
+				SUM(CASE WHEN session_type IN %(class_types)s THEN duration_hours ELSE 0 END) as classes_held,
+				SUM(CASE WHEN session_type = 'Office Hour' THEN duration_hours ELSE 0 END) as office_hours_held
+			FROM `tabAttendance Session`
+			WHERE course_offering IN %(offerings)s
+			AND session_status = 'Conducted'
+			AND docstatus < 2
+			GROUP BY course_offering
+		""", values, as_dict=True)
+	}
+
+	attended = {
+		(row.student, row.course_offering): row
+		for row in frappe.db.sql(f"""
+			SELECT
+				student, course_offer as course_offering,
+				SUM(CASE WHEN session_type IN %(class_types)s AND status IN %(attended)s
+					THEN hours_counted ELSE 0 END) as attended_regular_hours,
+				SUM(CASE WHEN session_type = 'Office Hour' AND status IN %(attended)s
+					THEN hours_counted ELSE 0 END) as attended_oh_hours
+			FROM `tabStudent Attendance`
+			WHERE course_offer IN %(offerings)s
+			AND docstatus < 2
+			{student_condition}
+			GROUP BY student, course_offer
+		""", values, as_dict=True)
+	}
+
+	condonations = {
+		(row.student, row.course_offering): row
+		for row in frappe.db.sql(f"""
+			SELECT
+				student, course_offering,
+				CASE
+					WHEN SUM(CASE WHEN final_status = 'Approved' THEN 1 ELSE 0 END) > 0 THEN 'Approved'
+					WHEN SUM(CASE WHEN final_status = 'Rejected' THEN 1 ELSE 0 END) = COUNT(*) THEN 'Rejected'
+					ELSE 'Applied / Pending'
+				END as condonation_status,
+				SUM(CASE WHEN final_status = 'Approved' THEN number_of_hours ELSE 0 END) as approved_condonation_hours,
+				GROUP_CONCAT(DISTINCT condonation_reason SEPARATOR '; ') as condonation_reason,
+				GROUP_CONCAT(DISTINCT remarks SEPARATOR '; ') as condonation_remarks,
+				GROUP_CONCAT(DISTINCT proof_document SEPARATOR ', ') as condonation_attachments
+			FROM `tabStudent Attendance Condonation`
+			WHERE course_offering IN %(offerings)s
+			AND docstatus < 2
+			{student_condition}
+			GROUP BY student, course_offering
+		""", values, as_dict=True)
+	}
+
+	# FA/MFA applications link to the course, not the offering
+	values["courses"] = tuple({row.course for row in summaries if row.course}) or ("",)
+	values["summary_students"] = tuple({row.student for row in summaries})
+	fa_mfa = {
+		(row.student, row.course): row
+		for row in frappe.db.sql("""
+			SELECT
+				student, course,
+				CASE
+					WHEN SUM(CASE WHEN status = 'Approved' THEN 1 ELSE 0 END) > 0 THEN 'Approved'
+					WHEN SUM(CASE WHEN status = 'Rejected' THEN 1 ELSE 0 END) = COUNT(*) THEN 'Rejected'
+					ELSE 'Pending'
+				END as famfa_status,
+				GROUP_CONCAT(DISTINCT reason SEPARATOR '; ') as famfa_reason,
+				GROUP_CONCAT(DISTINCT description SEPARATOR '; ') as famfa_remarks,
+				GROUP_CONCAT(DISTINCT proof_document SEPARATOR ', ') as famfa_attachments
+			FROM `tabFA MFA Application`
+			WHERE course IN %(courses)s
+			AND student IN %(summary_students)s
+			AND docstatus < 2
+			GROUP BY student, course
+		""", values, as_dict=True)
+	}
+
+	timestamp = now()
+	rows = []
+	for summary in summaries:
+		key = (summary.student, summary.course_offering)
+		offering_held = held.get(summary.course_offering) or {}
+		student_attended = attended.get(key) or {}
+		condonation = condonations.get(key)
+		application = fa_mfa.get((summary.student, summary.course))
+
+		rows.append(frappe._dict(
+			summary,
+			classes_held=flt(offering_held.get("classes_held")),
+			office_hours_held=flt(offering_held.get("office_hours_held")),
+			attended_regular_hours=flt(student_attended.get("attended_regular_hours")),
+			attended_oh_hours=flt(student_attended.get("attended_oh_hours")),
+			applied_condonation=1 if condonation else 0,
+			condonation_status=condonation.condonation_status if condonation else "Not Applied",
+			approved_condonation_hours=flt(condonation.approved_condonation_hours) if condonation else 0,
+			condonation_reason=condonation.condonation_reason if condonation else None,
+			condonation_remarks=condonation.condonation_remarks if condonation else None,
+			condonation_attachments=condonation.condonation_attachments if condonation else None,
+			applied_famfa=1 if application else 0,
+			famfa_status=application.famfa_status if application else "Not Applied",
+			# FA/MFA applications carry no hours in the current schema
+			approved_famfa_hours=0,
+			famfa_reason=application.famfa_reason if application else None,
+			famfa_remarks=application.famfa_remarks if application else None,
+			famfa_attachments=application.famfa_attachments if application else None,
+			last_refreshed=timestamp,
+		))
+
+	return rows
+
+
+def upsert_facts(rows):
+	"""Multi-row INSERT ... ON DUPLICATE KEY UPDATE on the (student, course_offering) key"""
+	if not rows:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	columns = ["name", "creation", "modified", "owner", "modified_by", "docstatus", *FACT_FIELDS]
+	column_list = ", ".join(f"`{column}`" for column in columns)
+	updates = ", ".join(f"`{field}` = VALUES(`{field}`)" for field in ["modified", "modified_by", *FACT_FIELDS])
+	row_placeholder = "({})".format(", ".join(["%s"] * len(columns)))
+
+	for start in range(0, len(rows), BATCH_SIZE):
+		chunk = rows[start:start + BATCH_SIZE]
+		values = []
+		for row in chunk:
+			values += [frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0]
+			values += [row.get(field) for field in FACT_FIELDS]
+
+		placeholders = ", ".join([row_placeholder] * len(chunk))
+
+		frappe.db.sql(f"""
+			INSERT INTO `tabAttendance Fact` ({column_list})
+			VALUES {placeholders}
+			ON DUPLICATE KEY UPDATE {updates}
+		""", values)
@@ -0,0 +1,161 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Composite indexes of the attendance hot paths.
+
+Created by the `add_attendance_composite_indexes` patch. `verify_indexes`
+checks that each one exists with the expected column order and
+`benchmark_query_plans` shows the plan and timing of the calculator, log
+processor and report queries with and without them:
+
+	bench --site <site> execute slcm.slcm.utils.attendance_indexes.benchmark_query_plans
+"""
+
+import time
+
+import frappe
+from frappe.utils import add_days, nowdate
+
+# (doctype, columns, index name)
+ATTENDANCE_INDEXES = [
+	# Calculator: attended/office hours of a student in an offering
+	("Student Attendance", ["student", "course_offer", "session_type"], "idx_student_offering_type"),
+	# RFID processor and session roll-up: the record of a student in a session
+	("Student Attendance", ["attendance_session", "student"], "idx_session_student"),
+	# Absence reports: equality on status first so a date range stays a range scan
+	("Student Attendance", ["status", "attendance_date"], "idx_status_date"),
+	# Log matcher: pending logs of a student in swipe order
+	("Attendance Log", ["processed", "student", "swipe_time"], "idx_processed_student_swipe"),
+	# Ingest de-duplication and the anti-flood fallback
+	("Attendance Log", ["rfid_uid", "swipe_time"], "idx_uid_swipe"),
+	# Ingest idempotency: logs already received from a device sequence
+	("Attendance Log", ["device_id", "device_sequence"], "idx_device_sequence"),
+	# Shard workers: rows claimed by a worker
+	("Attendance Log", ["claimed_by", "processing_status"], "idx_claimed_by_status"),
+	# Session denominator of an offering
+	("Attendance Session", ["course_offering", "session_type", "session_status"], "idx_offering_type_status"),
+]
+
+
+def ensure_indexes():
+	for doctype, columns, index_name in ATTENDANCE_INDEXES:
+		frappe.db.add_index(doctype, columns, index_name)
+
+
+def get_index_columns(doctype, index_name):
+	"""Columns of an index in key order, empty when it does not exist"""
+	rows = frappe.db.sql(f"SHOW INDEX FROM `tab{doctype}` WHERE Key_name = %s", (index_name,), as_dict=True)
+	return [row.Column_name for row in sorted(rows, key=lambda row: row.Seq_in_index)]
+
+
+def verify_indexes():
+	"""Return the indexes that are missing or have a different column order"""
+	problems = []
+	for doctype, columns, index_name in ATTENDANCE_INDEXES:
+		found = get_index_columns(doctype, index_name)
+		if found != columns:
+			problems.append({"doctype": doctype, "index": index_name, "expected": columns, "found": found})
+	return problems
+
+
+def get_benchmark_queries():
+	"""(label, doctype the hint applies to, index, SQL with {hint}, values) of the hot-path queries"""
+	sample = frappe.db.sql("""
+		SELECT student, course_offer, attendance_session
+		FROM `tabStudent Attendance`
+		WHERE IFNULL(attendance_session, '') != ''
+		ORDER BY modified DESC
+		LIMIT 1
+	""", as_dict=True)
+	sample = sample[0] if sample else frappe._dict(student="", course_offer="", attendance_session="")
+	log = frappe.db.get_value("Attendance Log", {}, ["rfid_uid", "device_id", "device_sequence"],
+		order_by="modified desc", as_dict=True) or frappe._dict()
+	rfid_uid = log.rfid_uid or ""
+	to_date = nowdate()
+
+	return [
+		("calculator: attended hours", "Student Attendance", "idx_student_offering_type", """
+			SELECT COALESCE(SUM(hours_counted), 0)
+			FROM `tabStudent Attendance` {hint}
+			WHERE student = %(student)s AND course_offer = %(course_offer)s
+			AND session_type IN ('Lecture', 'Tutorial') AND docstatus < 2
+		""", sample),
+		("calculator: session denominator", "Attendance Session", "idx_offering_type_status", """
+			SELECT COALESCE(SUM(duration_hours), 0)
+			FROM `tabAttendance Session` {hint}
+			WHERE course_offering = %(course_offer)s
+			AND session_type IN ('Lecture', 'Tutorial') AND session_status != 'Cancelled'
+		""", sample),
+		("processor: existing session record", "Student Attendance", "idx_session_student", """
+			SELECT name, status
+			FROM `tabStudent Attendance` {hint}
+			WHERE attendance_session = %(attendance_session)s AND student = %(student)s
+		""", sample),
+		("processor: pending logs", "Attendance Log", "idx_processed_student_swipe", """
+			SELECT name, student, swipe_time
+			FROM `tabAttendance Log` {hint}
+			WHERE processed = 0 AND student != ''
+			ORDER BY swipe_time ASC
+		""", {}),
+		("processor: recent swipes of a card", "Attendance Log", "idx_uid_swipe", """
+			SELECT name
+			FROM `tabAttendance Log` {hint}
+			WHERE rfid_uid = %(rfid_uid)s AND swipe_time > %(since)s
+		""", {"rfid_uid": rfid_uid, "since": add_days(to_date, -1)}),
+		("ingest: received device sequences", "Attendance Log", "idx_device_sequence", """
+			SELECT name, device_id, device_sequence
+			FROM `tabAttendance Log` {hint}
+			WHERE device_id IN %(device_ids)s AND device_sequence IN %(sequences)s
+		""", {"device_ids": (log.device_id or "",), "sequences": (log.device_sequence or 0,)}),
+		("report: absences in a date range", "Student Attendance", "idx_status_date", """
+			SELECT DISTINCT student, attendance_date
+			FROM `tabStudent Attendance` {hint}
+			WHERE status = 'Absent' AND docstatus < 2
+			AND attendance_date BETWEEN %(from_date)s AND %(to_date)s
+		""", {"from_date": add_days(to_date, -30), "to_date": to_date}),
+	]
+
+
+def run_plan(sql, values):
+	plan = frappe.db.sql(f"EXPLAIN {sql}", values, as_dict=True)
+	started = time.monotonic()
+	frappe.db.sql(sql, values)
+	elapsed = round((time.monotonic() - started) * 1000, 2)
+	return [
+		{"table": row.table, "type": row.type, "key": row.key, "rows": row.rows, "extra": row.Extra}
+		for row in plan
+	], elapsed
+
+
+def benchmark_query_plans():
+	"""
+	EXPLAIN and time each hot-path query with its index ignored (before) and
+	available (after). Each result carries the full plans and a one-line summary.
+	"""
+	results = []
+	for label, doctype, index_name, sql, values in get_benchmark_queries():
+		result = {"query": label, "index": index_name}
+		if get_index_columns(doctype, index_name):
+			before_plan, before_ms = run_plan(sql.format(hint=f"IGNORE INDEX (`{index_name}`)"), values)
+			after_plan, after_ms = run_plan(sql.format(hint=""), values)
+			result["before"] = {"plan": before_plan, "ms": before_ms}
+			result["after"] = {"plan": after_plan, "ms": after_ms}
+		else:
+			result["error"] = "index missing"
+
+		result["summary"] = describe_result(result)
+		results.append(result)
+
+	return results
+
+
+def describe_result(result):
+	"""One-line summary of a benchmark result: access type/key, estimated rows and time before -> after"""
+	if result.get("error"):
+		return f"{result['query']}: {result['error']}"
+
+	before, after = result["before"], result["after"]
+	return (f"{result['query']}: "
+		f"{before['plan'][0]['type']}/{before['plan'][0]['key']} ~{before['plan'][0]['rows']} rows {before['ms']} ms -> "
+		f"{after['plan'][0]['type']}/{after['plan'][0]['key']} ~{after['plan'][0]['rows']} rows {after['ms']} ms")
@@ -0,0 +1,209 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Bulk attendance marking shared by the Student Attendance Tool and the bulk
+attendance APIs.
+
+A roster is marked from a {student: status} map: the existing records of the
+whole roster are read with one query, new records are inserted and changed
+statuses updated through StudentAttendanceWriter, and students whose status
+is already recorded are left untouched. The result is a per-student diff.
+A new row that validate_duplicate_attendance would reject is reported as an
+error instead of being inserted.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import date_diff, getdate, nowdate
+
+from slcm.slcm.utils.attendance_writer import StudentAttendanceWriter
+
+VALID_STATUSES = ("Present", "Absent", "Late", "Excused")
+# Student Attendance.session_type default, applied to new rows on insert
+DEFAULT_SESSION_TYPE = "Lecture"
+
+
+def mark_roster(statuses, match, values, attendance_session=None, edit_reason="Attendance updated"):
+	"""
+	Mark attendance for a roster in one batch.
+
+	Args:
+		statuses: {student: status}
+		match: fields identifying a student's existing record besides the
+			student (empty values match empty columns)
+		values: fields of newly created records (besides student and status)
+		attendance_session: session of the marking; a record of the student
+			linked to it also counts as existing
+
+	Returns:
+		dict: created and unchanged student lists, updated
+			{student, old_status, new_status} rows and errors
+	"""
+	diff = {"created": [], "updated": [], "unchanged": [], "errors": []}
+	if not statuses:
+		return diff
+
+	validate_attendance_lock(match.get("attendance_date") or values.get("attendance_date"))
+
+	known_students = set(frappe.get_all("Student Master", filters={"name": ["in", list(statuses)]}, pluck="name"))
+	for student, status in statuses.items():
+		if student not in known_students:
+			diff["errors"].append(f"{student}: {_('Student not found')}")
+		elif status not in VALID_STATUSES:
+			diff["errors"].append(f"{student}: {_('Invalid status {0}').format(status)}")
+
+	valid = {student: status for student, status in statuses.items()
+		if student in known_students and status in VALID_STATUSES}
+	existing = get_existing_attendance(list(valid), match, attendance_session)
+
+	new_rows = {student: frappe._dict(values, **match, student=student, status=status)
+		for student, status in valid.items() if student not in existing}
+	duplicates = get_duplicate_errors(list(new_rows.values()))
+
+	writer = StudentAttendanceWriter(edit_reason=edit_reason)
+	for student, status in valid.items():
+		row = existing.get(student)
+		if student in duplicates:
+			diff["errors"].append(f"{student}: {duplicates[student]}")
+		elif not row:
+			writer.insert(new_rows[student])
+			diff["created"].append(student)
+		elif writer.update(row, {"status": status}):
+			diff["updated"].append({"student": student, "old_status": row.status, "new_status": status})
+		else:
+			diff["unchanged"].append(student)
+
+	# Bulk writes skip the per-document permission checks of insert() and save()
+	if writer.new_rows:
+		frappe.has_permission("Student Attendance", "create", throw=True)
+	if writer.updates:
+		frappe.has_permission("Student Attendance", "write", throw=True)
+
+	# Edit logs, session roll-up and the recalculation are queued once for the batch
+	writer.flush()
+
+	return diff
+
+
+def summarize(diff):
+	"""Response of the marking APIs: counts plus the per-student diff"""
+	return {
+		"status": "success",
+		"total_processed": len(diff["created"]) + len(diff["updated"]) + len(diff["unchanged"]),
+		"created": len(diff["created"]),
+		"updated": len(diff["updated"]),
+		"unchanged": len(diff["unchanged"]),
+		"errors": diff["errors"],
+		"diff": diff,
+	}
+
+
+def get_active_students(student_group):
+	"""Active students of a Student Group, without loading the group document"""
+	return frappe.get_all("Student Group Student",
+		filters={"parent": student_group, "parenttype": "Student Group", "active": 1},
+		pluck="student",
+		order_by="idx asc"
+	)
+
+
+def validate_attendance_lock(attendance_date):
+	"""StudentAttendance.validate_attendance_lock, checked once for the whole batch"""
+	if not attendance_date or frappe.session.user == "Administrator" or "System Manager" in frappe.get_roles():
+		return
+
+	lock_days = frappe.db.get_single_value("Attendance Settings", "attendance_lock_days")
+	if lock_days and date_diff(nowdate(), attendance_date) > lock_days:
+		frappe.throw(_("Attendance for this date is locked and cannot be modified."))
+
+
+def duplicate_filters(row):
+	"""Fields StudentAttendance.validate_duplicate_attendance compares for a new row"""
+	if row.get("attendance_session"):
+		return {"attendance_session": row.attendance_session}
+
+	filters = {"attendance_date": getdate(row.get("attendance_date"))}
+	for field in ("course_schedule", "student_group", "course_offer"):
+		if row.get(field):
+			filters[field] = row.get(field)
+			break
+	if row.get("period"):
+		filters["period"] = row.period
+	filters["session_type"] = row.get("session_type") or DEFAULT_SESSION_TYPE
+	return filters
+
+
+def get_duplicate_errors(rows):
+	"""
+	validate_duplicate_attendance for rows about to be inserted, with one
+	query for the batch: {student: error} for rows an existing record blocks
+	"""
+	if not rows:
+		return {}
+
+	dates = list({getdate(row.attendance_date) for row in rows if row.get("attendance_date")})
+	sessions = list({row.attendance_session for row in rows if row.get("attendance_session")})
+	scope = []
+	if dates:
+		scope.append("attendance_date IN %(dates)s")
+	if sessions:
+		scope.append("attendance_session IN %(sessions)s")
+	if not scope:
+		return {}
+
+	records = {}
+	for record in frappe.db.sql(f"""
+		SELECT name, student, attendance_date, attendance_session, course_schedule,
+			student_group, course_offer, period, session_type
+		FROM `tabStudent Attendance`
+		WHERE student IN %(students)s
+		AND docstatus < 2
+		AND ({" OR ".join(scope)})
+	""", {"students": tuple({row.student for row in rows}), "dates": tuple(dates), "sessions": tuple(sessions)},
+		as_dict=True):
+		records.setdefault(record.student, []).append(record)
+
+	errors = {}
+	for row in rows:
+		filters = duplicate_filters(row)
+		if any(all(record.get(field) == value for field, value in filters.items())
+				for record in records.get(row.student, [])):
+			errors[row.student] = (_("Attendance already marked for this session.") if row.get("attendance_session")
+				else _("Attendance already exists for this student on {0}").format(row.attendance_date))
+	return errors
+
+
+def get_existing_attendance(students, match, attendance_session=None):
+	"""
+	Existing Student Attendance rows of the roster keyed by student, in one
+	query. A row matches on the marking fields (empty values match empty
+	columns) or, like validate_duplicate_attendance, on the session.
+	"""
+	if not students:
+		return {}
+
+	conditions = []
+	values = {"students": tuple(students), "attendance_session": attendance_session}
+	for field, value in match.items():
+		if value:
+			conditions.append(f"`{field}` = %({field})s")
+			values[field] = value
+		else:
+			conditions.append(f"IFNULL(`{field}`, '') = ''")
+
+	session_condition = "OR attendance_session = %(attendance_session)s" if attendance_session else ""
+
+	rows = frappe.db.sql(f"""
+		SELECT name, student, status, attendance_date, course_offer, attendance_session, course
+		FROM `tabStudent Attendance`
+		WHERE student IN %(students)s
+		AND docstatus < 2
+		AND (({" AND ".join(conditions)}) {session_condition})
+		ORDER BY creation ASC
+	""", values, as_dict=True)
+
+	existing = {}
+	for row in rows:
+		existing.setdefault(row.student, row)
+	return existing
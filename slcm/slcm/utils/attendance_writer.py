@@ -0,0 +1,203 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Batched Student Attendance writes.
+
+Collects the inserts and updates of a processing run and applies them with
+multi-row statements instead of one `insert()`/`save()` per record. The work
+the per-document hooks did is done once for the whole batch at flush:
+fetched fields, the status audit log, the session roll-up and a queued,
+coalesced summary recalculation.
+"""
+
+import frappe
+from frappe.model.naming import make_autoname
+from frappe.utils import now
+
+ATTENDANCE_NAMING = "ATT-.YYYY.-.#####"
+EDIT_LOG_NAMING = "LOG-.YYYY.-.#####"
+BATCH_SIZE = 500
+
+# Student Attendance fields filled from linked documents: fetch_from plus
+# StudentAttendance.fetch_course_details, in the order it applies them
+# (only empty fields are filled, so the schedule's course wins over the offering's)
+FETCHED_FIELDS = {
+	"student": ("Student Master", {"student_name": "first_name"}),
+	"course_schedule": ("Course Schedule", {
+		"course": "course", "program": "program", "instructor": "instructor", "room": "room",
+		"student_group": "student_group",
+	}),
+	"student_group": ("Student Group", {
+		"section": "section", "academic_year": "academic_year", "academic_term": "academic_term",
+		"program": "program",
+	}),
+	"course_offer": ("Course Offering", {"course": "course_title"}),
+}
+
+
+class StudentAttendanceWriter:
+	"""Accumulates Student Attendance upserts and writes them in bulk on flush()"""
+
+	def __init__(self, edit_reason="Attendance updated"):
+		self.edit_reason = edit_reason
+		self.reset()
+
+	def reset(self):
+		self.new_rows = []
+		self.updates = {}
+		self.status_changes = []
+		self.pairs = set()
+		self.days = set()
+		self.sessions = set()
+
+	def insert(self, values):
+		"""Queue a new Student Attendance record"""
+		row = frappe._dict(values)
+		self.new_rows.append(row)
+		self.track(row)
+		return row
+
+	def update(self, existing, values):
+		"""
+		Queue changes to an existing record. `existing` is the current row
+		(name plus at least the fields being changed). Returns the changed
+		fields; nothing is written when no value differs.
+		"""
+		changes = {field: value for field, value in values.items() if existing.get(field) != value}
+		if not changes:
+			return {}
+
+		self.updates.setdefault(existing.name, {}).update(changes)
+		if "status" in changes:
+			self.status_changes.append((frappe._dict(existing), existing.get("status"), changes["status"]))
+
+		self.track(existing)
+		self.track(frappe._dict(existing, **changes))
+		return changes
+
+	def merge(self, other):
+		"""Take over the work queued on `other`, e.g. once a unit of work has succeeded"""
+		self.new_rows.extend(other.new_rows)
+		for name, changes in other.updates.items():
+			self.updates.setdefault(name, {}).update(changes)
+		self.status_changes.extend(other.status_changes)
+		self.pairs |= other.pairs
+		self.days |= other.days
+		self.sessions |= other.sessions
+		other.reset()
+
+	def track(self, row):
+		if row.get("student") and row.get("course_offer"):
+			self.pairs.add((row.student, row.course_offer))
+		if row.get("student") and row.get("attendance_date"):
+			self.days.add((row.student, row.attendance_date))
+		if row.get("attendance_session"):
+			self.sessions.add(row.attendance_session)
+
+	def flush(self):
+		"""Write everything queued so far, then clear the batch"""
+		if self.new_rows:
+			self.write_inserts()
+		if self.updates:
+			frappe.db.bulk_update("Student Attendance", self.updates, chunk_size=BATCH_SIZE)
+		if self.status_changes:
+			self.write_edit_logs()
+
+		self.after_write()
+
+		counts = {"created": len(self.new_rows), "updated": len(self.updates)}
+		self.reset()
+		return counts
+
+	def write_inserts(self):
+		meta = frappe.get_meta("Student Attendance")
+		defaults = {
+			df.fieldname: df.default
+			for df in meta.fields
+			if df.default and df.fieldtype not in ("Section Break", "Column Break", "Tab Break")
+		}
+		set_fetched_values(self.new_rows)
+
+		fields = set()
+		for row in self.new_rows:
+			for fieldname, default in defaults.items():
+				if row.get(fieldname) in (None, ""):
+					row[fieldname] = default
+			fields.update(row)
+		fields = sorted(f for f in fields if meta.has_field(f))
+
+		timestamp = now()
+		user = frappe.session.user
+		values = []
+		for row in self.new_rows:
+			row.name = make_autoname(ATTENDANCE_NAMING, "Student Attendance")
+			values.append((row.name, timestamp, timestamp, user, user, 0, *(row.get(f) for f in fields)))
+
+		frappe.db.bulk_insert(
+			"Student Attendance",
+			["name", "creation", "modified", "owner", "modified_by", "docstatus", *fields],
+			values,
+			chunk_size=BATCH_SIZE,
+		)
+
+	def write_edit_logs(self):
+		"""Audit entries for status changes (StudentAttendance.track_changes)"""
+		timestamp = now()
+		user = frappe.session.user
+		values = []
+		for row, old_status, new_status in self.status_changes:
+			values.append((
+				make_autoname(EDIT_LOG_NAMING, "Attendance Edit Log"), timestamp, timestamp, user, user, 0,
+				row.name, row.get("student"), row.get("course"), row.get("attendance_date"),
+				"status", old_status or "", new_status or "", self.edit_reason, user, timestamp, "Pending"
+			))
+
+		frappe.db.bulk_insert(
+			"Attendance Edit Log",
+			["name", "creation", "modified", "owner", "modified_by", "docstatus",
+				"attendance_record", "student", "course", "attendance_date",
+				"field_changed", "old_value", "new_value", "edit_reason", "edited_by", "edit_timestamp",
+				"approval_status"],
+			values,
+			chunk_size=BATCH_SIZE,
+		)
+
+	def after_write(self):
+		"""Replaces the per-record on_update/after_insert hooks for the whole batch"""
+		from slcm.slcm.doctype.attendance_session.attendance_session import mark_session_dirty
+		from slcm.slcm.utils.absentee_snapshot import mark_absentees_dirty
+		from slcm.slcm.utils.attendance_facts import mark_facts_dirty
+		from slcm.slcm.utils.recalculation_queue import mark_dirty_many
+
+		for session in self.sessions:
+			mark_session_dirty(session)
+
+		# One coalesced recalculation, run after the batch is committed
+		mark_dirty_many(self.pairs)
+		mark_facts_dirty(self.pairs)
+		mark_absentees_dirty(self.days)
+
+
+def set_fetched_values(rows):
+	"""Fill fetch_from fields of new rows with one query per linked doctype"""
+	for link_field, (doctype, fetch_map) in FETCHED_FIELDS.items():
+		names = {row.get(link_field) for row in rows if row.get(link_field)}
+		if not names:
+			continue
+
+		linked = {
+			d.name: d
+			for d in frappe.get_all(
+				doctype,
+				filters={"name": ["in", list(names)]},
+				fields=["name", *set(fetch_map.values())],
+			)
+		}
+		for row in rows:
+			source = linked.get(row.get(link_field))
+			if not source:
+				continue
+			for target, source_field in fetch_map.items():
+				if row.get(target) in (None, ""):
+					row[target] = source.get(source_field)
@@ -0,0 +1,558 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Set-based Attendance Summary recalculation.
+
+Computes the same figures as `attendance_calculator.calculate_student_attendance`
+for every (student, course_offering) pair of a set of offerings, using grouped
+aggregate queries instead of one round of queries per student, and writes the
+results back to `Attendance Summary` in batches.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.model.naming import make_autoname
+from frappe.utils import flt, now
+
+from slcm.slcm.utils.attendance_calculator import get_recalculation_context
+from slcm.slcm.utils.attendance_facts import mark_facts_dirty
+
+SUMMARY_NAMING = "ASU-.YYYY.-.#####"
+BATCH_SIZE = 500
+# Date an application counts from for a cut-off; approvals made before
+# approval_date existed fall back to the posting date
+APPROVAL_DATE = "COALESCE(approval_date, DATE(creation))"
+
+
+def recalculate_summaries(course_offerings=None, academic_term=None, students=None, batch_size=BATCH_SIZE):
+	"""
+	Recalculate Attendance Summaries in bulk.
+
+	Args:
+		course_offerings: list of Course Offering IDs (optional)
+		academic_term: Academic Term name, resolved to its Course Offerings (optional)
+		students: restrict the run to these students (optional)
+		batch_size: number of summaries written per statement
+
+	With neither course_offerings nor academic_term every offering is recalculated.
+
+	Returns:
+		list: one dict per summary with the recalculated figures
+	"""
+	scope = get_scope(course_offerings, academic_term, students)
+	if not scope:
+		return []
+
+	results = calculate_summaries(scope)
+	if not results:
+		return []
+
+	condonation_lists, fa_mfa_lists = get_application_lists(scope, scope.offering_details)
+
+	write_summaries(results, batch_size)
+	write_application_lists(results, condonation_lists, fa_mfa_lists, batch_size)
+
+	return results
+
+
+def get_scope(course_offerings=None, academic_term=None, students=None, cutoff_date=None):
+	"""
+	Offerings and students a run covers, or None when the run covers nothing.
+	With a cutoff_date only sessions and attendance up to that date are counted.
+	"""
+	offerings = resolve_offerings(course_offerings, academic_term)
+	if offerings is not None and not offerings:
+		return None
+
+	if students is not None:
+		students = list(students)
+		if not students:
+			return None
+
+	return frappe._dict(offerings=offerings, students=students, cutoff_date=cutoff_date)
+
+
+def calculate_summaries(scope):
+	"""Summary figures of every (student, course_offering) pair in scope, without writing them"""
+	settings = get_recalculation_context().settings
+
+	pairs = get_summary_pairs(scope)
+	if not pairs:
+		return []
+
+	offering_details = scope.offering_details = get_offering_details(scope)
+	conducted_hours = get_conducted_hours(scope)
+	attendance = get_attendance_aggregates(scope)
+	condonation = get_condonation_aggregates(scope)
+	approved_fa_mfa = get_approved_fa_mfa(scope, offering_details)
+	student_groups = get_student_groups(scope)
+	sections = get_group_sections({g for g in student_groups.values() if g})
+	student_names = get_student_names({student for student, _ in pairs})
+
+	minimum_required = flt(settings.minimum_attendance_percentage)
+	timestamp = now()
+	results = []
+
+	for (student, course_offering), summary_name in pairs.items():
+		details = offering_details.get(course_offering) or frappe._dict()
+		counts = attendance.get((student, course_offering)) or {}
+
+		total_classes = flt(conducted_hours.get(course_offering))
+		attended_classes = flt(counts.get("attended_hours"))
+		if settings.include_office_hours_in_attendance:
+			attended_classes += flt(counts.get("office_hours"))
+		condoned_hours = flt(condonation.get((student, course_offering)))
+		attended_classes += condoned_hours
+
+		attendance_percentage = (attended_classes / total_classes) * 100 if total_classes > 0 else 0
+
+		fa_mfa_approved = 1 if settings.allow_fa_mfa and (student, details.course_title) in approved_fa_mfa else 0
+		eligible_for_exam = 1 if attendance_percentage >= minimum_required or fa_mfa_approved else 0
+
+		row = frappe._dict(
+			name=summary_name,
+			student=student,
+			course_offering=course_offering,
+			student_name=student_names.get(student),
+			course=details.course_title,
+			academic_year=details.academic_year,
+			term_name=details.term_name,
+			total_classes=total_classes,
+			attended_classes=attended_classes,
+			condoned_hours=condoned_hours,
+			fa_mfa_approved=fa_mfa_approved,
+			attendance_percentage=attendance_percentage,
+			eligible_for_exam=eligible_for_exam,
+			student_group=student_groups.get((student, course_offering)),
+			last_updated=timestamp,
+		)
+		if row.student_group:
+			row.section = sections.get(row.student_group)
+
+		results.append(row)
+
+	return results
+
+
+def resolve_offerings(course_offerings=None, academic_term=None):
+	"""Return the list of offerings in scope, or None for all offerings"""
+	if isinstance(course_offerings, str):
+		course_offerings = frappe.parse_json(course_offerings) if course_offerings.startswith("[") else [course_offerings]
+
+	if academic_term:
+		term_offerings = frappe.get_all(
+			"Course Offering", filters={"term_name": academic_term}, pluck="name"
+		)
+		if course_offerings:
+			term_offerings = set(term_offerings)
+			return [co for co in course_offerings if co in term_offerings]
+		return term_offerings
+
+	if course_offerings:
+		return list(course_offerings)
+
+	return None
+
+
+def scope_condition(scope, offering_column, student_column=None):
+	"""SQL fragment restricting a query to the offerings and students in scope"""
+	conditions = []
+	if scope.offerings is not None:
+		conditions.append(f"AND {offering_column} IN %(offerings)s")
+	if scope.students is not None and student_column:
+		conditions.append(f"AND {student_column} IN %(students)s")
+	return " ".join(conditions)
+
+
+def scope_values(scope):
+	return {
+		"offerings": tuple(scope.offerings or ()),
+		"students": tuple(scope.students or ()),
+		"cutoff_date": scope.get("cutoff_date"),
+	}
+
+
+def cutoff_condition(scope, date_column):
+	"""SQL fragment ignoring records after the cut-off date of the scope"""
+	return f"AND {date_column} <= %(cutoff_date)s" if scope.get("cutoff_date") else ""
+
+
+def scope_filters(scope, filters):
+	"""Add the student restriction of the scope to frappe.get_all filters"""
+	if scope.students is not None:
+		filters["student"] = ["in", scope.students]
+	return filters
+
+
+def get_summary_pairs(scope):
+	"""
+	Return {(student, course_offering): summary name or None}.
+	Covers existing summaries and every pair that has attendance records.
+	"""
+	pairs = {}
+
+	existing = frappe.db.sql(
+		f"""
+		SELECT name, student, course_offering
+		FROM `tabAttendance Summary`
+		WHERE IFNULL(student, '') != ''
+		AND IFNULL(course_offering, '') != ''
+		{scope_condition(scope, "course_offering", "student")}
+		ORDER BY creation ASC
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	for row in existing:
+		pairs.setdefault((row.student, row.course_offering), row.name)
+
+	attended = frappe.db.sql(
+		f"""
+		SELECT DISTINCT student, course_offer
+		FROM `tabStudent Attendance`
+		WHERE IFNULL(student, '') != ''
+		AND IFNULL(course_offer, '') != ''
+		{scope_condition(scope, "course_offer", "student")}
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	for row in attended:
+		pairs.setdefault((row.student, row.course_offer), None)
+
+	return pairs
+
+
+def get_offering_details(scope):
+	"""Return {course_offering: {course_title, academic_year, term_name}}"""
+	rows = frappe.db.sql(
+		f"""
+		SELECT name, course_title, academic_year, term_name
+		FROM `tabCourse Offering`
+		WHERE 1=1
+		{scope_condition(scope, "name")}
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	return {row.name: row for row in rows}
+
+
+def get_conducted_hours(scope):
+	"""Conducted Lecture/Tutorial hours per offering (the denominator)"""
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			course_offering,
+			COALESCE(SUM(CASE WHEN session_status = 'Conducted' THEN duration_hours ELSE 0 END), 0) as conducted_hours
+		FROM `tabAttendance Session`
+		WHERE session_type IN ('Lecture', 'Tutorial')
+		AND session_status != 'Cancelled'
+		{scope_condition(scope, "course_offering")}
+		{cutoff_condition(scope, "session_date")}
+		GROUP BY course_offering
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	return {row.course_offering: row.conducted_hours for row in rows}
+
+
+def get_attendance_aggregates(scope):
+	"""Attended class hours and office hours per (student, course_offering)"""
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			student,
+			course_offer,
+			COALESCE(SUM(CASE
+				WHEN session_type IN ('Lecture', 'Tutorial') AND status IN ('Present', 'Late', 'Excused')
+				THEN hours_counted ELSE 0
+			END), 0) as attended_hours,
+			COALESCE(SUM(CASE
+				WHEN session_type = 'Office Hour' AND status IN ('Present', 'Late', 'Excused')
+				THEN hours_counted ELSE 0
+			END), 0) as office_hours
+		FROM `tabStudent Attendance`
+		WHERE docstatus < 2
+		{scope_condition(scope, "course_offer", "student")}
+		{cutoff_condition(scope, "attendance_date")}
+		GROUP BY student, course_offer
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	return {(row.student, row.course_offer): row for row in rows}
+
+
+def get_condonation_aggregates(scope):
+	"""Approved condonation hours per (student, course_offering)"""
+	try:
+		rows = frappe.db.sql(
+			f"""
+			SELECT
+				student,
+				course_offering,
+				COALESCE(SUM(number_of_sessions), 0) as sessions,
+				COALESCE(SUM(number_of_hours), 0) as hours
+			FROM `tabStudent Attendance Condonation`
+			WHERE final_status = 'Approved'
+			AND docstatus = 1
+			{scope_condition(scope, "course_offering", "student")}
+			{cutoff_condition(scope, APPROVAL_DATE)}
+			GROUP BY student, course_offering
+		""",
+			scope_values(scope),
+			as_dict=True,
+		)
+	except Exception:
+		# Table might not exist yet in Phase 1
+		return {}
+
+	# Same rule as get_approved_condonation: hours only count when sessions were condoned
+	return {(row.student, row.course_offering): row.hours for row in rows if row.sessions}
+
+
+def get_approved_fa_mfa(scope, offering_details):
+	"""Set of (student, course) pairs holding an approved FA/MFA application"""
+	courses = {d.course_title for d in offering_details.values() if d.course_title}
+	if not courses:
+		return set()
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT DISTINCT student, course
+		FROM `tabFA MFA Application`
+		WHERE course IN %(courses)s
+		AND status = 'Approved'
+		AND docstatus = 1
+		{"AND student IN %(students)s" if scope.students is not None else ""}
+		{cutoff_condition(scope, APPROVAL_DATE)}
+	""",
+		dict(scope_values(scope), courses=tuple(courses)),
+		as_dict=True,
+	)
+	return {(row.student, row.course) for row in rows}
+
+
+def get_application_lists(scope, offering_details):
+	"""
+	Return Condonation and FA/MFA application rows keyed by
+	(student, course_offering) and (student, course) respectively.
+	"""
+	condonation_lists = defaultdict(list)
+	fa_mfa_lists = defaultdict(list)
+
+	try:
+		rows = frappe.db.sql(
+			f"""
+			SELECT name, student, course_offering, condonation_reason,
+				number_of_sessions, number_of_hours, final_status
+			FROM `tabStudent Attendance Condonation`
+			WHERE docstatus < 2
+			{scope_condition(scope, "course_offering", "student")}
+			ORDER BY creation DESC
+		""",
+			scope_values(scope),
+			as_dict=True,
+		)
+		for row in rows:
+			condonation_lists[(row.student, row.course_offering)].append(row)
+	except Exception as e:
+		frappe.log_error(message=f"Error fetching condonation list: {e!s}", title="Condonation List Fetch Error")
+
+	courses = {d.course_title for d in offering_details.values() if d.course_title}
+	if courses:
+		try:
+			rows = frappe.get_all(
+				"FA MFA Application",
+				filters=scope_filters(scope, {"course": ["in", list(courses)], "docstatus": ["<", 2]}),
+				fields=["name", "student", "course", "application_type", "reason", "status"],
+				order_by="creation desc",
+			)
+			for row in rows:
+				fa_mfa_lists[(row.student, row.course)].append(row)
+		except Exception as e:
+			frappe.log_error(message=f"Error fetching FA/MFA list: {e!s}", title="FA/MFA List Fetch Error")
+
+	return condonation_lists, fa_mfa_lists
+
+
+def get_student_groups(scope):
+	"""
+	Return {(student, course_offering): student_group}.
+	Uses the group on the most recent attendance record, falling back to
+	Student Group membership matched on course, term and year.
+	"""
+	groups = {}
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT sa.student, sa.course_offer, sa.student_group
+		FROM `tabStudent Attendance` sa
+		JOIN (
+			SELECT student, course_offer, MAX(attendance_date) as last_date
+			FROM `tabStudent Attendance`
+			WHERE docstatus < 2
+			AND student_group IS NOT NULL AND student_group != ''
+			{scope_condition(scope, "course_offer", "student")}
+			GROUP BY student, course_offer
+		) latest
+			ON latest.student = sa.student
+			AND latest.course_offer = sa.course_offer
+			AND latest.last_date = sa.attendance_date
+		WHERE sa.docstatus < 2
+		AND sa.student_group IS NOT NULL AND sa.student_group != ''
+	""",
+		scope_values(scope),
+		as_dict=True,
+	)
+	for row in rows:
+		groups.setdefault((row.student, row.course_offer), row.student_group)
+
+	try:
+		rows = frappe.db.sql(
+			f"""
+			SELECT sgs.student, co.name as course_offering, sgs.parent as student_group
+			FROM `tabStudent Group Student` sgs
+			JOIN `tabStudent Group` sg ON sg.name = sgs.parent
+			JOIN `tabCourse Offering` co
+				ON co.course_title = sg.course
+				AND co.term_name = sg.academic_term
+				AND co.academic_year = sg.academic_year
+			WHERE sg.docstatus < 2
+			{scope_condition(scope, "co.name", "sgs.student")}
+		""",
+			scope_values(scope),
+			as_dict=True,
+		)
+		for row in rows:
+			groups.setdefault((row.student, row.course_offering), row.student_group)
+	except Exception:
+		pass
+
+	return groups
+
+
+def get_group_sections(student_groups):
+	if not student_groups:
+		return {}
+
+	rows = frappe.get_all(
+		"Student Group",
+		filters={"name": ["in", list(student_groups)]},
+		fields=["name", "section"],
+	)
+	return {row.name: row.section for row in rows}
+
+
+def get_student_names(students):
+	if not students:
+		return {}
+
+	rows = frappe.get_all(
+		"Student Master",
+		filters={"name": ["in", list(students)]},
+		fields=["name", "first_name"],
+	)
+	return {row.name: row.first_name for row in rows}
+
+
+SUMMARY_FIELDS = (
+	"student_name",
+	"course",
+	"academic_year",
+	"term_name",
+	"total_classes",
+	"attended_classes",
+	"attendance_percentage",
+	"eligible_for_exam",
+	"student_group",
+	"section",
+	"last_updated",
+)
+
+
+def write_summaries(results, batch_size=BATCH_SIZE):
+	"""Update existing summaries and insert the missing ones in batches"""
+	updates = {}
+	new_rows = []
+
+	for row in results:
+		if row.name:
+			updates[row.name] = {field: row[field] for field in SUMMARY_FIELDS if field in row}
+		else:
+			row.name = make_autoname(SUMMARY_NAMING, "Attendance Summary")
+			new_rows.append(row)
+
+	if updates:
+		frappe.db.bulk_update("Attendance Summary", updates, chunk_size=batch_size)
+
+	if new_rows:
+		timestamp = now()
+		user = frappe.session.user
+		minimum_required = frappe.get_meta("Attendance Summary").get_field("minimum_required_percentage").default
+		fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus",
+			"student", "course_offering", "minimum_required_percentage", *SUMMARY_FIELDS]
+		values = [
+			(row.name, timestamp, timestamp, user, user, 0,
+				row.student, row.course_offering, flt(minimum_required), *(row.get(field) for field in SUMMARY_FIELDS))
+			for row in new_rows
+		]
+		frappe.db.bulk_insert("Attendance Summary", fields, values, chunk_size=batch_size)
+
+	mark_facts_dirty((row.student, row.course_offering) for row in results)
+
+
+def write_application_lists(results, condonation_lists, fa_mfa_lists, batch_size=BATCH_SIZE):
+	"""Rebuild the condonation_list and fa_mfa_list child tables of the given summaries"""
+	if not results:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	common_fields = ["creation", "modified", "owner", "modified_by", "docstatus",
+		"parent", "parenttype", "parentfield", "idx"]
+
+	condonation_values = []
+	fa_mfa_values = []
+
+	for row in results:
+		common = (timestamp, timestamp, user, user, 0, row.name, "Attendance Summary")
+
+		for idx, app in enumerate(condonation_lists.get((row.student, row.course_offering), []), start=1):
+			condonation_values.append((*common, "condonation_list", idx,
+				app.name, app.condonation_reason, app.number_of_sessions, app.number_of_hours, app.final_status))
+
+		for idx, app in enumerate(fa_mfa_lists.get((row.student, row.course), []), start=1):
+			fa_mfa_values.append((*common, "fa_mfa_list", idx,
+				app.name, app.application_type, app.reason, app.status))
+
+	names = [row.name for row in results]
+	for start in range(0, len(names), batch_size):
+		chunk = tuple(names[start:start + batch_size])
+		for child_doctype in ("Attendance Condonation Reference", "Attendance FA MFA Reference"):
+			frappe.db.sql(f"""
+				DELETE FROM `tab{child_doctype}`
+				WHERE parenttype = 'Attendance Summary'
+				AND parent IN %(parents)s
+			""", {"parents": chunk})
+
+	if condonation_values:
+		frappe.db.bulk_insert(
+			"Attendance Condonation Reference",
+			[*common_fields, "condonation_application", "condonation_reason",
+				"number_of_sessions", "number_of_hours", "final_status"],
+			condonation_values,
+			chunk_size=batch_size,
+		)
+
+	if fa_mfa_values:
+		frappe.db.bulk_insert(
+			"Attendance FA MFA Reference",
+			[*common_fields, "fa_mfa_application", "application_type", "reason", "status"],
+			fa_mfa_values,
+			chunk_size=batch_size,
+		)
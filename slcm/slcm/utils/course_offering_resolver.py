@@ -0,0 +1,67 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Course Offering resolution for attendance marking and session creation.
+
+Maps (course, program, academic_year, class_schedule) to a Course Offering
+with one query, ranking the candidates instead of trying fallbacks one by
+one. Results, including misses, are kept in a Redis hash that is cleared
+whenever a Course Offering or Class Schedule changes.
+"""
+
+import frappe
+
+RESOLVER_CACHE = "slcm:course_offering_resolver"
+
+
+def resolve_course_offering(course=None, program=None, academic_year=None, class_schedule=None):
+	"""
+	The Course Offering a class is counted under, or None.
+
+	An offering linked on the Class Schedule wins. Otherwise offerings of the
+	course in the program are ranked by matching academic year, then Open
+	status, then the most recent; without any in the program, the most
+	recent Open offering of the course is used.
+	"""
+	if not course and not class_schedule:
+		return None
+
+	key = "|".join(str(part or "") for part in (course, program, academic_year, class_schedule))
+	return frappe.cache().hget(
+		RESOLVER_CACHE, key,
+		generator=lambda: load_course_offering(course, program, academic_year, class_schedule)
+	) or None
+
+
+def load_course_offering(course, program, academic_year, class_schedule):
+	if class_schedule:
+		linked = frappe.db.get_value("Class Schedule", class_schedule, "course_offering")
+		if linked:
+			return linked
+
+	if not course:
+		return False
+
+	candidates = frappe.get_all("Course Offering",
+		filters={"course_title": course, "docstatus": ["<", 2]},
+		fields=["name", "program", "academic_year", "status", "creation"],
+		order_by="creation desc"
+	)
+
+	in_program = [c for c in candidates if c.program == program] if program else candidates
+	if in_program:
+		best = max(in_program, key=lambda c: (
+			bool(academic_year) and c.academic_year == academic_year,
+			c.status == "Open",
+			c.creation
+		))
+		return best.name
+
+	open_offerings = [c for c in candidates if c.status == "Open"]
+	return open_offerings[0].name if open_offerings else False
+
+
+def clear_resolver_cache(doc=None, method=None):
+	"""Course Offering / Class Schedule changed: any cached resolution may be stale"""
+	frappe.cache().delete_value(RESOLVER_CACHE)
@@ -1,59 +1,247 @@
+"""
+Exam eligibility snapshots.
+
+An Eligibility Snapshot classifies every student of a term's course offerings
+as Eligible, Condonable Shortage or Detained as of a cut-off date. The figures
+are computed in one set-based pass (`bulk_attendance_calculator`) counting only
+sessions and attendance up to the cut-off, written to Eligibility Snapshot
+Entry in bulk and never changed afterwards. Eligibility lists and shortage
+lists are read from the latest completed snapshot of an offering.
+"""
+
+import time
+
 import frappe
-from frappe.utils import flt, nowdate
+from frappe.utils import flt, getdate, now, nowdate
+
+from slcm.slcm.utils.attendance_calculator import get_recalculation_context
+from slcm.slcm.utils.bulk_attendance_calculator import calculate_summaries, get_scope
+
+BATCH_SIZE = 1000
+# Shortage below the minimum that can still be condoned, in percentage points
+CONDONABLE_RANGE = 10
+
+ACTIONS = {
+	"Eligible": "Release Hall Ticket",
+	"Condonable Shortage": "Fine Applicable",
+	"Detained": "Block Hall Ticket",
+}
+
+ENTRY_FIELDS = ["student", "student_name", "course_offering", "course", "conducted_hours", "attended_hours",
+	"condoned_hours", "attendance_percentage", "fa_mfa_approved", "status", "recommended_action"]
+
+
+def classify(attendance_percentage, fa_mfa_approved, minimum_required, condonable_from):
+	"""Eligibility status of one student and offering"""
+	if fa_mfa_approved or attendance_percentage >= minimum_required:
+		return "Eligible"
+	if attendance_percentage >= condonable_from:
+		return "Condonable Shortage"
+	return "Detained"
+
+
+@frappe.whitelist()
+def create_eligibility_snapshot(term_name=None, cutoff_date=None, course_offerings=None, academic_year=None):
+	"""Queue a snapshot of a term (or of the given offerings) as of the cut-off date"""
+	frappe.only_for(["System Manager", "Faculty"])
+
+	if isinstance(course_offerings, str):
+		course_offerings = frappe.parse_json(course_offerings) if course_offerings.startswith("[") else [course_offerings]
+
+	snapshot = frappe.get_doc({
+		"doctype": "Eligibility Snapshot",
+		"term_name": term_name,
+		"academic_year": academic_year,
+		"course_offerings": "\n".join(course_offerings or []),
+		"cutoff_date": getdate(cutoff_date or nowdate()),
+	}).insert()
+
+	return snapshot.name
+
+
+def enqueue_snapshot(snapshot_name):
+	frappe.enqueue(
+		"slcm.slcm.utils.eligibility_tool.compute_snapshot",
+		queue="long",
+		timeout=3600,
+		job_id=f"eligibility_snapshot:{snapshot_name}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		snapshot_name=snapshot_name
+	)
+
+
+def compute_snapshot(snapshot_name):
+	"""Compute and store the entries of a snapshot (background job)"""
+	snapshot = frappe.get_doc("Eligibility Snapshot", snapshot_name)
+	if snapshot.status == "Completed":
+		return
+
+	frappe.db.set_value("Eligibility Snapshot", snapshot_name, "status", "In Progress")
+	frappe.db.commit()
+	started = time.monotonic()
+
+	try:
+		counts = write_snapshot_entries(snapshot)
+		frappe.db.set_value("Eligibility Snapshot", snapshot_name, dict(counts,
+			status="Completed",
+			computed_on=now(),
+			duration_seconds=round(time.monotonic() - started, 3),
+			error=None
+		))
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(message=f"Error computing eligibility snapshot {snapshot_name}: {e!s}", title="Eligibility Snapshot Error")
+		frappe.db.set_value("Eligibility Snapshot", snapshot_name, {"status": "Failed", "error": str(e)[:1000]})
+		frappe.db.commit()
+		raise
+
+
+def write_snapshot_entries(snapshot):
+	"""Classify every pair in scope as of the cut-off date and bulk insert the entries"""
+	minimum_required = flt(get_recalculation_context().settings.minimum_attendance_percentage)
+	condonable_from = minimum_required - CONDONABLE_RANGE
+
+	# Rerun of a failed snapshot: start from a clean slate
+	frappe.db.delete("Eligibility Snapshot Entry", {"snapshot": snapshot.name})
+
+	scope = get_scope(snapshot.get_course_offerings() or None, snapshot.term_name, cutoff_date=snapshot.cutoff_date)
+	results = calculate_summaries(scope) if scope else []
+
+	counts = {"Eligible": 0, "Condonable Shortage": 0, "Detained": 0}
+	timestamp = now()
+	user = frappe.session.user
+	values = []
+	for row in results:
+		if snapshot.academic_year and row.academic_year and row.academic_year != snapshot.academic_year:
+			continue
+
+		status = classify(flt(row.attendance_percentage), row.fa_mfa_approved, minimum_required, condonable_from)
+		counts[status] += 1
+		entry = {
+			"student": row.student,
+			"student_name": row.student_name,
+			"course_offering": row.course_offering,
+			"course": row.course,
+			"conducted_hours": row.total_classes,
+			"attended_hours": row.attended_classes,
+			"condoned_hours": row.condoned_hours,
+			"attendance_percentage": flt(row.attendance_percentage, 2),
+			"fa_mfa_approved": row.fa_mfa_approved,
+			"status": status,
+			"recommended_action": ACTIONS[status],
+		}
+		values.append((frappe.generate_hash(length=12), timestamp, timestamp, user, user, 0, snapshot.name,
+			*(entry[field] for field in ENTRY_FIELDS)))
+
+	if values:
+		frappe.db.bulk_insert(
+			"Eligibility Snapshot Entry",
+			["name", "creation", "modified", "owner", "modified_by", "docstatus", "snapshot", *ENTRY_FIELDS],
+			values,
+			chunk_size=BATCH_SIZE
+		)
+
+	return {
+		"minimum_attendance_percentage": minimum_required,
+		"condonable_from_percentage": condonable_from,
+		"total_entries": len(values),
+		"eligible_count": counts["Eligible"],
+		"condonable_count": counts["Condonable Shortage"],
+		"detained_count": counts["Detained"],
+	}
+
+
+def get_latest_snapshot(course_offering, cutoff_date=None, on_or_before=None):
+	"""
+	Latest completed snapshot holding entries of the offering, optionally at an
+	exact cut-off or with a cut-off on or before a date
+	"""
+	values = {
+		"course_offering": course_offering,
+		"cutoff_date": getdate(cutoff_date) if cutoff_date else None,
+		"on_or_before": getdate(on_or_before) if on_or_before else None,
+	}
+	cutoff_condition = "AND s.cutoff_date = %(cutoff_date)s" if cutoff_date else ""
+	if on_or_before:
+		cutoff_condition += " AND s.cutoff_date <= %(on_or_before)s"
+
+	result = frappe.db.sql(f"""
+		SELECT s.name
+		FROM `tabEligibility Snapshot` s
+		WHERE s.status = 'Completed'
+		{cutoff_condition}
+		AND EXISTS (
+			SELECT 1 FROM `tabEligibility Snapshot Entry` e
+			WHERE e.snapshot = s.name AND e.course_offering = %(course_offering)s
+		)
+		ORDER BY s.cutoff_date DESC, s.creation DESC
+		LIMIT 1
+	""", values)
+
+	return result[0][0] if result else None
+
+
+def get_snapshot_entries(snapshot, course_offering, statuses=None, below_percentage=None, order_by="student_name ASC"):
+	"""Entries of one offering in a snapshot, served by the (snapshot, course_offering, status) index"""
+	filters = {"snapshot": snapshot, "course_offering": course_offering}
+	if statuses:
+		filters["status"] = ["in", list(statuses)]
+	if below_percentage is not None:
+		filters["attendance_percentage"] = ["<", flt(below_percentage)]
+
+	return frappe.get_all("Eligibility Snapshot Entry",
+		filters=filters,
+		fields=["snapshot", *ENTRY_FIELDS],
+		order_by=order_by
+	)
+
 
 def generate_eligibility_list(course_offering, cutoff_date=None):
 	"""
-	Generate a list of students with their eligibility status
+	Students of the offering with their eligibility status as of the cut-off
+	date (today by default), from the latest snapshot up to that date, or from
+	the live Attendance Summary when the offering has none. Nothing is computed
+	on read: snapshots are created with create_eligibility_snapshot.
 	"""
-	if not cutoff_date:
-		cutoff_date = nowdate()
-		
-	# Ensure summaries are up to date
-	update_summaries(course_offering)
-	
-	settings = frappe.get_single("Attendance Settings")
-	min_req = flt(settings.minimum_attendance_percentage)
-	condonable_range = [min_req - 10, min_req] # E.g., 65-75%
-	
+	cutoff_date = getdate(cutoff_date or nowdate())
+
+	snapshot = get_latest_snapshot(course_offering, on_or_before=cutoff_date)
+	if not snapshot:
+		return get_live_eligibility_list(course_offering)
+
+	return [
+		{
+			"student": entry.student,
+			"student_name": entry.student_name,
+			"attendance_percentage": entry.attendance_percentage,
+			"status": entry.status,
+			"recommended_action": entry.recommended_action
+		}
+		for entry in get_snapshot_entries(snapshot, course_offering)
+	]
+
+
+def get_live_eligibility_list(course_offering):
+	"""Eligibility status of the offering's students from Attendance Summary"""
+	minimum_required = flt(get_recalculation_context().settings.minimum_attendance_percentage)
+	condonable_from = minimum_required - CONDONABLE_RANGE
+
 	data = []
-	
-	summaries = frappe.get_all("Attendance Summary", 
+	for summary in frappe.get_all("Attendance Summary",
 		filters={"course_offering": course_offering},
-		fields=["student", "student_name", "attendance_percentage", "attended_classes", "total_classes"]
-	)
-	
-	for s in summaries:
-		status = "Eligible"
-		action = "Release Hall Ticket"
-		
-		# Recalculate if needed or trust summary
-		pct = s.attendance_percentage
-		
-		if pct < min_req:
-			if pct >= condonable_range[0]:
-				status = "Condonable Shortage"
-				action = "Fine Applicable"
-			else:
-				status = "Detained"
-				action = "Block Hall Ticket"
-		
+		fields=["student", "student_name", "attendance_percentage", "eligible_for_exam"],
+		order_by="student_name ASC"
+	):
+		# eligible_for_exam carries the FA/MFA override
+		status = classify(flt(summary.attendance_percentage), summary.eligible_for_exam, minimum_required, condonable_from)
 		data.append({
-			"student": s.student,
-			"student_name": s.student_name,
-			"attendance_percentage": pct,
+			"student": summary.student,
+			"student_name": summary.student_name,
+			"attendance_percentage": summary.attendance_percentage,
 			"status": status,
-			"recommended_action": action
+			"recommended_action": ACTIONS[status]
 		})
-		
-	return data
 
-def update_summaries(course_offering):
-	"""Force update of all summaries for this course"""
-	from slcm.slcm.utils.attendance_calculator import calculate_student_attendance
-	
-	students = frappe.db.sql_list("""
-		SELECT student FROM `tabAttendance Summary` WHERE course_offering=%s
-	""", course_offering)
-	
-	for student in students:
-		calculate_student_attendance(student, course_offering)
+	return data
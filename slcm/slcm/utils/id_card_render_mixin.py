@@ -0,0 +1,91 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Rendering of HTML card sides for the ID card controllers (ID Card
+Generation, Student ID Card) through id_card_renderer.
+
+generate_card brackets its work with start_render_batch/end_render_batch:
+the sides queued in between by render_side are rendered together. A caller
+that renders many cards sets flags.defer_render itself, collects
+flags.pending_renders of each card and hands the PNGs to finish_render.
+"""
+
+import frappe
+from frappe.utils.file_manager import save_file
+
+from slcm.slcm.utils.id_card_renderer import render_html, render_many
+
+
+class IDCardRenderMixin:
+	def start_render_batch(self):
+		"""Queue the sides of this card unless the caller already defers them"""
+		batch_sides = not self.flags.defer_render
+		if batch_sides:
+			self.flags.defer_render = True
+			self.flags.pending_renders = []
+		return batch_sides
+
+	def end_render_batch(self, batch_sides):
+		"""Render the queued sides and mark the card Generated, or leave them to the deferring caller"""
+		if batch_sides:
+			self.render_pending()
+			return
+
+		# Deferred by the caller, which renders its batch and calls finish_render
+		if self.flags.pending_renders:
+			return
+
+		self.card_status = "Generated"
+		self.save()
+
+	def render_side(self, html, width, height, fieldname, filename, error_title):
+		"""
+		Render one side with wkhtmltoimage and attach it. With
+		flags.defer_render the render is queued on flags.pending_renders
+		instead, for the caller to run in a batch and pass to finish_render.
+		"""
+		if self.flags.defer_render:
+			self.flags.setdefault("pending_renders", []).append(
+				{
+					"html": html,
+					"width": width,
+					"height": height,
+					"fieldname": fieldname,
+					"filename": filename,
+					"error_title": error_title,
+				}
+			)
+			return
+
+		try:
+			self.save_rendered(fieldname, filename, render_html(html, width, height))
+		except Exception as e:
+			frappe.throw(f"{error_title}: {e}")
+
+	def save_rendered(self, fieldname, filename, content):
+		saved_file = save_file(filename, content, self.doctype, self.name, is_private=0)
+		self.db_set(fieldname, saved_file.file_url)
+
+	def render_pending(self):
+		"""Render the queued sides in one batch, attach them and mark the card Generated"""
+		jobs = self.flags.pending_renders or []
+		rendered = render_many(jobs)
+
+		for job, (_content, error) in zip(jobs, rendered, strict=True):
+			if error:
+				self.flags.defer_render = False
+				self.flags.pending_renders = []
+				frappe.throw(f"{job['error_title']}: {error}")
+
+		self.finish_render([content for content, _error in rendered])
+
+	def finish_render(self, images):
+		"""Attach the PNGs of flags.pending_renders (in order) and mark the card Generated"""
+		for job, content in zip(self.flags.pending_renders, images, strict=True):
+			self.save_rendered(job["fieldname"], job["filename"], content)
+
+		self.flags.defer_render = False
+		self.flags.pending_renders = []
+		self.card_status = "Generated"
+		self.save()
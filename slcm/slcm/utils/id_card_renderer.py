@@ -0,0 +1,80 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+HTML to PNG rendering of ID card sides with wkhtmltoimage.
+
+`render_html` renders one side. `render_many` renders a batch with a bounded
+pool: each worker thread waits on its own wkhtmltoimage process, so at most
+`max_workers` renderer processes run at once. Neither touches the database,
+so they are safe to call from pool threads.
+"""
+
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+WKHTMLTOIMAGE = "/usr/bin/wkhtmltoimage"
+CARD_WIDTH, CARD_HEIGHT = 1011, 638
+RENDER_TIMEOUT = 120
+
+
+def get_render_workers():
+	"""Renderer processes per background job, at most one per CPU"""
+	return max(1, min(4, os.cpu_count() or 1))
+
+
+def render_html(html, width=CARD_WIDTH, height=CARD_HEIGHT):
+	"""PNG bytes of `html`; raises RuntimeError when wkhtmltoimage fails"""
+	with tempfile.NamedTemporaryFile(suffix=".html", delete=False, mode="w") as f:
+		f.write(html)
+		html_path = f.name
+	output_path = f"{html_path[:-5]}.png"
+
+	try:
+		args = [
+			WKHTMLTOIMAGE,
+			"--enable-local-file-access",
+			"--width",
+			str(width),
+			"--height",
+			str(height),
+			"--quality",
+			"100",
+			html_path,
+			output_path,
+		]
+		result = subprocess.run(args, capture_output=True, text=True, timeout=RENDER_TIMEOUT)
+		if result.returncode != 0:
+			raise RuntimeError(f"wkhtmltoimage failed with code {result.returncode}: {result.stderr}")
+
+		with open(output_path, "rb") as f:
+			return f.read()
+	finally:
+		for path in (html_path, output_path):
+			if os.path.exists(path):
+				os.remove(path)
+
+
+def render_many(jobs, max_workers=None):
+	"""
+	Render a batch of {html, width, height} jobs in parallel.
+
+	Returns (png, error) per job in the order given; a failed job has
+	png None and the error message instead of stopping the batch.
+	"""
+	if not jobs:
+		return []
+
+	def render(job):
+		try:
+			return render_html(job["html"], job.get("width", CARD_WIDTH), job.get("height", CARD_HEIGHT)), None
+		except Exception as e:
+			return None, str(e)
+
+	if len(jobs) == 1:
+		return [render(jobs[0])]
+
+	with ThreadPoolExecutor(max_workers=min(max_workers or get_render_workers(), len(jobs))) as pool:
+		return list(pool.map(render, jobs))
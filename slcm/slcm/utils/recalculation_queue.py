@@ -0,0 +1,194 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Coalescing queue for Attendance Summary recalculation.
+
+Attendance hooks add (student, course_offering) pairs to a Redis set instead of
+enqueuing one job per record. Repeated changes to the same pair collapse into a
+single entry. A single drain job (deduplicated by job id, backed by a cron
+entry in hooks.py) pops the set in batches and recalculates each batch through
+the bulk engine.
+
+A popped batch is moved to a processing sorted set (scored by claim time) and
+only removed from it once its recalculation is committed. Pairs of a drain
+that was killed (job timeout, OOM) stay there and are put back on the dirty
+set by the next drain once they are older than PROCESSING_TIMEOUT. Both sets
+live in the background job (RQ) Redis, which does not evict keys; the cache
+Redis runs with allkeys-lru.
+"""
+
+import time
+from collections import defaultdict
+
+import frappe
+
+DIRTY_SET = "slcm:attendance_recalculation:dirty"
+PROCESSING_SET = "slcm:attendance_recalculation:processing"
+DRAIN_JOB_ID = "slcm:attendance_recalculation:drain"
+SEPARATOR = "::"
+BATCH_SIZE = 500
+# Claimed pairs older than this belong to a drain that died
+PROCESSING_TIMEOUT = 30 * 60
+
+# Pop up to ARGV[1] members of the dirty set into the processing set, scored ARGV[2]
+CLAIM_SCRIPT = """
+local members = redis.call('SPOP', KEYS[1], ARGV[1])
+for _, member in ipairs(members) do
+	redis.call('ZADD', KEYS[2], ARGV[2], member)
+end
+return members
+"""
+
+# Move processing members scored at most ARGV[1] back to the dirty set
+RECOVER_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, member in ipairs(members) do
+	redis.call('SADD', KEYS[1], member)
+	redis.call('ZREM', KEYS[2], member)
+end
+return #members
+"""
+
+
+def get_connection():
+	"""Queue Redis connection; unlike the cache Redis it does not evict keys"""
+	from frappe.utils.background_jobs import get_redis_conn
+
+	return get_redis_conn()
+
+
+def queue_key(name):
+	"""Site-prefixed key (the queue Redis is shared by every site of the bench)"""
+	return frappe.cache().make_key(name)
+
+
+def to_member(student, course_offering):
+	return f"{student}{SEPARATOR}{course_offering}"
+
+
+def mark_dirty(student, course_offering):
+	"""Queue a summary recalculation for the pair and make sure a drain job is pending"""
+	mark_dirty_many([(student, course_offering)])
+
+
+def mark_dirty_many(pairs):
+	"""Queue summary recalculations for several (student, course_offering) pairs at once"""
+	pairs = {(student, co) for student, co in pairs if student and co}
+	if not pairs:
+		return
+
+	try:
+		get_connection().sadd(queue_key(DIRTY_SET), *(to_member(student, co) for student, co in pairs))
+	except Exception as e:
+		# Redis unavailable: fall back to immediate per-student jobs
+		frappe.log_error(message=f"Error queueing recalculation: {e!s}", title="Recalculation Queue Error")
+		for student, course_offering in pairs:
+			frappe.enqueue(
+				"slcm.slcm.utils.attendance_calculator.calculate_student_attendance",
+				student=student,
+				course_offering=course_offering,
+				queue="short"
+			)
+		return
+
+	schedule_drain()
+
+
+def schedule_drain():
+	"""Enqueue the drain job unless one is already queued or running"""
+	# enqueue_after_commit defers the dedup check, so only schedule once per request
+	if frappe.flags.attendance_recalculation_scheduled:
+		return
+	frappe.flags.attendance_recalculation_scheduled = True
+
+	frappe.enqueue(
+		"slcm.slcm.utils.recalculation_queue.drain_dirty_summaries",
+		queue="short",
+		job_id=DRAIN_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True
+	)
+
+
+def pop_dirty(batch_size=BATCH_SIZE):
+	"""Atomically move up to batch_size pairs from the dirty set to the processing set"""
+	members = get_connection().eval(
+		CLAIM_SCRIPT, 2, queue_key(DIRTY_SET), queue_key(PROCESSING_SET), batch_size, time.time()
+	) or []
+
+	pairs = []
+	for member in members:
+		if isinstance(member, bytes):
+			member = member.decode()
+		student, _, course_offering = member.partition(SEPARATOR)
+		if student and course_offering:
+			pairs.append((student, course_offering))
+
+	return pairs
+
+
+def complete(pairs):
+	"""Drop pairs from the processing set once their recalculation is committed"""
+	if pairs:
+		get_connection().zrem(queue_key(PROCESSING_SET), *(to_member(student, co) for student, co in pairs))
+
+
+def requeue(pairs):
+	"""Move pairs from the processing set back to the dirty set after a failed batch"""
+	if not pairs:
+		return
+
+	members = [to_member(student, co) for student, co in pairs]
+	pipeline = get_connection().pipeline()
+	pipeline.sadd(queue_key(DIRTY_SET), *members)
+	pipeline.zrem(queue_key(PROCESSING_SET), *members)
+	pipeline.execute()
+
+
+def recover_stale(timeout=PROCESSING_TIMEOUT):
+	"""Put pairs claimed by a drain that never finished back on the dirty set"""
+	return get_connection().eval(
+		RECOVER_SCRIPT, 2, queue_key(DIRTY_SET), queue_key(PROCESSING_SET), time.time() - timeout
+	) or 0
+
+
+def drain_dirty_summaries(batch_size=BATCH_SIZE):
+	"""
+	Recalculate every queued pair (scheduled job and debounced worker).
+	Each batch is grouped by course offering and committed on its own.
+	"""
+	from slcm.slcm.utils.bulk_attendance_calculator import recalculate_summaries
+
+	recalculated = 0
+	recovered = recover_stale()
+
+	while True:
+		pairs = pop_dirty(batch_size)
+		if not pairs:
+			break
+
+		students_by_offering = defaultdict(set)
+		for student, course_offering in pairs:
+			students_by_offering[course_offering].add(student)
+
+		try:
+			for course_offering, students in students_by_offering.items():
+				recalculate_summaries(course_offerings=[course_offering], students=students)
+			frappe.db.commit()
+		except Exception as e:
+			frappe.db.rollback()
+			requeue(pairs)
+			frappe.log_error(message=f"Error draining recalculation queue: {e!s}", title="Attendance Calculation Error")
+			break
+
+		complete(pairs)
+		recalculated += len(pairs)
+
+	return {"success": True, "recalculated": recalculated, "recovered": recovered}
+
+
+def get_pending_count():
+	"""Number of pairs waiting for recalculation, including batches being processed"""
+	conn = get_connection()
+	return (conn.scard(queue_key(DIRTY_SET)) or 0) + (conn.zcard(queue_key(PROCESSING_SET)) or 0)
@@ -0,0 +1,278 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Write-behind RFID ingest.
+
+With "Write-behind RFID Ingest" enabled in Attendance Settings, the ingest
+endpoint validates a swipe and appends it to a Redis stream instead of
+inserting it. `drain_ingest_stream` reads the stream through a consumer group,
+bulk inserts the swipes into Attendance Log, acknowledges them and hands off to
+the log matcher (`process_attendance_logs`).
+
+Entries are only acknowledged after the insert is committed. Entries of a
+failed drain stay pending and are claimed again by the next run; an entry that
+cannot be inserted on its own is moved to a dead-letter stream, from which
+`replay_dead_letters` puts it back.
+
+The streams live in the background job (RQ) Redis, not the cache Redis: the
+cache evicts keys under memory pressure (allkeys-lru), which would drop swipes
+the endpoint already acknowledged to the reader.
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+STREAM = "slcm:rfid:ingest"
+DEAD_LETTER_STREAM = "slcm:rfid:ingest:dead"
+GROUP = "attendance_log_writer"
+DRAIN_JOB_ID = "slcm:rfid:ingest:drain"
+DRAIN_SCHEDULED = "slcm:rfid:ingest:drain_scheduled"
+MATCH_JOB_ID = "slcm:rfid:ingest:match"
+STATS_KEY = "slcm:rfid:ingest:stats"
+
+BATCH_SIZE = 500
+# Backlog above which the endpoint stops queueing and writes directly
+MAX_BACKLOG = 50000
+# Pending entries idle for this long belong to a consumer that failed
+CLAIM_IDLE_MS = 60 * 1000
+FIELDS = ("rfid_uid", "student", "swipe_time", "device_id", "sequence", "location", "source")
+
+
+def is_write_behind_enabled():
+	return bool(cint(frappe.db.get_single_value("Attendance Settings", "rfid_write_behind_ingest")))
+
+
+def stream_key(name=STREAM):
+	"""Site-prefixed key (the queue Redis is shared by every site of the bench)"""
+	return frappe.cache().make_key(name)
+
+
+def get_stream_connection():
+	"""Queue Redis connection; unlike the cache Redis it does not evict keys"""
+	from frappe.utils.background_jobs import get_redis_conn
+
+	return get_redis_conn()
+
+
+def push_swipe(swipe):
+	"""
+	Append a validated swipe to the ingest stream. Returns False when the
+	backlog is too large or Redis is unavailable; the caller then writes directly.
+	"""
+	try:
+		conn = get_stream_connection()
+		if conn.xlen(stream_key()) >= MAX_BACKLOG:
+			return False
+		conn.xadd(stream_key(), {field: str(swipe.get(field) or "") for field in FIELDS})
+	except Exception as e:
+		frappe.log_error(message=f"Error queueing RFID swipe: {e!s}", title="RFID Ingest Stream Error")
+		return False
+
+	schedule_drain()
+	return True
+
+
+def schedule_drain():
+	"""Enqueue a drain job at most once every few seconds; the cron entry picks up anything left"""
+	cache = frappe.cache()
+	try:
+		if not cache.execute_command("SET", cache.make_key(DRAIN_SCHEDULED), 1, "NX", "EX", 5):
+			return
+	except Exception:
+		return
+
+	frappe.enqueue(
+		"slcm.slcm.utils.rfid_ingest_stream.drain_ingest_stream",
+		queue="short",
+		job_id=DRAIN_JOB_ID,
+		deduplicate=True
+	)
+
+
+def ensure_group():
+	try:
+		get_stream_connection().xgroup_create(stream_key(), GROUP, id="0", mkstream=True)
+	except Exception as e:
+		# BUSYGROUP: the group already exists
+		if "BUSYGROUP" not in str(e):
+			raise
+
+
+def decode_entries(entries):
+	decoded = []
+	for entry_id, fields in entries or []:
+		entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+		values = {
+			(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+			for k, v in (fields or {}).items()
+		}
+		decoded.append((entry_id, values))
+	return decoded
+
+
+def read_batch(consumer, batch_size):
+	"""Entries abandoned by a failed consumer first (replay), then new ones"""
+	conn = get_stream_connection()
+
+	claimed = conn.xautoclaim(stream_key(), GROUP, consumer, CLAIM_IDLE_MS, start_id="0-0", count=batch_size)
+	entries = decode_entries(claimed[1] if claimed else [])
+	if entries:
+		return entries
+
+	response = conn.xreadgroup(GROUP, consumer, {stream_key(): ">"}, count=batch_size)
+	return decode_entries(response[0][1] if response else [])
+
+
+def to_swipe(values):
+	sequence = values.get("sequence")
+	return frappe._dict(
+		rfid_uid=values.get("rfid_uid"),
+		student=values.get("student"),
+		swipe_time=get_datetime(values.get("swipe_time")),
+		device_id=values.get("device_id") or None,
+		sequence=cint(sequence) if sequence not in (None, "") else None,
+		location=values.get("location") or None,
+		source=values.get("source") or "RFID",
+		result={}
+	)
+
+
+def drain_ingest_stream(batch_size=BATCH_SIZE):
+	"""
+	Write queued swipes to Attendance Log (scheduled every minute and enqueued
+	by the endpoint). Each batch is committed, then acknowledged.
+	"""
+	from slcm.api.attendance import get_received_swipes, insert_attendance_logs, swipe_key
+
+	conn = get_stream_connection()
+	if not conn.exists(stream_key()):
+		return
+
+	ensure_group()
+	consumer = f"{frappe.local.site}:{frappe.generate_hash(length=8)}"
+	started = time.monotonic()
+	inserted = duplicates = dead = 0
+
+	while True:
+		entries = read_batch(consumer, batch_size)
+		if not entries:
+			break
+
+		swipes = {entry_id: to_swipe(values) for entry_id, values in entries}
+
+		# Entries replayed after a commit whose acknowledgement was lost are already stored
+		received = get_received_swipes(list(swipes.values()))
+		fresh, keys = {}, set()
+		for entry_id, swipe in swipes.items():
+			key = swipe_key(swipe)
+			if key in received or key in keys:
+				duplicates += 1
+				continue
+			keys.add(key)
+			fresh[entry_id] = swipe
+
+		try:
+			insert_attendance_logs(list(fresh.values()))
+			frappe.db.commit()
+			inserted += len(fresh)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(message=f"Error writing RFID ingest batch: {e!s}", title="RFID Ingest Stream Error")
+			inserted_one, dead_one = insert_one_by_one(dict(entries), fresh)
+			inserted += inserted_one
+			dead += dead_one
+
+		conn.xack(stream_key(), GROUP, *swipes)
+		conn.xdel(stream_key(), *swipes)
+
+	if inserted:
+		# Hand the new logs to the matcher
+		frappe.enqueue(
+			"slcm.slcm.doctype.attendance_log.process_attendance_logs.process_pending_logs",
+			queue="long",
+			job_id=MATCH_JOB_ID,
+			deduplicate=True
+		)
+
+	stats = {
+		"inserted": inserted,
+		"duplicates": duplicates,
+		"dead_lettered": dead,
+		"duration_seconds": round(time.monotonic() - started, 3),
+		"finished_at": str(now_datetime())
+	}
+	try:
+		frappe.cache().hset(STATS_KEY, "last_drain", stats)
+	except Exception:
+		pass
+
+	return stats
+
+
+def insert_one_by_one(values_by_entry, swipes):
+	"""Fallback for a failed batch: isolate the bad entries and dead-letter them"""
+	from slcm.api.attendance import insert_attendance_logs
+
+	conn = get_stream_connection()
+	inserted = dead = 0
+	for entry_id, swipe in swipes.items():
+		values = values_by_entry[entry_id]
+		try:
+			insert_attendance_logs([swipe])
+			frappe.db.commit()
+			inserted += 1
+		except Exception as e:
+			frappe.db.rollback()
+			conn.xadd(stream_key(DEAD_LETTER_STREAM), dict(values, error=str(e)[:500]))
+			dead += 1
+
+	return inserted, dead
+
+
+@frappe.whitelist()
+def get_ingest_stats():
+	"""Backpressure metrics of the ingest stream"""
+	frappe.only_for("System Manager")
+	conn = get_stream_connection()
+	ensure_group()
+
+	pending = conn.xpending(stream_key(), GROUP) or {}
+	backlog = conn.xlen(stream_key())
+
+	oldest_age = None
+	first = conn.xrange(stream_key(), count=1)
+	if first:
+		first_id = first[0][0]
+		first_id = first_id.decode() if isinstance(first_id, bytes) else first_id
+		oldest_age = round(time.time() - int(first_id.split("-")[0]) / 1000, 1)
+
+	return {
+		"enabled": is_write_behind_enabled(),
+		"backlog": backlog,
+		"max_backlog": MAX_BACKLOG,
+		"pending": pending.get("pending", 0),
+		"oldest_entry_age_seconds": oldest_age,
+		"dead_letters": conn.xlen(stream_key(DEAD_LETTER_STREAM)),
+		"last_drain": frappe.cache().hget(STATS_KEY, "last_drain")
+	}
+
+
+@frappe.whitelist()
+def replay_dead_letters():
+	"""Move dead-lettered swipes back onto the ingest stream"""
+	frappe.only_for("System Manager")
+	conn = get_stream_connection()
+
+	entries = decode_entries(conn.xrange(stream_key(DEAD_LETTER_STREAM)))
+	for entry_id, values in entries:
+		values.pop("error", None)
+		conn.xadd(stream_key(), values)
+		conn.xdel(stream_key(DEAD_LETTER_STREAM), entry_id)
+
+	if entries:
+		schedule_drain()
+
+	return {"replayed": len(entries)}
@@ -0,0 +1,125 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Redis-backed lookups for the RFID ingest endpoint.
+
+A tap is resolved without database reads: RFID UID → student and device →
+(active, location) are kept in Redis hashes filled on first use and cleared
+when a Student Master, Student RFID Card or RFID Device is saved. The
+anti-flood window is an expiring Redis key per UID, and device `last_seen`
+timestamps are buffered in Redis and written in one pass by a scheduled job.
+"""
+
+import frappe
+
+UID_MAP = "slcm:rfid:uid_map"
+DEVICE_MAP = "slcm:rfid:device_map"
+LAST_SEEN = "slcm:rfid:last_seen"
+LAST_SEEN_FLUSHING = "slcm:rfid:last_seen:flushing"
+FLOOD_PREFIX = "slcm:rfid:flood:"
+STUDENT_FIELDS = ["name", "first_name", "last_name", "department", "programme"]
+
+
+def get_student_by_uid(rfid_uid):
+	"""Student details for an RFID UID, or None when the UID is not registered"""
+	if not rfid_uid:
+		return None
+
+	# Unknown UIDs are cached as False so repeated taps of a stray card stay cheap
+	return frappe.cache().hget(UID_MAP, rfid_uid, generator=lambda: load_student_by_uid(rfid_uid)) or None
+
+
+def load_student_by_uid(rfid_uid):
+	student = frappe.db.get_value("Student Master", {"rfid_uid": rfid_uid}, STUDENT_FIELDS, as_dict=True)
+	if not student:
+		card_student = frappe.db.get_value("Student RFID Card", {"rfid_uid": rfid_uid, "is_active": 1}, "student")
+		if card_student:
+			student = frappe.db.get_value("Student Master", card_student, STUDENT_FIELDS, as_dict=True)
+
+	return dict(student) if student else False
+
+
+def get_device(device_id):
+	"""{"name", "is_active", "location"} of an RFID Device, or None when it is not registered"""
+	if not device_id:
+		return None
+
+	return frappe.cache().hget(DEVICE_MAP, device_id, generator=lambda: load_device(device_id)) or None
+
+
+def load_device(device_id):
+	device = frappe.db.get_value("RFID Device", device_id, ["name", "is_active", "location"], as_dict=True)
+	return dict(device) if device else False
+
+
+def invalidate_uid(*rfid_uids):
+	for rfid_uid in rfid_uids:
+		if rfid_uid:
+			frappe.cache().hdel(UID_MAP, rfid_uid)
+
+
+def invalidate_device(*device_ids):
+	for device_id in device_ids:
+		if device_id:
+			frappe.cache().hdel(DEVICE_MAP, device_id)
+
+
+def clear_student_uid_cache(doc, method=None):
+	"""doc_event for Student Master and Student RFID Card: drop the old and new UID"""
+	before = doc.get_doc_before_save() if method != "on_trash" else None
+	invalidate_uid(doc.get("rfid_uid"), before and before.get("rfid_uid"))
+
+
+def is_duplicate_swipe(rfid_uid, window_seconds=10):
+	"""
+	True when the UID was already seen within the anti-flood window.
+	SET NX claims the window atomically, so concurrent taps cannot both pass.
+	"""
+	cache = frappe.cache()
+	try:
+		claimed = cache.execute_command(
+			"SET", cache.make_key(f"{FLOOD_PREFIX}{rfid_uid}"), 1, "NX", "EX", window_seconds
+		)
+	except Exception:
+		# Redis unavailable: fall back to scanning recent logs
+		return bool(frappe.db.exists("Attendance Log", {
+			"rfid_uid": rfid_uid,
+			"swipe_time": [">", frappe.utils.add_to_date(frappe.utils.now_datetime(), seconds=-window_seconds)]
+		}))
+
+	return not claimed
+
+
+def touch_device(device_id, timestamp):
+	"""Record a device heartbeat; flushed to RFID Device.last_seen by flush_device_last_seen"""
+	try:
+		frappe.cache().hset(LAST_SEEN, device_id, str(timestamp))
+	except Exception:
+		frappe.db.set_value("RFID Device", device_id, "last_seen", timestamp, update_modified=False)
+
+
+def flush_device_last_seen():
+	"""Write buffered last_seen timestamps (scheduled every minute)"""
+	cache = frappe.cache()
+	try:
+		# Move the buffer aside first so heartbeats arriving meanwhile are kept for the next run
+		cache.execute_command("RENAME", cache.make_key(LAST_SEEN), cache.make_key(LAST_SEEN_FLUSHING))
+	except Exception:
+		# Nothing buffered
+		return
+
+	last_seen = {
+		(device_id.decode() if isinstance(device_id, bytes) else device_id): timestamp
+		for device_id, timestamp in (cache.hgetall(LAST_SEEN_FLUSHING) or {}).items()
+	}
+	cache.delete_key(LAST_SEEN_FLUSHING)
+	if not last_seen:
+		return
+
+	existing = frappe.get_all("RFID Device", filters={"name": ["in", list(last_seen)]}, pluck="name")
+	updates = {device_id: {"last_seen": last_seen[device_id]} for device_id in existing}
+
+	if updates:
+		frappe.db.bulk_update("RFID Device", updates, update_modified=False)
+		frappe.db.commit()
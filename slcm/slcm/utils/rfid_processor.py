@@ -1,6 +1,9 @@
 import frappe
 from frappe.utils import get_datetime, add_to_date
 
+from slcm.slcm.utils.rfid_lookup_cache import get_device, get_student_by_uid
+from slcm.slcm.utils.session_window_index import get_session_window_index
+
 def process_log_entry(log_doc):
 	"""Process a raw attendance log entry"""
 	if log_doc.processed:
@@ -23,7 +26,7 @@ def process_log_entry(log_doc):
 		return
 
 	# 2. Identify Student
-	student = frappe.db.get_value("Student Master", {"rfid_uid": log_doc.rfid_uid})
+	student = (get_student_by_uid(log_doc.rfid_uid) or {}).get("name")
 	if not student:
 		frappe.msgprint(f"Unknown RFID Tag: {log_doc.rfid_uid}")
 		# We can leave it unprocessed or mark as 'Unknown'
@@ -37,32 +40,21 @@ def process_log_entry(log_doc):
 		return
 		
 	# Get Device Location (Room)
-	device_location = frappe.db.get_value("RFID Device", {"device_id": log_doc.device_id}, "location")
+	device_location = (get_device(log_doc.device_id) or {}).get("location")
 	if not device_location:
 		return
 		
 	# Find matching session
-	# Matches: Same Room, Same Date, Time overlapping
-	log_date = swipe_time.date()
-	log_time_str = swipe_time.strftime('%H:%M:%S')
-	
-	sessions = frappe.db.sql("""
-		SELECT name, course_schedule, course_offering
-		FROM `tabAttendance Session`
-		WHERE room = %s
-		AND session_date = %s
-		AND session_start_time <= %s
-		AND session_end_time >= %s
-		AND session_status != 'Cancelled'
-		LIMIT 1
-	""", (device_location, log_date, log_time_str, log_time_str), as_dict=True)
+	# Matches: Same Room, Same Date, swipe inside the buffered session window
+	# (same windows as the scheduled processor, see session_window_index)
+	session = get_session_window_index(swipe_time.date(), rooms=[device_location]).find_best(
+		swipe_time, room=device_location
+	)
 	
-	if not sessions:
+	if not session:
 		# No active session found for this room/time
 		return
 		
-	session = sessions[0]
-	
 	# 4. Mark Attendance
 	# Find existing student attendance record for this session
 	attendance_name = frappe.db.exists("Student Attendance", {
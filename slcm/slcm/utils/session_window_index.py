@@ -0,0 +1,152 @@
+# Copyright (c) 2026, Nishanth and contributors
+# For license information, please see license.txt
+
+"""
+Per-day index of session swipe windows.
+
+Shared by the real-time RFID processor (`rfid_processor`) and the scheduled
+log processor (`process_attendance_logs`) so both resolve a swipe to the same
+sessions. Session times are parsed once, the swipe buffer is applied once and
+windows are kept sorted by start, per room and per student group, so a swipe
+is resolved to its candidate sessions with a binary search.
+
+Cancelled sessions (of either doctype) are not indexed, so no swipe is
+matched to them. The real-time processor already skipped them; the
+scheduled processor used to match cancelled Attendance Sessions too.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_to_date, get_datetime, getdate
+
+SWIPE_BUFFER_MINUTES = 20
+# Sessions that take swipes, for both Attendance Session and Office Hours Session
+ACTIVE_SESSION_FILTERS = {"session_status": ["!=", "Cancelled"]}
+
+
+def set_session_window(session, buffer_minutes=SWIPE_BUFFER_MINUTES):
+	"""Parse a session's start/end once and store the buffered swipe window on it"""
+	session_date = session.get("session_date") or getdate()
+	session.start_datetime = get_datetime(f"{session_date} {session.session_start_time}")
+	session.end_datetime = get_datetime(f"{session_date} {session.session_end_time}")
+
+	# Add Buffer (e.g., 20 mins before start, 20 mins after end)
+	session.window_start = add_to_date(session.start_datetime, minutes=-buffer_minutes)
+	session.window_end = add_to_date(session.end_datetime, minutes=buffer_minutes)
+	return session
+
+
+class IntervalIndex:
+	"""
+	Static interval index: windows sorted by start with a running maximum of
+	their ends. A point query bisects on the start and walks back only while
+	an earlier window can still reach the point, i.e. O(log n + k).
+	"""
+
+	def __init__(self, sessions):
+		self.sessions = sorted(sessions, key=lambda s: (s.window_start, s.window_end))
+		self.starts = [s.window_start for s in self.sessions]
+		self.max_ends = []
+		running = None
+		for session in self.sessions:
+			running = session.window_end if running is None else max(running, session.window_end)
+			self.max_ends.append(running)
+
+	def find(self, moment):
+		matches = []
+		i = bisect_right(self.starts, moment) - 1
+		while i >= 0 and self.max_ends[i] >= moment:
+			if self.sessions[i].window_end >= moment:
+				matches.append(self.sessions[i])
+			i -= 1
+		matches.reverse()
+		return matches
+
+
+class SessionWindowIndex:
+	"""Swipe windows of every class and office hours session on one date"""
+
+	def __init__(self, date, rooms=None, buffer_minutes=SWIPE_BUFFER_MINUTES):
+		self.date = getdate(date)
+
+		filters = dict(ACTIVE_SESSION_FILTERS, session_date=self.date, docstatus=["<", 2])
+		if rooms:
+			filters["room"] = ["in", list(rooms)]
+
+		class_sessions = frappe.get_all("Attendance Session",
+			filters=filters,
+			fields=["name", "session_date", "session_start_time", "session_end_time", "course_schedule",
+				"course_offering", "session_type", "duration_hours", "room", "student_group"]
+		)
+
+		office_sessions = []
+		if not rooms:
+			office_sessions = frappe.get_all("Office Hours Session",
+				filters=dict(ACTIVE_SESSION_FILTERS, session_date=self.date),
+				fields=["name", "session_date", "start_time as session_start_time", "end_time as session_end_time",
+					"course_offering", "location as room"]
+			)
+
+		for session in class_sessions:
+			session.type = "Class"
+			set_session_window(session, buffer_minutes)
+		for session in office_sessions:
+			session.type = "Office"
+			set_session_window(session, buffer_minutes)
+
+		# Class sessions first, then office hours (processing order of the scheduled job)
+		self.sessions = class_sessions + office_sessions
+		self.all = IntervalIndex(self.sessions)
+
+		by_room = defaultdict(list)
+		by_group = defaultdict(list)
+		for session in self.sessions:
+			if session.get("room"):
+				by_room[session.room].append(session)
+			if session.get("student_group"):
+				by_group[session.student_group].append(session)
+
+		self.by_room = {room: IntervalIndex(sessions) for room, sessions in by_room.items()}
+		self.by_group = {group: IntervalIndex(sessions) for group, sessions in by_group.items()}
+
+	def find(self, swipe_time, room=None, student_group=None):
+		"""Sessions whose swipe window contains swipe_time, optionally limited to a room or group"""
+		swipe_time = get_datetime(swipe_time)
+
+		if room is not None:
+			index = self.by_room.get(room)
+		elif student_group is not None:
+			index = self.by_group.get(student_group)
+		else:
+			index = self.all
+
+		return index.find(swipe_time) if index else []
+
+	def find_best(self, swipe_time, room=None, student_group=None):
+		"""
+		The single most plausible session for a swipe: one that is actually
+		running at swipe_time, otherwise the one starting closest to it.
+		"""
+		swipe_time = get_datetime(swipe_time)
+		candidates = self.find(swipe_time, room=room, student_group=student_group)
+		if not candidates:
+			return None
+
+		return min(candidates, key=lambda s: (
+			not (s.start_datetime <= swipe_time <= s.end_datetime),
+			abs((s.start_datetime - swipe_time).total_seconds())
+		))
+
+
+def get_session_window_index(date, rooms=None):
+	"""Session window index for a date, cached for the current request or job"""
+	cache = getattr(frappe.local, "session_window_indexes", None)
+	if cache is None:
+		cache = frappe.local.session_window_indexes = {}
+
+	key = (getdate(date), tuple(sorted(rooms)) if rooms else None)
+	if key not in cache:
+		cache[key] = SessionWindowIndex(date, rooms=rooms)
+	return cache[key]